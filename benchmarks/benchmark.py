@@ -0,0 +1,180 @@
+from pyfluidsynth3 import constants, fluidcontrolqueue, fluidevent, fluidhandle, fluidsequencer, fluidsettings, fluidsynth, fluidsynthmonitor
+
+import argparse
+import array
+import json
+import platform
+import sys
+import time
+
+import stubhandle
+
+''' Benchmarks of the Python side of pyfluidsynth3. Runs against libfluidsynth if it can be loaded
+and against a pure Python stub library otherwise (or if --stub is given), so it also works without
+audio hardware. Results are written as JSON:
+
+{ "meta": { ... }, "results": { name: { "rate": operations per second, "unit": ... } } }
+'''
+
+BENCHMARKS = []
+
+def benchmark( unit ):
+    ''' Registers a benchmark function. The function gets the handle and number of operations and
+    returns the number of performed units. '''
+    def register( func ):
+        BENCHMARKS.append( (func.__name__, unit, func) )
+        return func
+    return register
+
+@benchmark( 'handles' )
+def handle_startup( handle, count ):
+    factory = type( handle )
+    for i in range( count // 1000 or 1 ):
+        factory( handle.library_path ).prewarm( 'settings', 'synth' )
+    return count // 1000 or 1
+
+@benchmark( 'notes' )
+def synth_noteon( handle, count ):
+    synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+    for i in range( count ):
+        synth.noteon( 0, 60, 100 )
+        synth.noteoff( 0, 60 )
+    return count
+
+@benchmark( 'notes' )
+def synth_send_messages( handle, count ):
+    synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+    types = [ constants.NOTE_ON, constants.NOTE_OFF ] * count
+    channels = [ 0 ] * ( 2 * count )
+    keys = [ 60 ] * ( 2 * count )
+    velocities = [ 100, 0 ] * count
+    synth.send_messages( types, channels, keys, velocities )
+    return count
+
+@benchmark( 'messages' )
+def control_queue_pitch_bend( handle, count ):
+    synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+    queue = fluidcontrolqueue.FluidControlQueue( synth )
+    for i in range( count ):
+        queue.pitch_bend( 0, i & 0x3FFF )
+        if i % 256 == 0:
+            queue.flush()
+    queue.flush()
+    return count
+
+@benchmark( 'events' )
+def event_construct_fill( handle, count ):
+    for i in range( count ):
+        event = fluidevent.FluidEvent( handle )
+        event.dest = 1
+        event.note( 0, 60, 100, 120 )
+    return count
+
+@benchmark( 'events' )
+def sequencer_send( handle, count ):
+    sequencer = fluidsequencer.FluidSequencer( handle )
+    event = sequencer.events.scratch
+    event.dest = 1
+    for i in range( count ):
+        event.note( 0, 60, 100, 120 )
+        sequencer.send( event, i )
+    return count
+
+@benchmark( 'events' )
+def sequencer_send_many( handle, count ):
+    sequencer = fluidsequencer.FluidSequencer( handle )
+    events = { 'kind': [ constants.NOTE ] * count, 'channel': [ 0 ] * count,
+               'key': [ 60 ] * count, 'velocity': [ 100 ] * count, 'duration': [ 120 ] * count }
+    sequencer.send_many( events, range(count), 1 )
+    return count
+
+@benchmark( 'accesses' )
+def settings_get_set( handle, count ):
+    settings = fluidsettings.FluidSettings( handle )
+    for i in range( count ):
+        settings['synth.gain'] = settings['synth.gain']
+    return 2 * count
+
+@benchmark( 'frames' )
+def render( handle, count ):
+    FRAMES = 4096
+    synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+    buffer = array.array( 'f', bytes(FRAMES * synth.CHANNELS * 4) )
+    blocks = count // 100 or 1
+    for i in range( blocks ):
+        synth.write_float( buffer )
+    return blocks * FRAMES
+
+@benchmark( 'samples' )
+def synth_monitor_sample( handle, count ):
+    synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+    monitor = fluidsynthmonitor.FluidSynthMonitor( synth )
+    for i in range( count ):
+        monitor.sample()
+    return count
+
+def load_handle( library_path, stub ):
+    ''' Returns a handle to libfluidsynth or the stub library and true if it is the stub. '''
+    if not stub:
+        try:
+            handle = fluidhandle.FluidHandle( library_path )
+            if handle.library_path:
+                return handle, False
+        except OSError:
+            pass
+    return stubhandle.StubHandle(), True
+
+def run( handle, count, repeat, names = None ):
+    ''' Runs the benchmarks with the given names (all if None) and returns their results. The best
+    rate of all repetitions is reported. Benchmarks using functions missing in the library report
+    an error instead. '''
+    results = {}
+    for name, unit, func in BENCHMARKS:
+        if names and name not in names:
+            continue
+
+        best = 0.0
+        try:
+            for i in range( repeat ):
+                start = time.perf_counter()
+                units = func( handle, count )
+                elapsed = time.perf_counter() - start
+                best = max( best, units / elapsed )
+        except AttributeError as e:
+            results[name] = { 'error': str(e) }
+            continue
+
+        results[name] = { 'rate': best, 'unit': '{0}/s'.format(unit) }
+    return results
+
+def main( argv ):
+    parser = argparse.ArgumentParser( description = "Benchmarks of pyfluidsynth3." )
+    parser.add_argument( '--library', help = "path of libfluidsynth" )
+    parser.add_argument( '--stub', action = 'store_true', help = "use the stub library" )
+    parser.add_argument( '--count', type = int, default = 100000, help = "operations per run" )
+    parser.add_argument( '--repeat', type = int, default = 3, help = "runs per benchmark" )
+    parser.add_argument( '--output', help = "write JSON results to this file instead of stdout" )
+    parser.add_argument( 'names', nargs = '*', help = "benchmarks to run (default: all)" )
+    args = parser.parse_args( argv )
+
+    handle, stub = load_handle( args.library, args.stub )
+    report = {
+        'meta': { 'library': None if stub else handle.library_path,
+                  'stub': stub,
+                  'python': platform.python_version(),
+                  'platform': platform.platform(),
+                  'count': args.count,
+                  'repeat': args.repeat,
+                  'time': time.strftime( '%Y-%m-%dT%H:%M:%S' ) },
+        'results': run( handle, args.count, args.repeat, args.names ),
+    }
+
+    if args.output:
+        with open( args.output, 'w' ) as output:
+            json.dump( report, output, indent = 2, sort_keys = True )
+    else:
+        json.dump( report, sys.stdout, indent = 2, sort_keys = True )
+        print()
+
+if __name__ == '__main__':
+    main( sys.argv[1:] )
\ No newline at end of file
@@ -0,0 +1,206 @@
+from pyfluidsynth3 import fluidhandle, fluidsettings, fluidsoundfontregistry
+
+from ctypes import addressof, memset
+import functools
+import itertools
+
+class StubLibrary():
+    ''' Stand-in for libfluidsynth which implements every function known to FluidHandle in pure
+    Python. Functions do as little as possible: objects are plain integers (except soundfonts,
+    which are laid out like fluid_sfont_t of FluidSynth 1.x), settings are kept in a
+    dictionary and audio is rendered as silence. Results follow the conventions of the FluidSynth
+    version VERSION, subclasses may pretend another version.
+
+    Constants:
+    SETTINGS -- Known settings: key -> (type, default value).
+    VERSION -- Library version reported by fluid_version() (tuple).
+
+    Member:
+    _ids -- Generator of object pointers (itertools.count).
+    _settings -- Settings values by key (dict).
+    _sfont_structs -- Soundfont of every soundfont pointer, its id is overwritten when a synth
+                      adds it (dict).
+    _sfont_next -- Next soundfont id of every synth (dict).
+    _sfonts -- Soundfont stack of every synth, top first (dict).
+    _tick -- Current sequencer tick (int).
+    '''
+
+    NUM, INT, STR = ( fluidsettings.FluidSettings.FLUID_NUM_TYPE,
+                      fluidsettings.FluidSettings.FLUID_INT_TYPE,
+                      fluidsettings.FluidSettings.FLUID_STR_TYPE )
+
+    SETTINGS = {
+        b'audio.driver': ( STR, b'alsa' ),
+        b'audio.period-size': ( INT, 64 ),
+        b'audio.periods': ( INT, 16 ),
+        b'player.timing-source': ( STR, b'sample' ),
+        b'synth.audio-channels': ( INT, 1 ),
+        b'synth.audio-groups': ( INT, 1 ),
+        b'synth.chorus.active': ( INT, 1 ),
+        b'synth.cpu-cores': ( INT, 1 ),
+        b'synth.gain': ( NUM, 0.2 ),
+        b'synth.midi-channels': ( INT, 16 ),
+        b'synth.parallel-render': ( INT, 1 ),
+        b'synth.polyphony': ( INT, 256 ),
+        b'synth.reverb.active': ( INT, 1 ),
+        b'synth.sample-rate': ( NUM, 44100.0 ),
+    }
+
+    VERSION = ( 1, 1, 11 )
+
+    def __init__( self ):
+        ''' Creates the stub functions. Every function is a separate object so FluidHandle can set
+        argtypes and restype on it like on a ctypes function. '''
+        self._ids = itertools.count( 1 )
+        self._settings = { key: value for key, ( kind, value ) in self.SETTINGS.items() }
+        self._sfont_structs = {}
+        self._sfont_next = {}
+        self._sfonts = {}
+        self._tick = 0
+
+        for name in fluidhandle.FluidHandle._SIGNATURES:
+            impl = getattr( type(self), '_' + name, None )
+            if impl is None:
+                impl = self._new if name.startswith( 'new_' ) else self._ok
+                setattr( self, name, functools.partial( impl ) )
+            else:
+                setattr( self, name, functools.partial( impl, self ) )
+
+    def _new( self, *args ):
+        return next( self._ids )
+
+    def _ok( self, *args ):
+        return 0
+
+    def _fluid_version( self, major, minor, micro ):
+        for pointer, value in zip( (major, minor, micro), self.VERSION ):
+            pointer._obj.value = value
+
+    def _settings_result( self, success ):
+        if self.VERSION[0] >= 2:
+            return 0 if success else -1
+        return 1 if success else 0
+
+    def _fluid_settings_get_type( self, settings, key ):
+        return self.SETTINGS.get( key, (fluidsettings.FluidSettings.FLUID_NO_TYPE,) )[0]
+
+    def _fluid_settings_get( self, settings, key, value ):
+        if key not in self._settings:
+            return self._settings_result( False )
+        value._obj.value = self._settings[key]
+        return self._settings_result( True )
+
+    _fluid_settings_getnum = _fluid_settings_getint = _fluid_settings_getstr = _fluid_settings_get
+
+    def _fluid_settings_copystr( self, settings, key, value, size ):
+        if key not in self._settings:
+            return self._settings_result( False )
+        value.value = self._settings[key][:size - 1]
+        return self._settings_result( True )
+
+    def _fluid_settings_set( self, settings, key, value ):
+        if key not in self._settings:
+            return self._settings_result( False )
+        self._settings[key] = value
+        return self._settings_result( True )
+
+    _fluid_settings_setnum = _fluid_settings_setint = _fluid_settings_setstr = _fluid_settings_set
+
+    def __new_sfont( self ):
+        sfont = fluidsoundfontregistry._FluidSfont1()
+        self._sfont_structs[addressof( sfont )] = sfont
+        return addressof( sfont )
+
+    def _fluid_synth_sfload( self, synth, path, reset ):
+        return self._fluid_synth_add_sfont( synth, self.__new_sfont() )
+
+    def _fluid_synth_add_sfont( self, synth, sfont ):
+        id = self._sfont_next.get( synth, 1 )
+        self._sfont_next[synth] = id + 1
+        self._sfont_structs[sfont].id = id
+        self._sfonts.setdefault( synth, [] ).insert( 0, sfont )
+        return id
+
+    def _fluid_synth_remove_sfont( self, synth, sfont ):
+        self._sfonts.get( synth, [] ).remove( sfont )
+        return 0
+
+    def _fluid_synth_sfunload( self, synth, id, reset ):
+        sfont = self._fluid_synth_get_sfont_by_id( synth, id )
+        if sfont is None:
+            return -1
+        return self._fluid_synth_remove_sfont( synth, sfont )
+
+    def _fluid_synth_sfreload( self, synth, id ):
+        sfont = self._fluid_synth_get_sfont_by_id( synth, id )
+        if sfont is None:
+            return -1
+        sfonts = self._sfonts[synth]
+        sfonts[sfonts.index( sfont )] = reloaded = self.__new_sfont()
+        self._sfont_structs[reloaded].id = id
+        return id
+
+    def _fluid_synth_get_sfont_by_id( self, synth, id ):
+        for sfont in self._sfonts.get( synth, [] ):
+            if self._sfont_structs[sfont].id == id:
+                return sfont
+        return None
+
+    def _fluid_synth_get_sfont( self, synth, index ):
+        sfonts = self._sfonts.get( synth, [] )
+        return sfonts[index] if index < len( sfonts ) else None
+
+    def _fluid_synth_sfcount( self, synth ):
+        return len( self._sfonts.get(synth, []) )
+
+    def _fluid_sfont_get_id( self, sfont ):
+        return self._sfont_structs[sfont].id
+
+    def _fluid_synth_write( self, synth, frames, left, loff, lincr, right, roff, rincr ):
+        memset( left, 0, len(left) )
+        return 0
+
+    _fluid_synth_write_float = _fluid_synth_write_s16 = _fluid_synth_write
+
+    def _fluid_synth_count_midi_channels( self, synth ):
+        return self._settings[b'synth.midi-channels']
+
+    def _fluid_player_get_status( self, player ):
+        return 2
+
+    def _fluid_sequencer_get_tick( self, seq ):
+        self._tick += 1
+        return self._tick
+
+    def _fluid_sequencer_get_time_scale( self, seq ):
+        return 1000.0
+
+    def _fluid_sequencer_get_client_name( self, seq, id ):
+        return b'fluidsynth'
+
+class StubLibrary2( StubLibrary ):
+    ''' StubLibrary with the result conventions and settings of FluidSynth 2.x. '''
+
+    SETTINGS = { key: value for key, value in StubLibrary.SETTINGS.items()
+                 if key != b'synth.parallel-render' }
+    SETTINGS[b'synth.dynamic-sample-loading'] = ( StubLibrary.INT, 0 )
+
+    VERSION = ( 2, 3, 4 )
+
+class StubHandle( fluidhandle.FluidHandle ):
+    ''' FluidHandle which binds the StubLibrary instead of libfluidsynth.
+
+    Constants:
+    LIBRARY -- The stub library class (type).
+    '''
+
+    LIBRARY = StubLibrary
+
+    def load_library( self, library_path ):
+        self.library_path = None
+        return self.LIBRARY()
+
+class StubHandle2( StubHandle ):
+    ''' FluidHandle which binds the StubLibrary2 instead of libfluidsynth 2.x. '''
+
+    LIBRARY = StubLibrary2
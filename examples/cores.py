@@ -0,0 +1,19 @@
+from pyfluidsynth3 import fluidhandle, fluidperformance
+
+import sys
+
+''' Measures how synthesis scales with the number of CPU cores on this machine and prints the 
+recommended value of "synth.cpu-cores". '''
+
+if len( sys.argv ) < 3:
+    print( "Usage: {0} library soundfont.sf2 [notes]".format(sys.argv[0]) )
+    sys.exit()
+
+handle = fluidhandle.FluidHandle( sys.argv[1] )
+notes = int( sys.argv[3] ) if len( sys.argv ) > 3 else fluidperformance.NOTES_DEFAULT
+
+result = fluidperformance.benchmark_cores( handle, [sys.argv[2]], notes = notes )
+
+for cores, rate in sorted( result.rates.items() ):
+    print( "{0:3} cores: {1:12.0f} frames/s".format(cores, rate) )
+print( "Recommended: synth.cpu-cores = {0} ({1:.1f}x realtime)".format(result.recommended, result.realtime) )
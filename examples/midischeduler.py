@@ -0,0 +1,33 @@
+from pyfluidsynth3 import fluidaudiodriver, fluidhandle, fluidmidischeduler, fluidsettings, fluidsequencer, fluidsynth
+
+import sys
+import time
+
+''' Plays a MIDI file transposed by a few semitones through the sequencer and jumps back to the
+start after ten seconds. '''
+
+if len( sys.argv ) < 4:
+    print( "Usage: {0} library soundfont.sf2 song.mid [semitones]".format(sys.argv[0]) )
+    sys.exit()
+
+handle = fluidhandle.FluidHandle( sys.argv[1] )
+settings = fluidsettings.FluidSettings( handle )
+synth = fluidsynth.FluidSynth( handle, settings )
+driver = fluidaudiodriver.FluidAudioDriver( handle, synth, settings )
+sequencer = fluidsequencer.FluidSequencer( handle )
+
+synth.load_soundfont( sys.argv[2] )
+dest, name = sequencer.add_synth( synth )
+
+transpose = int( sys.argv[4] ) if len( sys.argv ) > 4 else 0
+scheduler = fluidmidischeduler.FluidMidiScheduler( sequencer, dest, sys.argv[3], transpose = transpose )
+
+scheduler.play()
+time.sleep( 10 )
+scheduler.seek( 0.0 )
+
+while scheduler.playing:
+    print( "Position: {0:.1f}s".format(scheduler.position) )
+    time.sleep( 1 )
+
+scheduler.close()
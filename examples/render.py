@@ -0,0 +1,35 @@
+from pyfluidsynth3 import fluidhandle, fluidsettings, fluidsynth
+
+import array
+import sys
+
+''' Renders the melody of synth.py faster than realtime into a raw 16 bit stereo file. '''
+
+if len( sys.argv ) < 4:
+    print( "Usage: {0} library soundfont.sf2 output.raw".format(sys.argv[0]) )
+    sys.exit()
+
+handle = fluidhandle.FluidHandle( sys.argv[1] )
+settings = fluidsettings.FluidSettings( handle )
+synth = fluidsynth.FluidSynth( handle, settings )
+
+synth.load_soundfont( sys.argv[2] )
+
+seq = (79, 78, 79, 74, 79, 69, 79, 67, 79, 72, 79, 76,
+       79, 78, 79, 74, 79, 69, 79, 67, 79, 72, 79, 76,
+       79, 78, 79, 74, 79, 72, 79, 76, 79, 78, 79, 74,
+       79, 72, 79, 76, 79, 78, 79, 74, 79, 72, 79, 76,
+       79, 76, 74, 71, 69, 67, 69, 67, 64, 67, 64, 62,
+       64, 62, 59, 62, 59, 57, 64, 62, 59, 62, 59, 57,
+       64, 62, 59, 62, 59, 57, 43)
+
+# One buffer of 0.1 seconds which is reused for every note.
+frames = int( settings['synth.sample-rate'] * 0.1 )
+buffer = array.array( 'h', bytes(frames * synth.CHANNELS * 2) )
+
+with open( sys.argv[3], 'wb' ) as output:
+    for note in seq:
+        synth.noteon( 0, note, 1.0 )
+        synth.write_s16( buffer )
+        output.write( buffer )
+        synth.noteoff( 0, note )
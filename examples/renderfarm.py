@@ -0,0 +1,20 @@
+from pyfluidsynth3 import fluidrenderfarm
+
+import os
+import sys
+
+''' Renders all given MIDI files to WAV files next to them using all CPU cores. '''
+
+if __name__ == '__main__':
+    if len( sys.argv ) < 4:
+        print( "Usage: {0} library soundfont.sf2 song.mid [song.mid ...]".format(sys.argv[0]) )
+        sys.exit()
+
+    jobs = [ (midi, os.path.splitext(midi)[0] + '.wav') for midi in sys.argv[3:] ]
+
+    with fluidrenderfarm.FluidRenderFarm( [sys.argv[2]], sys.argv[1], timeout = 600 ) as farm:
+        for result in farm.map( jobs ):
+            if result.error:
+                print( "{0}: {1}".format(result.midi, result.error) )
+            else:
+                print( "{0}: {1} frames".format(result.output, result.frames) )
@@ -1,4 +1,4 @@
-from pyfluidsynth3 import fluidaudiodriver, fluidevent, fluidhandle, fluidsettings, fluidsequencer, fluidsynth
+from pyfluidsynth3 import constants, fluidaudiodriver, fluidhandle, fluidsettings, fluidsequencer, fluidsynth
 
 import sys
 import time
@@ -26,43 +26,24 @@ print( "TPS: {0}".format(sequencer.ticks_per_second) )
 
 dest = sequencer.add_synth(synth)
 
-c_scale = []
+c_scale = list( range(60, 72) )
+chords = ( (0, 4, 7), (0, 5, 9), (0, 4, 7), (2, 5, 7, 11), (0, 4, 7) )
 
-for note in range( 60, 72 ):
-    event = fluidevent.FluidEvent( handle )
-    event.dest = dest[0]
-    event.note( 0, note, 127, int(beat_length * 0.9) )
-    c_scale.append( event )
+events = { 'kind': [], 'channel': [], 'key': [], 'velocity': [], 'duration': [] }
+timestamps = []
 
 ticks = sequencer.ticks + 10
 
-sequencer.send( c_scale[0], ticks )
-sequencer.send( c_scale[4], ticks )
-sequencer.send( c_scale[7], ticks )
-
-ticks += beat_length
-
-sequencer.send( c_scale[0], ticks )
-sequencer.send( c_scale[5], ticks )
-sequencer.send( c_scale[9], ticks )
-
-ticks += beat_length
-
-sequencer.send( c_scale[0], ticks )
-sequencer.send( c_scale[4], ticks )
-sequencer.send( c_scale[7], ticks )
-
-ticks += beat_length
-
-sequencer.send( c_scale[2], ticks )
-sequencer.send( c_scale[5], ticks )
-sequencer.send( c_scale[7], ticks )
-sequencer.send( c_scale[11], ticks )
-
-ticks += beat_length
-
-sequencer.send( c_scale[0], ticks )
-sequencer.send( c_scale[4], ticks )
-sequencer.send( c_scale[7], ticks )
+for chord in chords:
+    for degree in chord:
+        events['kind'].append( constants.NOTE )
+        events['channel'].append( 0 )
+        events['key'].append( c_scale[degree] )
+        events['velocity'].append( 127 )
+        events['duration'].append( int(beat_length * 0.9) )
+        timestamps.append( ticks )
+    ticks += beat_length
+
+sequencer.send_many( events, timestamps, dest[0] )
 
 time.sleep( 16 )
@@ -6,6 +6,13 @@ TRUE -- Settings boolean value for true/on/yes/1.
 
 OK -- Value that indicates success.
 FAILED -- Value that indicates failure.
+
+NOTE_OFF -- MIDI message type: Note off (p1: key).
+NOTE_ON -- MIDI message type: Note on (p1: key, p2: velocity).
+CONTROL_CHANGE -- MIDI message type: Control change (p1: controller, p2: value).
+PROGRAM_CHANGE -- MIDI message type: Program change (p1: program).
+PITCH_BEND -- MIDI message type: Pitch bend (p1: value).
+NOTE -- Sequencer event type: Note with duration (p1: key, p2: velocity).
 '''
 
 FALSE = 0
@@ -14,3 +21,9 @@ TRUE = 1
 OK = 0
 FAILED = -1
 
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+PROGRAM_CHANGE = 0xC0
+PITCH_BEND = 0xE0
+NOTE = 0x00
\ No newline at end of file
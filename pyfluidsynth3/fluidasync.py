@@ -0,0 +1,131 @@
+import asyncio
+import weakref
+
+class FluidAsyncWatcher():
+    ''' Provides awaitables for FluidPlayer and FluidSequencer objects. Instead of blocking a thread
+    per player (like FluidPlayer.join()) a single periodic callback on the event loop checks the
+    status of all awaited players and sequencers and resolves their futures, so one event loop can
+    drive hundreds of players. The callback only runs while something is awaited. Use watcher() to
+    get the watcher of the running event loop. The watcher keeps its loop only weakly, so it doesn't
+    keep a finished loop alive.
+
+    Example:
+    player.play( 'song.mid' )
+    await player.join_async()
+
+    Constants:
+    INTERVAL_DEFAULT -- Default seconds between two status checks.
+
+    Member:
+    interval -- Seconds between two status checks (float).
+    loop -- The event loop (asyncio.AbstractEventLoop).
+    _loop -- Weak reference to the event loop (weakref.ref).
+    _players -- Awaited players: (player, future) (list).
+    _ticks -- Awaited sequencer ticks: (sequencer, tick, future) (list).
+    _timer -- Handle of the scheduled status check or None (asyncio.TimerHandle).
+    '''
+
+    INTERVAL_DEFAULT = 0.01
+
+    def __init__( self, loop, interval = INTERVAL_DEFAULT ):
+        ''' Creates a watcher for the given event loop. '''
+        self.interval = interval
+        self._loop = weakref.ref( loop )
+        self._players = []
+        self._ticks = []
+        self._timer = None
+
+    @property
+    def loop( self ):
+        ''' Returns the event loop or None if it was garbage collected. '''
+        return self._loop()
+
+    def join( self, player ):
+        ''' Returns a future which is done when the given player finished playing. '''
+        future = self.loop.create_future()
+        if player.status == player.DONE:
+            future.set_result( None )
+        else:
+            self._players.append( (player, future) )
+            self.__schedule()
+        return future
+
+    def wait_tick( self, sequencer, tick ):
+        ''' Returns a future which is done when the given sequencer reached the given tick. The
+        result is the current tick. '''
+        future = self.loop.create_future()
+        current = sequencer.ticks
+        if current >= tick:
+            future.set_result( current )
+        else:
+            self._ticks.append( (sequencer, tick, future) )
+            self.__schedule()
+        return future
+
+    async def player_status( self, player ):
+        ''' Asynchronous iterator which yields the status of the given player whenever it changes
+        until the player is done. '''
+        last = None
+        while True:
+            status = player.status
+            if status != last:
+                yield status
+                last = status
+            if status == player.DONE:
+                return
+            await asyncio.sleep( self.interval )
+
+    async def sequencer_ticks( self, sequencer, step = 1 ):
+        ''' Asynchronous iterator which yields the current tick of the given sequencer every time
+        it advanced at least step ticks. Runs until the consumer stops iterating. '''
+        tick = sequencer.ticks
+        while True:
+            yield tick
+            tick = await self.wait_tick( sequencer, tick + step )
+
+    def __schedule( self ):
+        ''' Schedules the next status check if none is pending. '''
+        if self._timer is None:
+            self._timer = self.loop.call_later( self.interval, self.__check )
+
+    def __check( self ):
+        ''' Resolves the futures of done players and reached ticks. '''
+        self._timer = None
+
+        players = []
+        for player, future in self._players:
+            if future.done():
+                continue
+            if player.status == player.DONE:
+                future.set_result( None )
+            else:
+                players.append( (player, future) )
+        self._players = players
+
+        ticks = []
+        current = {}
+        for sequencer, tick, future in self._ticks:
+            if future.done():
+                continue
+            if id(sequencer) not in current:
+                current[id(sequencer)] = sequencer.ticks
+            if current[id(sequencer)] >= tick:
+                future.set_result( current[id(sequencer)] )
+            else:
+                ticks.append( (sequencer, tick, future) )
+        self._ticks = ticks
+
+        if self._players or self._ticks:
+            self.__schedule()
+
+_watchers = weakref.WeakKeyDictionary()
+
+def watcher( loop = None ):
+    ''' Returns the watcher of the given or running event loop. '''
+    if loop is None:
+        loop = asyncio.get_running_loop()
+    try:
+        return _watchers[loop]
+    except KeyError:
+        _watchers[loop] = FluidAsyncWatcher( loop )
+        return _watchers[loop]
\ No newline at end of file
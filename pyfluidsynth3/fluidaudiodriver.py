@@ -1,20 +1,163 @@
+from . import fluidhandle
+
+from ctypes import addressof, c_float
+import time
+import traceback
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class FluidAudioDriver():
     ''' Represents the FluidSynth audio driver object as defined in audio.h.
-    
+
     This class is inspired by the FluidAudioDriver object from pyfluidsynth by MostAwesomeDude.
 
+    If a callback is given the driver is created with new_fluid_audio_driver2(). For every period
+    the synth renders into the driver's own buffers with fluid_synth_process() and the callback is
+    called with the driver and a list of one view per output channel (left, right, ...), which it
+    can modify in place for limiting, metering or streaming. Views are NumPy float32 arrays if
+    NumPy is installed else memoryviews of floats. They point directly into the driver's buffers,
+    no audio is copied, and are reused as long as the driver passes the same buffers. Views are
+    only valid during the callback.
+
+    The callback runs in the audio thread and has to return within the length of a period
+    (period-size / sample-rate seconds) including the rendering time, else the device runs dry.
+    Every period which took longer is counted in overruns. Exceptions raised by the callback are
+    printed and counted in errors, the rendered audio is played anyway.
+
+    If a control queue (FluidControlQueue) is given it is flushed before every period, so live
+    controller changes are applied once per period. This also uses new_fluid_audio_driver2().
+
+    If count_voices is true the voices of every MIDI channel are counted after the period following
+    a call of request_channel_voices() and stored in channel_voices. The voice list of a synth may
+    only be walked by the thread rendering it, so this is the way to count voices while a driver
+    plays (see FluidSynthMonitor). This also uses new_fluid_audio_driver2().
+
+    Example:
+    def limit( driver, outputs ):
+        for output in outputs:
+            numpy.clip( output, -1.0, 1.0, out = output )
+    driver = FluidAudioDriver( handle, synth, settings, limit )
+
     Member:
     audio_driver -- The FluidSynth audio driver object (fluid_audio_driver_t).
-    handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will 
+    budget -- Seconds available per period if a callback is used (float).
+    callback -- Called with the driver and the output views every period or None (callable).
+    channel_voices -- Voices per MIDI channel counted on the last request or None (list).
+    control_queue -- Queue flushed before every period or None (FluidControlQueue).
+    errors -- Number of exceptions raised by the callback or the control queue (int).
+    handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will
               probably work, too (FluidHandle).
+    overruns -- Number of periods which took longer than the budget (int).
+    periods -- Number of processed periods (int).
+    worst -- Longest period processing time in seconds (float).
+    _count_voices -- Count the voices per MIDI channel after the next period (boolean).
+    _trampoline -- Function registered at the driver (fluid_audio_func_t).
+    _views -- Views of the last buffers by buffer address and length (dict).
     '''
-    
-    def __init__( self, handle, synth, settings ):
+
+    def __init__( self, handle, synth, settings, callback = None, control_queue = None,
+                  count_voices = False ):
         ''' Create a new FluidSynth audio driver instance using given handle, synth and settings
-        objects. '''
+        objects. If callback is given the audio is passed through it, if control_queue is given it
+        is flushed every period, if count_voices is true voices can be counted per MIDI channel
+        (see class documentation). '''
         self.handle = handle
-        self.audio_driver = handle.new_fluid_audio_driver( settings.settings, synth.synth )
-        
+        self.callback = callback
+        self.control_queue = control_queue
+
+        self.budget = 0.0
+        self.channel_voices = None
+        self.errors = 0
+        self.overruns = 0
+        self.periods = 0
+        self.worst = 0.0
+        self._count_voices = False
+        self._trampoline = None
+        self._views = {}
+
+        if callback is None and control_queue is None and not count_voices:
+            self.audio_driver = handle.new_fluid_audio_driver( settings.settings, synth.synth )
+        else:
+            self.budget = settings['audio.period-size'] / settings['synth.sample-rate']
+            self._trampoline = fluidhandle.fluid_audio_func_t( self.__trampoline(synth) )
+            self.audio_driver = handle.new_fluid_audio_driver2( settings.settings, self._trampoline,
+                                                                None )
+
     def __del__(self):
         ''' Delete the audio driver. '''
-        self.handle.delete_fluid_audio_driver( self.audio_driver )
\ No newline at end of file
+        self.handle.delete_fluid_audio_driver( self.audio_driver )
+
+    def request_channel_voices( self ):
+        ''' Counts the voices of every MIDI channel after the next period, see channel_voices.
+        Requires a driver created with count_voices. '''
+        self._count_voices = True
+
+    def __trampoline( self, synth ):
+        ''' Returns the function called by the driver. Flushes the control queue, renders the
+        period, calls the callback, counts voices if requested and updates the counters. All
+        library functions are bound up front to keep it short. '''
+        process = self.handle.fluid_synth_process
+        perf_counter = time.perf_counter
+        view = self.__view
+        views = self._views
+        channel_voices = synth.channel_voices
+        synth = synth.synth
+
+        def trampoline( data, length, nfx, fx, nout, out ):
+            start = perf_counter()
+            try:
+                if self.control_queue is not None:
+                    self.control_queue.flush()
+            except Exception:
+                self.errors += 1
+                traceback.print_exc()
+
+            result = process( synth, length, nfx, fx, nout, out )
+
+            if self.callback is not None:
+                outputs = []
+                for i in range( nout ):
+                    output = views.get( (addressof(out[i].contents), length) )
+                    outputs.append( view(out[i], length) if output is None else output )
+
+                try:
+                    self.callback( self, outputs )
+                except Exception:
+                    self.errors += 1
+                    traceback.print_exc()
+
+            if self._count_voices:
+                self._count_voices = False
+                try:
+                    self.channel_voices = channel_voices()
+                except Exception:
+                    self.errors += 1
+                    traceback.print_exc()
+
+            elapsed = perf_counter() - start
+            self.periods += 1
+            if elapsed > self.budget:
+                self.overruns += 1
+            if elapsed > self.worst:
+                self.worst = elapsed
+            return result
+
+        return trampoline
+
+    def __view( self, pointer, length ):
+        ''' Creates and caches a view of length floats of the buffer at the pointer. The cache is
+        cleared when it grows beyond a few buffers, e.g. if the driver reallocates them. '''
+        address = addressof( pointer.contents )
+        if len( self._views ) > 16:
+            self._views.clear()
+
+        if numpy is None:
+            view = memoryview( (c_float * length).from_address(address) ).cast( 'B' ).cast( 'f' )
+        else:
+            view = numpy.ctypeslib.as_array( pointer, shape = (length,) )
+
+        self._views[(address, length)] = view
+        return view
@@ -0,0 +1,174 @@
+import threading
+
+class FluidControlQueue():
+    ''' Ingestion queue in front of a FluidSynth for live input. Controllers and pitch bend are
+    coalesced: only the latest value per (channel, controller) and per channel pitch bend is kept,
+    so a storm of messages between two audio periods costs one library call per controller. Notes,
+    program changes and the controllers in ORDERED_CONTROLLERS are never coalesced and keep their
+    order relative to all other messages: a controller change after a note is applied after that
+    note, and a volume change after a "reset all controllers" isn't reset.
+
+    The queue is flushed by flush(), by a FluidAudioDriver created with it once per audio period
+    or by a background thread rate times per second (see start()). All methods are thread safe.
+    Concurrent flushes are serialized, so batches reach the synth in the order they were queued.
+
+    Example:
+    queue = FluidControlQueue( synth )
+    driver = FluidAudioDriver( handle, synth, settings, control_queue = queue )
+    queue.pitch_bend( 0, 8192 )
+
+    Constants:
+    ORDERED_CONTROLLERS -- Controllers whose effect depends on the messages before and after them:
+                           bank select, data entry, (N)RPN and the channel mode messages all
+                           sound off, reset all controllers and all notes off (frozenset).
+
+    Member:
+    coalesced -- Number of messages replaced by a newer value (int).
+    rate -- Flushes per second of the background thread (float).
+    received -- Number of received messages (int).
+    synth -- The synth (FluidSynth).
+    _flush_lock -- Held while a batch is taken and sent to the synth (threading.Lock).
+    _lock -- Guards the queue (threading.Lock).
+    _messages -- Queued messages: [kind, channel, p1, p2] in order (list).
+    _slots -- Coalescable messages after the last ordered message by (kind, channel, p1) (dict).
+    _stop -- Set to stop the flush thread (threading.Event).
+    _thread -- The flush thread or None (threading.Thread).
+    '''
+
+    ORDERED_CONTROLLERS = frozenset( (0, 6, 32, 38, 98, 99, 100, 101, 120, 121, 123) )
+
+    _NOTEON, _NOTEOFF, _CC, _PITCH_BEND, _PROGRAM_CHANGE = range(5)
+
+    def __init__( self, synth, rate = None ):
+        ''' Creates a queue for the given synth. If rate is given start() flushes it rate times per
+        second. '''
+        self.coalesced = 0
+        self.rate = rate
+        self.received = 0
+        self.synth = synth
+
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._messages = []
+        self._slots = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__( self ):
+        self.start()
+        return self
+
+    def __exit__( self, *args ):
+        self.stop()
+
+    def __len__( self ):
+        ''' Returns the number of queued messages. '''
+        return len( self._messages )
+
+    def noteon( self, channel, pitch, velocity ):
+        ''' Queues a note-on event. Velocity may be a float between 0.0 and 1.0. '''
+        if isinstance( velocity, float ):
+            velocity = int( velocity * 127 )
+        self.__ordered( self._NOTEON, channel, pitch, velocity )
+
+    def noteoff( self, channel, pitch ):
+        ''' Queues a note-off event. '''
+        self.__ordered( self._NOTEOFF, channel, pitch, 0 )
+
+    def cc( self, channel, control, value ):
+        ''' Queues a MIDI controller event. An alias method "control_change" exists. '''
+        if control in self.ORDERED_CONTROLLERS:
+            self.__ordered( self._CC, channel, control, value )
+        else:
+            self.__control( self._CC, channel, control, value )
+
+    control_change = cc
+
+    def pitch_bend( self, channel, value ):
+        ''' Queues a pitch bend event. '''
+        self.__control( self._PITCH_BEND, channel, 0, value )
+
+    def program_change( self, channel, program ):
+        ''' Queues a program change event. '''
+        self.__ordered( self._PROGRAM_CHANGE, channel, 0, program )
+
+    def flush( self ):
+        ''' Sends all queued messages to the synth in order. Returns the number of sent messages.
+        Waits for a flush running in another thread, producers are only blocked while the batch
+        is taken. '''
+        with self._flush_lock:
+            with self._lock:
+                messages = self._messages
+                self._messages = []
+                self._slots = {}
+
+            if not messages:
+                return 0
+
+            self.__send( messages )
+            return len( messages )
+
+    def start( self ):
+        ''' Starts a thread which flushes the queue rate times per second. Does nothing if no rate
+        is set, e.g. if an audio driver flushes the queue. '''
+        if self._thread is not None or not self.rate:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread( target = self.__run, name = 'FluidControlQueue',
+                                         daemon = True )
+        self._thread.start()
+
+    def stop( self ):
+        ''' Stops the flush thread and sends the remaining messages. '''
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def __ordered( self, kind, channel, p1, p2 ):
+        ''' Queues a note or another message which keeps its order. Controllers after it must not
+        be merged with those before it. '''
+        with self._lock:
+            self.received += 1
+            self._messages.append( [kind, channel, p1, p2] )
+            self._slots.clear()
+
+    def __control( self, kind, channel, p1, value ):
+        ''' Queues a controller or replaces the value of the same controller queued after the last
+        ordered message. '''
+        key = ( kind, channel, p1 )
+        with self._lock:
+            self.received += 1
+            message = self._slots.get( key )
+            if message is None:
+                message = [ kind, channel, p1, value ]
+                self._messages.append( message )
+                self._slots[key] = message
+            else:
+                message[3] = value
+                self.coalesced += 1
+
+    def __send( self, messages ):
+        ''' Sends messages to the synth. '''
+        handle = self.synth.handle
+        synth = self.synth.synth
+        funcs = { self._NOTEON: handle.fluid_synth_noteon,
+                  self._NOTEOFF: handle.fluid_synth_noteoff,
+                  self._CC: handle.fluid_synth_cc,
+                  self._PITCH_BEND: handle.fluid_synth_pitch_bend,
+                  self._PROGRAM_CHANGE: handle.fluid_synth_program_change }
+
+        for kind, channel, p1, p2 in messages:
+            if kind == self._NOTEON or kind == self._CC:
+                funcs[kind]( synth, channel, p1, p2 )
+            elif kind == self._NOTEOFF:
+                funcs[kind]( synth, channel, p1 )
+            else:
+                funcs[kind]( synth, channel, p2 )
+
+    def __run( self ):
+        ''' Flush thread: Flushes the queue rate times per second until stopped. '''
+        interval = 1.0 / self.rate
+        while not self._stop.wait( interval ):
+            self.flush()
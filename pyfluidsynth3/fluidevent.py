@@ -4,6 +4,11 @@ class FluidEvent():
     This class is inspired by the FluidEvent object from pyfluidsynth by MostAwesomeDude. Method 
     documentation is mostly taken from FluidSynth's official API.
 
+    Constants:
+    NOTE, NOTEON, NOTEOFF, ALLSOUNDSOFF, ALLNOTESOFF, BANKSELECT, PROGRAMCHANGE, PROGRAMSELECT, 
+    PITCHBEND, PITCHWHEELSENS, MODULATION, SUSTAIN, CONTROLCHANGE, PAN, VOLUME, REVERBSEND, 
+    CHORUSSEND, TIMER -- Event types (fluid_seq_event_type).
+
     Member:
     dest -- The destination field of a sequencer (short).
     event -- The FluidSynth event object (fluid_event_t).
@@ -12,6 +17,27 @@ class FluidEvent():
     source -- The source field of a sequencer (short).
     '''
 
+    __slots__ = ( 'event', 'handle' )
+
+    (NOTE,
+     NOTEON,
+     NOTEOFF,
+     ALLSOUNDSOFF,
+     ALLNOTESOFF,
+     BANKSELECT,
+     PROGRAMCHANGE,
+     PROGRAMSELECT,
+     PITCHBEND,
+     PITCHWHEELSENS,
+     MODULATION,
+     SUSTAIN,
+     CONTROLCHANGE,
+     PAN,
+     VOLUME,
+     REVERBSEND,
+     CHORUSSEND,
+     TIMER) = range(18)
+
     def __init__( self, handle ):
         ''' Create a new FluidSynth event instance using given handle object. '''
         self.handle = handle
@@ -43,9 +69,10 @@ class FluidEvent():
         ''' Set destination of a sequencer event. '''
         self.handle.fluid_event_set_dest( self.event, value )
 
-    def timer( self ):
-        ''' Set a sequencer event to be a timer event. '''
-        self.handle.fluid_event_timer( self.event, None )
+    def timer( self, data = None ):
+        ''' Set a sequencer event to be a timer event. Data is an optional integer which is passed
+        to the receiving client as raw pointer. '''
+        self.handle.fluid_event_timer( self.event, data )
 
     def volume( self, channel, value ):
         ''' Set a sequencer event to be a volume event. '''
@@ -63,6 +90,17 @@ class FluidEvent():
         ''' Set a sequencer event to be a note off event. '''
         self.handle.fluid_event_noteoff( self.event, channel, key )
 
+    def all_notes_off( self, channel ):
+        ''' Set a sequencer event to be an all notes off event. '''
+        self.handle.fluid_event_all_notes_off( self.event, channel )
+
+    def cc( self, channel, control, value ):
+        ''' Set a sequencer event to be a MIDI control change event. An alias method 
+        "control_change" exists. '''
+        self.handle.fluid_event_control_change( self.event, channel, control, value )
+
+    control_change = cc
+
     def pitch_bend( self, channel, pitch ):
         ''' Set a sequencer event to be a pitch bend event. '''
         self.handle.fluid_event_pitch_bend( self.event, channel, pitch )
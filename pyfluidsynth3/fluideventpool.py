@@ -0,0 +1,80 @@
+from . import fluidevent
+
+import contextlib
+import threading
+
+class FluidEventPool():
+    ''' Pool of reusable FluidSynth events. The sequencer copies an event when it is scheduled, so a
+    native event can be refilled and sent again right after sending it. Instead of creating one
+    FluidEvent per scheduled note use the scratch event of the current thread or acquire an event
+    from the pool and release it after sending. This keeps the number of native events constant
+    regardless of the length of a score.
+
+    Example:
+    pool = FluidEventPool( handle )
+    event = pool.scratch
+    event.dest = dest
+    for tick, key in notes:
+        event.note( 0, key, 127, 100 )
+        sequencer.send( event, tick )
+
+    Constants:
+    SIZE_DEFAULT -- Default maximal number of idle events kept by the pool.
+
+    Member:
+    handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will
+              probably work, too (FluidHandle).
+    size -- Maximal number of idle events kept by the pool (int).
+    _free -- Idle events (list).
+    _local -- Thread local storage holding the scratch event of every thread (threading.local).
+    '''
+
+    SIZE_DEFAULT = 16
+
+    def __init__( self, handle, size = SIZE_DEFAULT ):
+        ''' Create a new event pool using the given handle which keeps at most size idle events. '''
+        self.handle = handle
+        self.size = size
+        self._free = []
+        self._local = threading.local()
+
+    def __len__( self ):
+        ''' Returns the number of idle events. '''
+        return len( self._free )
+
+    @property
+    def scratch( self ):
+        ''' Returns the scratch event of the current thread. The event is created on first use and
+        must not be shared with other threads. '''
+        try:
+            return self._local.event
+        except AttributeError:
+            self._local.event = fluidevent.FluidEvent( self.handle )
+            return self._local.event
+
+    def acquire( self ):
+        ''' Returns an idle event or a new one if the pool is empty. Source and destination are
+        reset. '''
+        try:
+            event = self._free.pop()
+        except IndexError:
+            return fluidevent.FluidEvent( self.handle )
+
+        event.source = -1
+        event.dest = -1
+        return event
+
+    def release( self, event ):
+        ''' Returns an event to the pool. If the pool is full the event is dropped and its native
+        event gets deleted. '''
+        if len( self._free ) < self.size:
+            self._free.append( event )
+
+    @contextlib.contextmanager
+    def event( self ):
+        ''' Context manager which acquires an event and releases it on exit. '''
+        event = self.acquire()
+        try:
+            yield event
+        finally:
+            self.release( event )
\ No newline at end of file
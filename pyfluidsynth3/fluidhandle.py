@@ -1,294 +1,464 @@
-from ctypes import cdll, CFUNCTYPE, c_char_p, c_double, c_int, c_short, c_uint, c_void_p
+from ctypes import byref, cdll, CFUNCTYPE, POINTER, c_char_p, c_double, c_float, c_int, c_short, c_uint, c_void_p
 from ctypes.util import find_library
+from . import constants
 
+import json
 import os
 import re
+import time
+
+# From audio.h
+fluid_audio_func_t = CFUNCTYPE(c_int, c_void_p, c_int, c_int, POINTER(POINTER(c_float)), c_int,
+                               POINTER(POINTER(c_float)))
+
+# From seq.h
+fluid_event_callback_t = CFUNCTYPE(None, c_uint, c_void_p, c_void_p, c_void_p)
 
 class FluidHandle():
     ''' Creates a handle to the FluidSynth library. A instance of this class can be used the same
     way any real library handle to FluidSynth can be used. It "implements" all necessary 
     FluidSynth functions.
     
+    Functions are declared in the table FUNCTIONS and bound lazily on first access, so creating a
+    handle only loads the library. A function which is missing in the loaded library raises an
+    AttributeError when it is used, not when the handle is created. Use prewarm() to bind functions
+    up front, e.g. before forking worker processes.
+    
     This class is inspired by the bindings from pyFluidSynth by Whitehead and pyfluidsynth by 
     MostAwesomeDude.
     
+    The library search is cached per process and, if the environment variable named by CACHE_ENV
+    points to a file, on disk. Cache entries are keyed on working directory and library search 
+    environment and are dropped if the modification time of the library changed. Setting the 
+    environment variable named by LIBRARY_ENV skips the search completely.
+    
+    In instrumented mode (see instrument()) every function is wrapped to record its number of 
+    calls, failures, total and maximal latency. Failures are exceptions and results which signal
+    an error by the convention of the function (see FAILURES), results of functions without such a
+    convention are never counted. Without instrumentation the raw ctypes functions are used, so it
+    costs nothing when disabled. The statistics are approximate if functions are called from
+    multiple threads.
+    
     Constants:
+    CACHE_ENV -- Environment variable with the path of the on-disk library search cache.
+    FAILURES -- Functions by the result signalling an error: convention -> (name, ...). FAILED is
+                FLUID_FAILED, NULL a NULL pointer and SETTINGS the convention of the settings
+                functions of the loaded version (0 in 1.x, FLUID_FAILED in 2.x).
+    FUNCTIONS -- Functions grouped by FluidSynth header: group -> ((name, argtypes, restype), ...).
+    LDCONFIG_CACHE -- Path of the dynamic linker cache used to validate library names.
+    LIBRARY_ENV -- Environment variable which overrides the library path.
     LIBRARY_NAMES -- List of possible library names.
     LIBRARY_REGEX -- Regular expression to identify a library path.
+    SEARCH_ENV -- Environment variables which influence the library search.
     
     Member:
     handle -- The raw library handle. 
     library_path -- The path of the loaded library (string).
+    stats -- Call statistics by function name if instrumented else None (dict).
+    _version -- Version of the loaded library or None if not read yet (tuple).
     '''
     
-    LIBRARY_NAMES = [ 'fluidsynth', 'libfluidsynth', 'libfluidsynth-1' ]
-    LIBRARY_REGEX = r'.*fluidsynth(-\d+)?\.(dll|so(\.\d+)?)$'
-    
-    def __init__( self, library_path = None ):
-        ''' Creates a handle to the FluidSynth library. If a path is given it tries to use this path
-        if not it searches for the library. '''
-        self.handle = self.load_library( library_path )
-        
+    FUNCTIONS = {
+        # From version.h
+        'version': (
+            ( 'fluid_version', (POINTER(c_int), POINTER(c_int), POINTER(c_int)), None ),
+        ),
         # From settings.h
-        self.new_fluid_settings = self.handle.new_fluid_settings
-        self.new_fluid_settings.argtypes = ()
-        self.new_fluid_settings.restype = c_void_p
-        
-        self.delete_fluid_settings = self.handle.delete_fluid_settings
-        self.delete_fluid_settings.argtypes = (c_void_p,)
-        self.delete_fluid_settings.restype = None
-        
-        self.fluid_settings_get_type = self.handle.fluid_settings_get_type
-        self.fluid_settings_get_type.argtypes = (c_void_p, c_char_p)
-        self.fluid_settings_get_type.restype = c_int
-        
-        self.fluid_settings_getnum = self.handle.fluid_settings_getnum
-        self.fluid_settings_getnum.argtypes = (c_void_p, c_char_p, c_void_p)
-        self.fluid_settings_getnum.restype = c_int
-        
-        self.fluid_settings_getint = self.handle.fluid_settings_getint
-        self.fluid_settings_getint.argtypes = (c_void_p, c_char_p, c_void_p)
-        self.fluid_settings_getint.restype = c_int
-        
-        self.fluid_settings_getstr = self.handle.fluid_settings_getstr
-        self.fluid_settings_getstr.argtypes = (c_void_p, c_char_p, c_void_p)
-        self.fluid_settings_getstr.restype = c_int
-        
-        self.fluid_settings_setnum = self.handle.fluid_settings_setnum
-        self.fluid_settings_setnum.argtypes = (c_void_p, c_char_p, c_double)
-        self.fluid_settings_setnum.restype = c_int
-        
-        self.fluid_settings_setint = self.handle.fluid_settings_setint
-        self.fluid_settings_setint.argtypes = (c_void_p, c_char_p, c_int)
-        self.fluid_settings_setint.restype = c_int
-        
-        self.fluid_settings_setstr = self.handle.fluid_settings_setstr
-        self.fluid_settings_setstr.argtypes = (c_void_p, c_char_p, c_char_p)
-        self.fluid_settings_setstr.restype = c_int
-        
+        'settings': (
+            ( 'new_fluid_settings', (), c_void_p ),
+            ( 'delete_fluid_settings', (c_void_p,), None ),
+            ( 'fluid_settings_get_type', (c_void_p, c_char_p), c_int ),
+            ( 'fluid_settings_getnum', (c_void_p, c_char_p, c_void_p), c_int ),
+            ( 'fluid_settings_getint', (c_void_p, c_char_p, c_void_p), c_int ),
+            ( 'fluid_settings_getstr', (c_void_p, c_char_p, c_void_p), c_int ),
+            ( 'fluid_settings_copystr', (c_void_p, c_char_p, c_char_p, c_int), c_int ),
+            ( 'fluid_settings_setnum', (c_void_p, c_char_p, c_double), c_int ),
+            ( 'fluid_settings_setint', (c_void_p, c_char_p, c_int), c_int ),
+            ( 'fluid_settings_setstr', (c_void_p, c_char_p, c_char_p), c_int ),
+        ),
         # From synth.h
-        self.new_fluid_synth = self.handle.new_fluid_synth
-        self.new_fluid_synth.argtypes = (c_void_p,)
-        self.new_fluid_synth.restype = c_void_p
-        
-        self.delete_fluid_synth = self.handle.delete_fluid_synth
-        self.delete_fluid_synth.argtypes = (c_void_p,)
-        self.delete_fluid_synth.restype = None
-        
-        self.fluid_synth_sfload = self.handle.fluid_synth_sfload
-        self.fluid_synth_sfload.argtypes = (c_void_p, c_char_p, c_int)
-        self.fluid_synth_sfload.restype = c_int
-        
-        self.fluid_synth_sfreload = self.handle.fluid_synth_sfreload
-        self.fluid_synth_sfreload.argtypes = (c_void_p, c_uint)
-        self.fluid_synth_sfreload.restype = c_int
-        
-        self.fluid_synth_sfunload = self.handle.fluid_synth_sfunload
-        self.fluid_synth_sfunload.argtypes = (c_void_p, c_uint, c_int)
-        self.fluid_synth_sfunload.restype = c_int
-        
-        self.fluid_synth_noteon = self.handle.fluid_synth_noteon
-        self.fluid_synth_noteon.argtypes = (c_void_p, c_int, c_int, c_int)
-        self.fluid_synth_noteon.restype = c_int
-        
-        self.fluid_synth_noteoff = self.handle.fluid_synth_noteoff
-        self.fluid_synth_noteoff.argtypes = (c_void_p, c_int, c_int)
-        self.fluid_synth_noteoff.restype = c_int
-        
-        self.fluid_synth_cc = self.handle.fluid_synth_cc
-        self.fluid_synth_cc.argtypes = (c_void_p, c_int, c_int, c_int)
-        self.fluid_synth_cc.restype = c_int
-        
-        self.fluid_synth_pitch_bend = self.handle.fluid_synth_pitch_bend
-        self.fluid_synth_pitch_bend.argtypes = (c_void_p, c_int, c_int)
-        self.fluid_synth_pitch_bend.restype = c_int
-        
-        self.fluid_synth_pitch_wheel_sens = self.handle.fluid_synth_pitch_wheel_sens
-        self.fluid_synth_pitch_wheel_sens.argtypes = (c_void_p, c_int, c_int)
-        self.fluid_synth_pitch_wheel_sens.restype = c_int
-        
-        self.fluid_synth_program_change = self.handle.fluid_synth_program_change
-        self.fluid_synth_program_change.argtypes = (c_void_p, c_int, c_int)
-        self.fluid_synth_program_change.restype = c_int
-        
-        self.fluid_synth_bank_select = self.handle.fluid_synth_bank_select
-        self.fluid_synth_bank_select.argtypes = (c_void_p, c_int, c_int)
-        self.fluid_synth_bank_select.restype = c_int
-        
+        'synth': (
+            ( 'new_fluid_synth', (c_void_p,), c_void_p ),
+            ( 'delete_fluid_synth', (c_void_p,), None ),
+            ( 'fluid_synth_sfload', (c_void_p, c_char_p, c_int), c_int ),
+            ( 'fluid_synth_sfreload', (c_void_p, c_uint), c_int ),
+            ( 'fluid_synth_sfunload', (c_void_p, c_uint, c_int), c_int ),
+            ( 'fluid_synth_add_sfont', (c_void_p, c_void_p), c_int ),
+            ( 'fluid_synth_remove_sfont', (c_void_p, c_void_p), c_int ),
+            ( 'fluid_synth_get_sfont_by_id', (c_void_p, c_uint), c_void_p ),
+            ( 'fluid_synth_get_sfont', (c_void_p, c_uint), c_void_p ),
+            ( 'fluid_synth_sfcount', (c_void_p,), c_int ),
+            ( 'fluid_synth_noteon', (c_void_p, c_int, c_int, c_int), c_int ),
+            ( 'fluid_synth_noteoff', (c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_cc', (c_void_p, c_int, c_int, c_int), c_int ),
+            ( 'fluid_synth_pitch_bend', (c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_pitch_wheel_sens', (c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_program_change', (c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_bank_select', (c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_program_select', (c_void_p, c_int, c_uint, c_uint, c_uint), c_int ),
+            ( 'fluid_synth_system_reset', (c_void_p,), c_int ),
+            ( 'fluid_synth_write_float', (c_void_p, c_int, c_void_p, c_int, c_int, c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_write_s16', (c_void_p, c_int, c_void_p, c_int, c_int, c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_process', (c_void_p, c_int, c_int, POINTER(POINTER(c_float)), c_int, POINTER(POINTER(c_float))), c_int ),
+            ( 'fluid_synth_count_audio_channels', (c_void_p,), c_int ),
+            ( 'fluid_synth_count_audio_groups', (c_void_p,), c_int ),
+            ( 'fluid_synth_count_midi_channels', (c_void_p,), c_int ),
+            ( 'fluid_synth_get_cpu_load', (c_void_p,), c_double ),
+            ( 'fluid_synth_get_active_voice_count', (c_void_p,), c_int ),
+            ( 'fluid_synth_get_polyphony', (c_void_p,), c_int ),
+            ( 'fluid_synth_set_polyphony', (c_void_p, c_int), c_int ),
+            ( 'fluid_synth_set_interp_method', (c_void_p, c_int, c_int), c_int ),
+            ( 'fluid_synth_get_voicelist', (c_void_p, c_void_p, c_int, c_int), None ),
+        ),
+        # From sfont.h
+        'sfont': (
+            ( 'fluid_sfont_get_id', (c_void_p,), c_int ),
+            ( 'fluid_sfont_iteration_start', (c_void_p,), None ),
+            ( 'fluid_sfont_iteration_next', (c_void_p,), c_void_p ),
+            ( 'fluid_preset_get_name', (c_void_p,), c_char_p ),
+            ( 'fluid_preset_get_banknum', (c_void_p,), c_int ),
+            ( 'fluid_preset_get_num', (c_void_p,), c_int ),
+        ),
+        # From voice.h
+        'voice': (
+            ( 'fluid_voice_get_channel', (c_void_p,), c_int ),
+            ( 'fluid_voice_is_playing', (c_void_p,), c_int ),
+        ),
         # From audio.h
-        self.new_fluid_audio_driver = self.handle.new_fluid_audio_driver
-        self.new_fluid_audio_driver.argtypes = (c_void_p, c_void_p)
-        self.new_fluid_audio_driver.restype = c_void_p
-        
-        self.delete_fluid_audio_driver = self.handle.delete_fluid_audio_driver
-        self.delete_fluid_audio_driver.argtypes = (c_void_p,)
-        self.delete_fluid_audio_driver.restype = None
-        
+        'audio': (
+            ( 'new_fluid_audio_driver', (c_void_p, c_void_p), c_void_p ),
+            ( 'new_fluid_audio_driver2', (c_void_p, fluid_audio_func_t, c_void_p), c_void_p ),
+            ( 'delete_fluid_audio_driver', (c_void_p,), None ),
+        ),
         # From midi.h
-        self.new_fluid_player = self.handle.new_fluid_player
-        self.new_fluid_player.argtypes = (c_void_p,)
-        self.new_fluid_player.restype = c_void_p
-        
-        self.delete_fluid_player = self.handle.delete_fluid_player
-        self.delete_fluid_player.argtypes = (c_void_p,)
-        self.delete_fluid_player.restype = c_int
-        
-        self.fluid_player_add = self.handle.fluid_player_add
-        self.fluid_player_add.argtypes = (c_void_p, c_char_p)
-        self.fluid_player_add.restype = c_int
-        
-        self.fluid_player_play = self.handle.fluid_player_play
-        self.fluid_player_play.argtypes = (c_void_p,)
-        self.fluid_player_play.restype = c_int
-        
-        self.fluid_player_stop = self.handle.fluid_player_stop
-        self.fluid_player_stop.argtypes = (c_void_p,)
-        self.fluid_player_stop.restype = c_int
-        
-        self.fluid_player_join = self.handle.fluid_player_join
-        self.fluid_player_join.argtypes = (c_void_p,)
-        self.fluid_player_join.restype = c_int
-        
+        'midi': (
+            ( 'new_fluid_player', (c_void_p,), c_void_p ),
+            ( 'delete_fluid_player', (c_void_p,), c_int ),
+            ( 'fluid_player_add', (c_void_p, c_char_p), c_int ),
+            ( 'fluid_player_play', (c_void_p,), c_int ),
+            ( 'fluid_player_stop', (c_void_p,), c_int ),
+            ( 'fluid_player_join', (c_void_p,), c_int ),
+            ( 'fluid_player_get_status', (c_void_p,), c_int ),
+        ),
         # From event.h
-        self.new_fluid_event = self.handle.new_fluid_event
-        self.new_fluid_event.argtypes = ()
-        self.new_fluid_event.restype = c_void_p
-        
-        self.delete_fluid_event = self.handle.delete_fluid_event
-        self.delete_fluid_event.argtypes = (c_void_p,)
-        self.delete_fluid_event.restype = None
-        
-        self.fluid_event_timer = self.handle.fluid_event_timer
-        self.fluid_event_timer.argtypes = (c_void_p, c_void_p)
-        self.fluid_event_timer.restype = None
-        
-        self.fluid_event_volume = self.handle.fluid_event_volume
-        self.fluid_event_volume.argtypes = c_void_p, c_int, c_short
-        self.fluid_event_volume.restype = None
-        
-        self.fluid_event_note = self.handle.fluid_event_note
-        self.fluid_event_note.argtypes = (c_void_p, c_int, c_short, c_short, c_uint)
-        self.fluid_event_note.restype = None
-        
-        self.fluid_event_noteon = self.handle.fluid_event_noteon
-        self.fluid_event_noteon.argtypes = (c_void_p, c_int, c_short, c_short)
-        self.fluid_event_noteon.restype = None
-        
-        self.fluid_event_noteoff = self.handle.fluid_event_noteoff
-        self.fluid_event_noteoff.argtypes = (c_void_p, c_int, c_short)
-        self.fluid_event_noteoff.restype = None
-        
-        self.fluid_event_pitch_bend = self.handle.fluid_event_pitch_bend
-        self.fluid_event_pitch_bend.argtypes = c_void_p, c_int, c_int
-        self.fluid_event_pitch_bend.restype = None
-        
-        self.fluid_event_pitch_wheelsens = self.handle.fluid_event_pitch_wheelsens
-        self.fluid_event_pitch_wheelsens.argtypes = c_void_p, c_int, c_short
-        self.fluid_event_pitch_wheelsens.restype = None
-        
-        self.fluid_event_program_change = self.handle.fluid_event_program_change
-        self.fluid_event_program_change.argtypes = c_void_p, c_int, c_short
-        self.fluid_event_program_change.restype = None
-        
-        self.fluid_event_get_source = self.handle.fluid_event_get_source
-        self.fluid_event_get_source.argtypes = (c_void_p,)
-        self.fluid_event_get_source.restype = c_short
-        
-        self.fluid_event_set_source = self.handle.fluid_event_set_source
-        self.fluid_event_set_source.argtypes = (c_void_p, c_short)
-        self.fluid_event_set_source.restype = None
-        
-        self.fluid_event_get_dest = self.handle.fluid_event_get_dest
-        self.fluid_event_get_dest.argtypes = (c_void_p,)
-        self.fluid_event_get_dest.restype = c_short
-        
-        self.fluid_event_set_dest = self.handle.fluid_event_set_dest
-        self.fluid_event_set_dest.argtypes = (c_void_p, c_short)
-        self.fluid_event_set_dest.restype = None
-        
+        'event': (
+            ( 'new_fluid_event', (), c_void_p ),
+            ( 'delete_fluid_event', (c_void_p,), None ),
+            ( 'fluid_event_timer', (c_void_p, c_void_p), None ),
+            ( 'fluid_event_volume', (c_void_p, c_int, c_short), None ),
+            ( 'fluid_event_note', (c_void_p, c_int, c_short, c_short, c_uint), None ),
+            ( 'fluid_event_noteon', (c_void_p, c_int, c_short, c_short), None ),
+            ( 'fluid_event_noteoff', (c_void_p, c_int, c_short), None ),
+            ( 'fluid_event_all_notes_off', (c_void_p, c_int), None ),
+            ( 'fluid_event_control_change', (c_void_p, c_int, c_short, c_short), None ),
+            ( 'fluid_event_pitch_bend', (c_void_p, c_int, c_int), None ),
+            ( 'fluid_event_pitch_wheelsens', (c_void_p, c_int, c_short), None ),
+            ( 'fluid_event_program_change', (c_void_p, c_int, c_short), None ),
+            ( 'fluid_event_get_source', (c_void_p,), c_short ),
+            ( 'fluid_event_set_source', (c_void_p, c_short), None ),
+            ( 'fluid_event_get_dest', (c_void_p,), c_short ),
+            ( 'fluid_event_get_type', (c_void_p,), c_int ),
+            ( 'fluid_event_get_channel', (c_void_p,), c_int ),
+            ( 'fluid_event_get_key', (c_void_p,), c_short ),
+            ( 'fluid_event_get_velocity', (c_void_p,), c_short ),
+            ( 'fluid_event_get_control', (c_void_p,), c_short ),
+            ( 'fluid_event_get_value', (c_void_p,), c_short ),
+            ( 'fluid_event_get_pitch', (c_void_p,), c_int ),
+            ( 'fluid_event_get_data', (c_void_p,), c_void_p ),
+            ( 'fluid_event_set_dest', (c_void_p, c_short), None ),
+        ),
         # From seq.h
-        fluid_event_callback_t = CFUNCTYPE(None, c_uint, c_void_p, c_void_p, c_void_p)
-        
-        self.new_fluid_sequencer = self.handle.new_fluid_sequencer
-        self.new_fluid_sequencer.argtypes = ()
-        self.new_fluid_sequencer.restype = c_void_p
-        
-        self.delete_fluid_sequencer = self.handle.delete_fluid_sequencer
-        self.delete_fluid_sequencer.argtypes = (c_void_p,)
-        self.delete_fluid_sequencer.restype = None
-        
-        self.fluid_sequencer_count_clients = self.handle.fluid_sequencer_count_clients
-        self.fluid_sequencer_count_clients.argtypes = (c_void_p,)
-        self.fluid_sequencer_count_clients.restype = c_int
-        
-        self.fluid_sequencer_get_client_id = self.handle.fluid_sequencer_get_client_id
-        self.fluid_sequencer_get_client_id.argtypes = (c_void_p, c_int)
-        self.fluid_sequencer_get_client_id.restype = c_int
-        
-        self.fluid_sequencer_get_client_name = self.handle.fluid_sequencer_get_client_name
-        self.fluid_sequencer_get_client_name.argtypes = (c_void_p, c_int)
-        self.fluid_sequencer_get_client_name.restype = c_char_p
-        
-        self.fluid_sequencer_client_is_dest = self.handle.fluid_sequencer_client_is_dest
-        self.fluid_sequencer_client_is_dest.argtypes = (c_void_p, c_int)
-        self.fluid_sequencer_client_is_dest.restype = c_int
-        
-        self.fluid_sequencer_register_client = self.handle.fluid_sequencer_register_client
-        self.fluid_sequencer_register_client.argtypes = (c_void_p, c_char_p, fluid_event_callback_t, c_void_p)
-        self.fluid_sequencer_register_client.restype = c_short
-        
-        self.fluid_sequencer_unregister_client = self.handle.fluid_sequencer_unregister_client
-        self.fluid_sequencer_unregister_client.argtypes = (c_void_p, c_short)
-        self.fluid_sequencer_unregister_client.restype = None
-        
-        self.fluid_sequencer_send_now = self.handle.fluid_sequencer_send_now
-        self.fluid_sequencer_send_now.argtypes = (c_void_p, c_void_p)
-        self.fluid_sequencer_send_now.restype = None
-        
-        self.fluid_sequencer_send_at = self.handle.fluid_sequencer_send_at
-        self.fluid_sequencer_send_at.argtypes = (c_void_p, c_void_p, c_uint, c_int)
-        self.fluid_sequencer_send_at.restype = c_int
-        
-        self.fluid_sequencer_get_time_scale = self.handle.fluid_sequencer_get_time_scale
-        self.fluid_sequencer_get_time_scale.argtypes = (c_void_p,)
-        self.fluid_sequencer_get_time_scale.restype = c_double
-        
-        self.fluid_sequencer_set_time_scale = self.handle.fluid_sequencer_set_time_scale
-        self.fluid_sequencer_set_time_scale.argtypes = (c_void_p, c_double)
-        self.fluid_sequencer_set_time_scale.restype = None
-        
-        self.fluid_sequencer_get_tick = self.handle.fluid_sequencer_get_tick
-        self.fluid_sequencer_get_tick.argtypes = (c_void_p,)
-        self.fluid_sequencer_get_tick.restype = c_uint
-        
+        'seq': (
+            ( 'new_fluid_sequencer', (), c_void_p ),
+            ( 'delete_fluid_sequencer', (c_void_p,), None ),
+            ( 'fluid_sequencer_count_clients', (c_void_p,), c_int ),
+            ( 'fluid_sequencer_get_client_id', (c_void_p, c_int), c_int ),
+            ( 'fluid_sequencer_get_client_name', (c_void_p, c_int), c_char_p ),
+            ( 'fluid_sequencer_client_is_dest', (c_void_p, c_int), c_int ),
+            ( 'fluid_sequencer_register_client', (c_void_p, c_char_p, fluid_event_callback_t, c_void_p), c_short ),
+            ( 'fluid_sequencer_unregister_client', (c_void_p, c_short), None ),
+            ( 'fluid_sequencer_send_now', (c_void_p, c_void_p), None ),
+            ( 'fluid_sequencer_send_at', (c_void_p, c_void_p, c_uint, c_int), c_int ),
+            ( 'fluid_sequencer_remove_events', (c_void_p, c_short, c_short, c_int), None ),
+            ( 'fluid_sequencer_get_time_scale', (c_void_p,), c_double ),
+            ( 'fluid_sequencer_set_time_scale', (c_void_p, c_double), None ),
+            ( 'fluid_sequencer_get_tick', (c_void_p,), c_uint ),
+        ),
         # From seqbind.h
-        self.fluid_sequencer_register_fluidsynth = self.handle.fluid_sequencer_register_fluidsynth
-        self.fluid_sequencer_register_fluidsynth.argtypes = (c_void_p, c_void_p)
-        self.fluid_sequencer_register_fluidsynth.restype = c_short
+        'seqbind': (
+            ( 'fluid_sequencer_register_fluidsynth', (c_void_p, c_void_p), c_short ),
+        ),
+    }
+    
+    FAILURES = {
+        'FAILED': (
+            'fluid_settings_get_type',
+            'fluid_synth_sfload', 'fluid_synth_sfreload', 'fluid_synth_sfunload',
+            'fluid_synth_add_sfont', 'fluid_synth_noteon', 'fluid_synth_noteoff', 'fluid_synth_cc',
+            'fluid_synth_pitch_bend', 'fluid_synth_pitch_wheel_sens', 'fluid_synth_program_change',
+            'fluid_synth_bank_select', 'fluid_synth_program_select', 'fluid_synth_system_reset',
+            'fluid_synth_write_float', 'fluid_synth_write_s16', 'fluid_synth_process',
+            'fluid_synth_set_polyphony', 'fluid_synth_set_interp_method',
+            'fluid_player_add', 'fluid_player_play', 'fluid_player_stop', 'fluid_player_join',
+            'fluid_sequencer_get_client_id', 'fluid_sequencer_register_client',
+            'fluid_sequencer_send_at', 'fluid_sequencer_register_fluidsynth',
+        ),
+        'NULL': (
+            'new_fluid_settings', 'new_fluid_synth', 'fluid_synth_get_sfont_by_id',
+            'fluid_synth_get_sfont', 'new_fluid_audio_driver', 'new_fluid_audio_driver2',
+            'new_fluid_player', 'new_fluid_event', 'new_fluid_sequencer',
+        ),
+        'SETTINGS': (
+            'fluid_settings_getnum', 'fluid_settings_getint', 'fluid_settings_getstr',
+            'fluid_settings_copystr', 'fluid_settings_setnum', 'fluid_settings_setint',
+            'fluid_settings_setstr',
+        ),
+    }
+
+    CACHE_ENV = 'PYFLUIDSYNTH3_CACHE'
+    LDCONFIG_CACHE = '/etc/ld.so.cache'
+    LIBRARY_ENV = 'PYFLUIDSYNTH3_LIBRARY'
+    LIBRARY_NAMES = [ 'fluidsynth', 'libfluidsynth', 'libfluidsynth-1' ]
+    LIBRARY_REGEX = r'.*fluidsynth(-\d+)?\.(dll|so(\.\d+)?)$'
+    SEARCH_ENV = [ 'PATH', 'LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH' ]
+    
+    _library_cache = {}
+    
+    stats = None
+    _version = None
+    
+    _SIGNATURES = { name: ( argtypes, restype ) 
+                    for group in FUNCTIONS.values() for name, argtypes, restype in group }
+    _FAILURES = { name: convention for convention, names in FAILURES.items() for name in names }
+    
+    def __init__( self, library_path = None, instrument = False ):
+        ''' Creates a handle to the FluidSynth library. If a path is given it tries to use this path
+        if not it searches for the library. If instrument is true call statistics are recorded. '''
+        self.handle = self.load_library( library_path )
+        if instrument:
+            self.instrument()
+        
+    def __getattr__( self, name ):
+        ''' Binds the FluidSynth function with the given name on first access. The bound function is
+        stored as instance attribute so later accesses don't reach this method. '''
+        try:
+            argtypes, restype = self._SIGNATURES[name]
+        except KeyError:
+            raise AttributeError( name )
+        
+        func = getattr( self.handle, name )
+        func.argtypes = argtypes
+        func.restype = restype
+        
+        if self.stats is not None:
+            func = self.__instrumented( name, func )
+        
+        setattr( self, name, func )
+        return func
+    
+    @property
+    def version( self ):
+        ''' Returns the version of the loaded library as tuple (major, minor, micro). Libraries
+        without fluid_version() are taken as version 1.0.0. FluidSynth 1.x and 2.x differ in some
+        result conventions, e.g. settings functions return 1 on success in 1.x but FLUID_OK in
+        2.x. '''
+        if self._version is None:
+            try:
+                fluid_version = self.fluid_version
+            except AttributeError:
+                self._version = ( 1, 0, 0 )
+            else:
+                major, minor, micro = c_int(), c_int(), c_int()
+                fluid_version( byref(major), byref(minor), byref(micro) )
+                self._version = ( major.value, minor.value, micro.value )
+        return self._version
+
+    def instrument( self, enabled = True ):
+        ''' Enables or disables call statistics and resets them. Functions which were already bound
+        are bound again on next access. Objects which keep references to bound functions (e.g. 
+        running sequencer clients) are not affected. '''
+        self.stats = {} if enabled else None
+        for name in self._SIGNATURES:
+            self.__dict__.pop( name, None )
+    
+    def statistics( self ):
+        ''' Returns a copy of the call statistics: function name -> dictionary with the number of 
+        calls and failures and the total and maximal latency in seconds. '''
+        return { name: dict( stats ) for name, stats in ( self.stats or {} ).items() }
+    
+    def statistics_prometheus( self, prefix = 'fluidsynth' ):
+        ''' Returns the call statistics in the Prometheus text exposition format. '''
+        METRICS = [ ( 'calls_total', 'calls', 'counter', 'Number of calls.' ),
+                    ( 'call_failures_total', 'failures', 'counter', 'Number of failed calls.' ),
+                    ( 'call_seconds_total', 'total', 'counter', 'Total time spent in calls.' ),
+                    ( 'call_seconds_max', 'max', 'gauge', 'Maximal time spent in one call.' ) ]
+        
+        statistics = self.statistics()
+        lines = []
+        for metric, key, kind, help in METRICS:
+            metric = '{0}_{1}'.format( prefix, metric )
+            lines.append( '# HELP {0} {1}'.format(metric, help) )
+            lines.append( '# TYPE {0} {1}'.format(metric, kind) )
+            for name in sorted( statistics ):
+                lines.append( '{0}{{function="{1}"}} {2}'.format(metric, name, statistics[name][key]) )
+        
+        return '\n'.join( lines ) + '\n'
+    
+    def __instrumented( self, name, func ):
+        ''' Wraps a function to record its call statistics. '''
+        stats = self.stats.setdefault( name, { 'calls': 0, 'failures': 0, 'total': 0.0, 'max': 0.0 } )
+        
+        convention = self._FAILURES.get( name )
+        if convention == 'FAILED':
+            is_failure = lambda result: result == constants.FAILED
+        elif convention == 'NULL':
+            is_failure = lambda result: result is None
+        elif convention == 'SETTINGS':
+            ok = constants.OK if self.version[0] >= 2 else constants.TRUE
+            is_failure = lambda result: result != ok
+        else:
+            is_failure = lambda result: False
+        
+        perf_counter = time.perf_counter
+        
+        def instrumented( *args ):
+            start = perf_counter()
+            failed = True
+            try:
+                result = func( *args )
+                failed = is_failure( result )
+                return result
+            finally:
+                elapsed = perf_counter() - start
+                stats['calls'] += 1
+                stats['total'] += elapsed
+                if elapsed > stats['max']:
+                    stats['max'] = elapsed
+                if failed:
+                    stats['failures'] += 1
+        
+        instrumented.__name__ = name
+        return instrumented
+    
+    def prewarm( self, *groups ):
+        ''' Binds all functions of the given groups (see FUNCTIONS) or of all groups if none is 
+        given. Functions missing in the loaded library are skipped, their names are returned. '''
+        missing = []
+        for group in groups or self.FUNCTIONS:
+            for name, argtypes, restype in self.FUNCTIONS[group]:
+                try:
+                    getattr( self, name )
+                except AttributeError:
+                    missing.append( name )
+        return missing
 
     def load_library( self, library_path ):
         ''' Create new FluidSynth handle with given library path. If no specific path is given
-        or the file doesn't exist this class will try to find the library based on some basic 
-        heuristics. '''
+        or the file doesn't exist the path from the environment variable LIBRARY_ENV is used or 
+        this class will try to find the library based on some basic heuristics (see 
+        locate_library()). '''
+        cached = False
+        if not self.__is_file( library_path ):
+            library_path = os.environ.get( self.LIBRARY_ENV )
+        if not library_path:
+            library_path, cached = self.locate_library()
+
+        # Use hopefully found library path to load library.
+        self.library_path = library_path
+        try:
+            return cdll.LoadLibrary( self.library_path )
+        except OSError:
+            if not cached:
+                raise
+        
+        # The cached path is stale, search again.
+        self.clear_library_cache()
+        self.library_path, cached = self.locate_library()
+        return cdll.LoadLibrary( self.library_path )
+    
+    @classmethod
+    def locate_library( cls ):
+        ''' Search the library first in the working directory and then in the global context. 
+        Returns the library path and true if it was taken from the cache else false. '''
+        key = '\0'.join( [os.getcwd()] + [os.environ.get( name, '' ) for name in cls.SEARCH_ENV] )
+        
+        # Search library in caches.
+        if key not in cls._library_cache:
+            cls._library_cache.update( cls.__read_cache() )
+        
+        entry = cls._library_cache.get( key )
+        if entry and entry['mtime'] == cls.__mtime( entry['path'] ):
+            return entry['path'], True
         
         # Search library in local context.
-        if not self.__is_file( library_path ):
-            for file in os.listdir( '.' ):
-                if re.search( self.LIBRARY_REGEX, file ):
-                    library_path = os.path.abspath( file )
-                    break
+        library_path = None
+        for file in os.listdir( '.' ):
+            if re.search( cls.LIBRARY_REGEX, file ):
+                library_path = os.path.abspath( file )
+                break
         
         # Search library in global context.
-        if not self.__is_file( library_path ):
-            for name in self.LIBRARY_NAMES:
+        if not library_path:
+            for name in cls.LIBRARY_NAMES:
                 library_path = find_library( name )
                 if library_path:
                     break
-
-        # Use hopefully found library path to load library.
-        self.library_path = library_path
-        return cdll.LoadLibrary( self.library_path )
+        
+        if library_path:
+            cls._library_cache[key] = { 'path': library_path, 'mtime': cls.__mtime( library_path ) }
+            cls.__write_cache()
+        
+        return library_path, False
+    
+    @classmethod
+    def clear_library_cache( cls ):
+        ''' Invalidate the in-process and on-disk library search cache. '''
+        cls._library_cache.clear()
+        
+        cache_path = os.environ.get( cls.CACHE_ENV )
+        if cache_path and os.path.isfile( cache_path ):
+            os.remove( cache_path )
+    
+    @classmethod
+    def __read_cache( cls ):
+        ''' Returns the on-disk library search cache or an empty dictionary. '''
+        cache_path = os.environ.get( cls.CACHE_ENV )
+        if not cache_path:
+            return {}
+        
+        try:
+            with open( cache_path ) as cache_file:
+                return json.load( cache_file )
+        except ( OSError, ValueError ):
+            return {}
+    
+    @classmethod
+    def __write_cache( cls ):
+        ''' Atomically replace the on-disk library search cache with the in-process one. '''
+        cache_path = os.environ.get( cls.CACHE_ENV )
+        if not cache_path:
+            return
+        
+        temp_path = '{0}.{1}'.format( cache_path, os.getpid() )
+        try:
+            with open( temp_path, 'w' ) as cache_file:
+                json.dump( cls._library_cache, cache_file )
+            os.replace( temp_path, cache_path )
+        except OSError:
+            pass
+    
+    @classmethod
+    def __mtime( cls, path ):
+        ''' Returns the modification time of a library path. Plain library names as returned by
+        ctypes.util.find_library() are validated against the dynamic linker cache. '''
+        if not os.path.isfile( path ):
+            path = cls.LDCONFIG_CACHE
+        try:
+            return os.path.getmtime( path )
+        except OSError:
+            return None
     
-    def __is_file( self, path ):
+    @staticmethod
+    def __is_file( path ):
         ''' Checks if the given string is a file path. '''
         return path and os.path.isfile( path )
\ No newline at end of file
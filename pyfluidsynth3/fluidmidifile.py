@@ -0,0 +1,286 @@
+from . import constants, fluiderror
+
+import bisect
+import collections
+import heapq
+import mmap
+import struct
+import threading
+
+FluidMidiEvent = collections.namedtuple( 'FluidMidiEvent', 'time type channel p1 p2' )
+FluidMidiEvent.__doc__ = ''' Channel message of a MIDI file. Time is given in seconds from the start
+of the song, type is one of constants.NOTE_ON, NOTE_OFF, CONTROL_CHANGE, PROGRAM_CHANGE and
+PITCH_BEND. '''
+
+class FluidMidiFile():
+    ''' Lazy pure Python reader of Standard MIDI Files (format 0, 1 and 2). The file is memory mapped
+    and only the positions of its tracks are read up front. events() parses the tracks on the fly,
+    merges them and converts delta times through the tempo map to seconds, so memory stays bounded
+    for arbitrarily long files. While parsing, checkpoints of the parser state are stored every
+    CHECKPOINT_INTERVAL seconds which makes later seeks jump close to their target. Checkpoints are
+    shared by all generators of a file, which may run in different threads.
+
+    Only note on/off, control change, program change and pitch bend messages are reported. Other
+    channel messages, system exclusive messages and meta events (except tempo changes) are skipped.
+
+    Example:
+    midi = FluidMidiFile( 'song.mid' )
+    for event in midi.events( start = 30.0, channels = {0, 1} ):
+        print( event.time, event.type, event.channel, event.p1, event.p2 )
+
+    Constants:
+    CHECKPOINT_INTERVAL -- Seconds between two parser checkpoints.
+    DRUM_CHANNEL -- Channel which is never transposed.
+    TEMPO_DEFAULT -- Microseconds per quarter note until the first tempo change.
+
+    Member:
+    division -- Ticks per quarter note or (frames per second, ticks per frame) for SMPTE (int/tuple).
+    format -- The MIDI file format (int).
+    path -- The path of the file (string).
+    tracks -- Start and end offsets of all track chunks (list).
+    _checkpoints -- Parser states: (seconds, state) sorted by time (list).
+    _checkpoints_lock -- Guards the checkpoints (threading.Lock).
+    _data -- The memory mapped file (mmap.mmap).
+    _file -- The open file (file).
+    '''
+
+    CHECKPOINT_INTERVAL = 5.0
+    DRUM_CHANNEL = 9
+    TEMPO_DEFAULT = 500000
+
+    # Status and meta event bytes.
+    _META = 0xFF
+    _SYSEX = 0xF0
+    _SYSEX_ESCAPE = 0xF7
+    _META_TEMPO = 0x51
+    _META_END = 0x2F
+
+    def __init__( self, path ):
+        ''' Opens the MIDI file with the given path and reads its header and track positions. Raises
+        a FluidError if the file isn't a Standard MIDI File. '''
+        self.path = path
+        self._file = open( path, 'rb' )
+        try:
+            self._data = mmap.mmap( self._file.fileno(), 0, access = mmap.ACCESS_READ )
+        except ValueError:
+            self._file.close()
+            raise fluiderror.FluidError( "Empty MIDI file {0}".format(path) )
+        self._checkpoints = []
+        self._checkpoints_lock = threading.Lock()
+
+        data = self._data
+        if data[:4] != b'MThd' or len( data ) < 14:
+            self.close()
+            raise fluiderror.FluidError( "Not a MIDI file {0}".format(path) )
+
+        length, self.format, count, division = struct.unpack( '>IHHH', data[4:14] )
+        if division & 0x8000:
+            self.division = ( 256 - (division >> 8), division & 0xFF )
+        else:
+            self.division = division
+
+        self.tracks = []
+        pos = 8 + length
+        while pos + 8 <= len( data ) and len( self.tracks ) < count:
+            chunk, length = struct.unpack( '>4sI', data[pos:pos + 8] )
+            if chunk == b'MTrk':
+                self.tracks.append( (pos + 8, min(pos + 8 + length, len(data))) )
+            pos += 8 + length
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+    def close( self ):
+        ''' Closes the file. '''
+        self._data.close()
+        self._file.close()
+
+    def duration( self ):
+        ''' Returns the length of the song in seconds. Parses the whole file once. '''
+        end = 0.0
+        for event in self.events():
+            end = event.time
+        return end
+
+    def events( self, start = 0.0, transpose = 0, channels = None, tracks = None ):
+        ''' Returns a generator of the channel messages (FluidMidiEvent) of all or the given tracks
+        sorted by time. If start is given parsing continues at the nearest checkpoint before start
+        and the state of every channel at start (controllers, programs and pitch bend) is reported
+        first, all at time start. Notes are transposed by the given number of semitones except on
+        the drum channel. If channels is given only messages of these channels are reported. '''
+        state = self.__checkpoint( start ) if tracks is None else None
+        if state is None:
+            state = self.__initial_state( tracks )
+
+        heap, tempo_tick, tempo_seconds, seconds_per_tick, chase = state
+        heap = list( heap )
+        chase = dict( chase )
+
+        record = tracks is None
+        next_checkpoint = self.__next_checkpoint()
+        skipping = start > 0.0
+
+        while heap:
+            tick, track, pos, running = heap[0]
+            seconds = tempo_seconds + ( tick - tempo_tick ) * seconds_per_tick
+
+            if record and seconds >= next_checkpoint:
+                self.__record( seconds, (tuple(heap), tempo_tick, tempo_seconds, seconds_per_tick,
+                                         dict(chase)) )
+                next_checkpoint = self.__next_checkpoint()
+
+            if skipping and seconds >= start:
+                skipping = False
+                for ( kind, channel, key ), value in sorted( chase.items() ):
+                    if kind == constants.CONTROL_CHANGE:
+                        p1, p2 = key, value
+                    else:
+                        p1, p2 = value, 0
+                    event = self.__event( start, kind, channel, p1, p2, transpose, channels )
+                    if event:
+                        yield event
+
+            # Parse the event body and advance the track.
+            status, a, b, pos, running, end = self.__parse( pos, running, self.tracks[track][1] )
+            if end:
+                heapq.heappop( heap )
+            else:
+                delta, pos = self.__varlen( pos )
+                heapq.heapreplace( heap, (tick + delta, track, pos, running) )
+
+            if status == self._META:
+                if a == self._META_TEMPO and len( b ) == 3:
+                    tempo_seconds, tempo_tick = seconds, tick
+                    seconds_per_tick = self.__seconds_per_tick( int.from_bytes(b, 'big') )
+                continue
+            if status is None:
+                continue
+
+            kind = status & 0xF0
+            channel = status & 0x0F
+
+            if kind == constants.NOTE_ON and b == 0:
+                kind = constants.NOTE_OFF
+            elif kind == constants.CONTROL_CHANGE:
+                chase[(kind, channel, a)] = b
+            elif kind == constants.PROGRAM_CHANGE:
+                chase[(kind, channel, 0)] = a
+            elif kind == constants.PITCH_BEND:
+                a = ( b << 7 ) | a
+                chase[(kind, channel, 0)] = a
+            elif kind != constants.NOTE_OFF and kind != constants.NOTE_ON:
+                continue
+
+            if not skipping:
+                if kind == constants.PROGRAM_CHANGE or kind == constants.PITCH_BEND:
+                    b = 0
+                event = self.__event( seconds, kind, channel, a, b, transpose, channels )
+                if event:
+                    yield event
+
+    def __event( self, seconds, kind, channel, p1, p2, transpose, channels ):
+        ''' Creates an event after applying channel filter and transposition. Returns None if the
+        event is filtered or transposed out of range. '''
+        if channels is not None and channel not in channels:
+            return None
+
+        if transpose and channel != self.DRUM_CHANNEL and \
+           ( kind == constants.NOTE_ON or kind == constants.NOTE_OFF ):
+            p1 += transpose
+            if not 0 <= p1 <= 127:
+                return None
+
+        return FluidMidiEvent( seconds, kind, channel, p1, p2 )
+
+    def __checkpoint( self, start ):
+        ''' Returns the latest parser state before start or None. '''
+        if start <= 0.0:
+            return None
+        with self._checkpoints_lock:
+            index = bisect.bisect_right( [seconds for seconds, state in self._checkpoints], start )
+            return self._checkpoints[index - 1][1] if index else None
+
+    def __record( self, seconds, state ):
+        ''' Stores a parser state unless another generator got past it already. '''
+        with self._checkpoints_lock:
+            if not self._checkpoints or seconds > self._checkpoints[-1][0]:
+                # Times are unique, so the states are never compared.
+                bisect.insort( self._checkpoints, (seconds, state) )
+
+    def __next_checkpoint( self ):
+        ''' Returns the time of the next checkpoint to record. '''
+        with self._checkpoints_lock:
+            if not self._checkpoints:
+                return 0.0
+            return self._checkpoints[-1][0] + self.CHECKPOINT_INTERVAL
+
+    def __initial_state( self, tracks ):
+        ''' Returns the parser state at the start of the song. '''
+        heap = []
+        for track, ( begin, end ) in enumerate( self.tracks ):
+            if tracks is not None and track not in tracks:
+                continue
+            if begin < end:
+                delta, pos = self.__varlen( begin )
+                heap.append( (delta, track, pos, None) )
+        heapq.heapify( heap )
+
+        return heap, 0, 0.0, self.__seconds_per_tick( self.TEMPO_DEFAULT ), {}
+
+    def __seconds_per_tick( self, tempo ):
+        ''' Returns the length of a tick in seconds for the given tempo (microseconds per quarter
+        note). SMPTE based files don't depend on the tempo. '''
+        if isinstance( self.division, tuple ):
+            frames, ticks = self.division
+            return 1.0 / ( frames * ticks )
+        return tempo / ( 1000000.0 * self.division )
+
+    def __varlen( self, pos ):
+        ''' Reads a variable length quantity. Returns the value and the next position. '''
+        data = self._data
+        value = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value = ( value << 7 ) | ( byte & 0x7F )
+            if not byte & 0x80:
+                return value, pos
+
+    def __parse( self, pos, running, end ):
+        ''' Parses the event body (after the delta time) at pos. Returns status, first and second
+        data byte (for meta events: type and data), the position of the next delta time, the
+        running status and true if the track ended. Skipped events have the status None. '''
+        data = self._data
+        status = data[pos]
+
+        if status == self._META:
+            kind = data[pos + 1]
+            length, pos = self.__varlen( pos + 2 )
+            value = data[pos:pos + length]
+            pos += length
+            return status, kind, value, pos, running, kind == self._META_END or pos >= end
+
+        if status == self._SYSEX or status == self._SYSEX_ESCAPE:
+            length, pos = self.__varlen( pos + 1 )
+            pos += length
+            return None, 0, 0, pos, running, pos >= end
+
+        if status & 0x80:
+            running = status
+            pos += 1
+        elif running is None:
+            raise fluiderror.FluidError( "Invalid MIDI data in {0} at {1}".format(self.path, pos) )
+        else:
+            status = running
+
+        if status & 0xF0 in ( 0xC0, 0xD0 ):
+            a, b = data[pos], 0
+            pos += 1
+        else:
+            a, b = data[pos], data[pos + 1]
+            pos += 2
+
+        return status, a, b, pos, running, pos >= end
\ No newline at end of file
@@ -0,0 +1,195 @@
+from . import fluidmidifile
+
+import threading
+
+class FluidMidiScheduler():
+    ''' Plays a MIDI file through a FluidSequencer. Unlike FluidPlayer the file is parsed in Python
+    (see FluidMidiFile), so it can be transposed, filtered by channel and seeked without rewriting
+    it. Only the events of the next lookahead seconds are scheduled at the sequencer. A timer event
+    of a sequencer client refills the window when half of it has been played, so memory stays
+    bounded for arbitrarily long files.
+
+    Example:
+    sequencer = FluidSequencer( handle )
+    dest, name = sequencer.add_synth( synth )
+    scheduler = FluidMidiScheduler( sequencer, dest, 'song.mid', transpose = -2 )
+    scheduler.play()
+    ...
+    scheduler.seek( 60.0 )
+
+    Constants:
+    CHANNELS -- Number of MIDI channels which get an all notes off event on stop and seek.
+    LATENCY_DEFAULT -- Default seconds between play() and the first scheduled event.
+    LOOKAHEAD_DEFAULT -- Default seconds of events scheduled at the sequencer.
+
+    Member:
+    channels -- Only play events of these channels or all if None (set).
+    dest -- Sequencer id of the destination, e.g. returned by FluidSequencer.add_synth() (short).
+    latency -- Seconds between play() and the first scheduled event (float).
+    lookahead -- Seconds of events scheduled at the sequencer (float).
+    midi -- The MIDI file (FluidMidiFile).
+    sequencer -- The sequencer (FluidSequencer).
+    transpose -- Semitones all notes are transposed by (int).
+    _client -- Sequencer client receiving the refill timers (FluidSequencerClient).
+    _end -- Song position up to which events are scheduled in seconds (float).
+    _events -- Generator of the remaining events or None if all are scheduled (generator).
+    _generation -- Incremented on every play and stop to ignore stale timers (int).
+    _last -- Timestamp of the last scheduled event (int).
+    _lock -- Guards the scheduling state against the client worker thread (threading.Lock).
+    _origin -- Sequencer tick of the start position (int).
+    _owned -- True if the MIDI file was opened by this scheduler (boolean).
+    _pending -- First event after the scheduled window or None (FluidMidiEvent).
+    _playing -- True while playing (boolean).
+    _start -- Song position in seconds at _origin (float).
+    _tps -- Ticks per second of the sequencer when playing started (float).
+    '''
+
+    CHANNELS = 16
+    LATENCY_DEFAULT = 0.1
+    LOOKAHEAD_DEFAULT = 4.0
+
+    def __init__( self, sequencer, dest, midi, lookahead = LOOKAHEAD_DEFAULT, transpose = 0,
+                  channels = None, latency = LATENCY_DEFAULT ):
+        ''' Creates a scheduler which plays the given MIDI file (path or FluidMidiFile) to the
+        given destination of the sequencer. '''
+        self.channels = channels
+        self.dest = dest
+        self.latency = latency
+        self.lookahead = lookahead
+        self.sequencer = sequencer
+        self.transpose = transpose
+
+        if isinstance( midi, fluidmidifile.FluidMidiFile ):
+            self.midi = midi
+            self._owned = False
+        else:
+            self.midi = fluidmidifile.FluidMidiFile( midi )
+            self._owned = True
+
+        self._end = 0.0
+        self._events = None
+        self._generation = 0
+        self._last = 0
+        self._lock = threading.Lock()
+        self._origin = 0
+        self._pending = None
+        self._playing = False
+        self._start = 0.0
+        self._tps = 1000.0
+
+        self._client = sequencer.add_client( 'FluidMidiScheduler', self.__on_timer )
+
+    @property
+    def done( self ):
+        ''' Returns true if the whole file has been played. '''
+        return self._events is None and self.sequencer.ticks >= self._last
+
+    @property
+    def playing( self ):
+        ''' Returns true if playing. '''
+        return self._playing and not self.done
+
+    @property
+    def position( self ):
+        ''' Returns the current song position in seconds. '''
+        if not self._playing:
+            return self._start
+        return self._start + max( 0, self.sequencer.ticks - self._origin ) / self._tps
+
+    def play( self, start = 0.0 ):
+        ''' Starts playing at the given song position in seconds. Events scheduled before are
+        removed. '''
+        with self._lock:
+            self.__stop()
+
+            self._tps = self.sequencer.ticks_per_second
+            self._origin = self.sequencer.ticks + int( self.latency * self._tps )
+            self._start = self._end = start
+            self._events = self.midi.events( start, self.transpose, self.channels )
+            self._last = self._origin
+            self._playing = True
+
+            self.__fill()
+
+    def seek( self, seconds ):
+        ''' Continues playing at the given song position in seconds. '''
+        self.play( seconds )
+
+    def stop( self ):
+        ''' Stops playing. All events scheduled for the destination are removed and all sounding
+        notes are stopped. '''
+        with self._lock:
+            self._start = self.position
+            self.__stop()
+
+    def close( self ):
+        ''' Stops playing and unregisters the sequencer client. Closes the MIDI file if it was
+        opened by the scheduler. '''
+        self.stop()
+        self._client.close()
+        if self._owned:
+            self.midi.close()
+
+    def __stop( self ):
+        ''' Removes scheduled events and silences the destination. Expects the lock to be held. '''
+        self._generation += 1
+        if not self._playing:
+            return
+
+        self._playing = False
+        self._events = None
+        self._pending = None
+        self.sequencer.remove_events( dest = self.dest )
+
+        with self.sequencer.events.event() as event:
+            event.dest = self.dest
+            for channel in range( self.CHANNELS ):
+                event.all_notes_off( channel )
+                self.sequencer.send_right_now( event )
+
+    def __fill( self ):
+        ''' Schedules the events up to lookahead seconds after the current position and a timer
+        which calls it again after half of the window. Expects the lock to be held. '''
+        if self._events is None:
+            return
+
+        end = self.position + self.lookahead
+        columns = { 'kind': [], 'channel': [], 'key': [], 'velocity': [] }
+        timestamps = []
+
+        event = self._pending
+        self._pending = None
+        while True:
+            if event is None:
+                event = next( self._events, None )
+                if event is None:
+                    self._events = None
+                    break
+            if event.time > end:
+                self._pending = event
+                break
+
+            columns['kind'].append( event.type )
+            columns['channel'].append( event.channel )
+            columns['key'].append( event.p1 )
+            columns['velocity'].append( event.p2 )
+            timestamps.append( self.__timestamp(event.time) )
+            event = None
+
+        if timestamps:
+            self.sequencer.send_many( columns, timestamps, self.dest )
+            self._last = max( self._last, timestamps[-1] )
+
+        self._end = end
+        if self._events is not None:
+            self._client.timer( self.__timestamp(end - self.lookahead / 2), self._generation )
+
+    def __timestamp( self, seconds ):
+        ''' Returns the sequencer tick of the given song position. '''
+        return self._origin + int( round((seconds - self._start) * self._tps) )
+
+    def __on_timer( self, client, event ):
+        ''' Refills the window unless the timer belongs to an earlier play. '''
+        with self._lock:
+            if event.data == self._generation:
+                self.__fill()
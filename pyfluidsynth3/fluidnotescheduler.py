@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import threading
+import time
+
+class FluidNoteScheduler():
+    ''' Plays notes with a duration on a FluidSynth without the sequencer. Note-ons are sent right
+    away, the note-offs are kept in one heap which a single background thread works off on time, so
+    thousands of overlapping notes don't need a thread each. The thread only runs while note-offs
+    are pending. Use FluidSynth.play_note() instead of creating a scheduler directly.
+
+    Note that a note-off stops a key on a channel, if the same key is played again before the
+    first note ended the first note-off also ends the second note.
+
+    Example:
+    note = synth.play_note( 0, 60, 100, 500 )
+    synth.notes.cancel( note )
+
+    Constants:
+    ALL_NOTES_OFF -- MIDI controller number of "all notes off".
+
+    Member:
+    synth -- The synth (FluidSynth).
+    _condition -- Guards the heap and wakes the thread on new and cancelled notes
+                  (threading.Condition).
+    _heap -- Pending note-offs: (time, note id) (list).
+    _ids -- Generator of note ids (itertools.count).
+    _pending -- Channel and key of pending notes by note id (dict).
+    _thread -- The note-off thread or None (threading.Thread).
+    '''
+
+    ALL_NOTES_OFF = 123
+
+    def __init__( self, synth ):
+        ''' Creates a scheduler for the given synth. '''
+        self.synth = synth
+
+        self._condition = threading.Condition()
+        self._heap = []
+        self._ids = itertools.count( 1 )
+        self._pending = {}
+        self._thread = None
+
+    def __len__( self ):
+        ''' Returns the number of pending note-offs. '''
+        return len( self._pending )
+
+    def play( self, channel, key, velocity, duration ):
+        ''' Starts a note and stops it after duration milliseconds. Returns the note id or None if
+        the note-on failed. '''
+        if not self.synth.noteon( channel, key, velocity ):
+            return None
+
+        due = time.monotonic() + duration / 1000.0
+        with self._condition:
+            note = next( self._ids )
+            self._pending[note] = ( channel, key )
+            wake = not self._heap or due < self._heap[0][0]
+            heapq.heappush( self._heap, (due, note) )
+
+            if self._thread is None:
+                self._thread = threading.Thread( target = self.__run, name = 'FluidNoteScheduler',
+                                                 daemon = True )
+                self._thread.start()
+            elif wake:
+                self._condition.notify()
+
+        return note
+
+    def cancel( self, note, noteoff = True ):
+        ''' Cancels the pending note-off of the given note. If noteoff is true the note is stopped
+        right away else it keeps sounding. Returns false if the note already ended. '''
+        with self._condition:
+            entry = self._pending.pop( note, None )
+            self._condition.notify()
+        if entry is None:
+            return False
+        if noteoff:
+            self.synth.noteoff( *entry )
+        return True
+
+    def all_notes_off( self, channel = None ):
+        ''' Cancels the pending note-offs of the given or all channels and stops all notes on them
+        (MIDI controller "all notes off"), also those not started by the scheduler. '''
+        with self._condition:
+            for note, entry in list( self._pending.items() ):
+                if channel is None or entry[0] == channel:
+                    del self._pending[note]
+            self._condition.notify()
+
+        channels = range( self.synth.midi_channels ) if channel is None else [ channel ]
+        for channel in channels:
+            self.synth.cc( channel, self.ALL_NOTES_OFF, 0 )
+
+    def clear( self ):
+        ''' Cancels all pending note-offs without sending them, e.g. before the synth is reset and
+        handed to another user who must not have their notes stopped. '''
+        with self._condition:
+            self._pending.clear()
+            del self._heap[:]
+            self._condition.notify()
+
+    def __run( self ):
+        ''' Note-off thread: Sends due note-offs until none is pending. Cancelled notes are skipped
+        when they come up in the heap. '''
+        heap = self._heap
+        noteoff = self.synth.noteoff
+
+        with self._condition:
+            while True:
+                while heap and heap[0][1] not in self._pending:
+                    heapq.heappop( heap )
+                if not heap:
+                    self._thread = None
+                    return
+
+                wait = heap[0][0] - time.monotonic()
+                if wait > 0:
+                    self._condition.wait( wait )
+                    continue
+
+                due, note = heapq.heappop( heap )
+                channel, key = self._pending.pop( note )
+                noteoff( channel, key )
@@ -0,0 +1,85 @@
+from . import fluidsettings, fluidsynth
+
+import array
+import collections
+import os
+import time
+
+FluidCoreBenchmark = collections.namedtuple( 'FluidCoreBenchmark', 'rates recommended realtime' )
+FluidCoreBenchmark.__doc__ = ''' Result of benchmark_cores(). Rates maps the number of cores to
+rendered frames per second, recommended is the suggested value of "synth.cpu-cores" and realtime
+the speed of the recommended setting as multiple of realtime. '''
+
+CORES_THRESHOLD = 0.9
+NOTES_DEFAULT = 64
+SECONDS_DEFAULT = 2.0
+
+def benchmark_cores( handle, soundfonts, cores = None, notes = NOTES_DEFAULT,
+                     seconds = SECONDS_DEFAULT, settings = None, interpolation = None,
+                     block_frames = fluidsynth.FluidSynth.BLOCK_FRAMES ):
+    ''' Measures how fast a synth renders on this machine with different numbers of CPU cores and
+    recommends a setting for "synth.cpu-cores". For every core count (default: 1, 2, 4, ... up to
+    the number of CPUs) a synth with the given soundfonts renders seconds of audio of the given
+    number of notes spread over all MIDI channels, which are struck again every half second. Other
+    settings (dictionary) and the interpolation method are applied to every synth. Unless settings
+    contains "synth.polyphony" the polyphony is raised to fit the notes. The smallest
+    core count which reaches CORES_THRESHOLD of the best rate is recommended, more cores rarely pay
+    off beyond it. Returns a FluidCoreBenchmark. '''
+    if cores is None:
+        count = os.cpu_count() or 1
+        cores = [ 1 ]
+        while cores[-1] * 2 <= count:
+            cores.append( cores[-1] * 2 )
+        if cores[-1] != count:
+            cores.append( count )
+
+    settings = dict( settings or {} )
+    polyphony = None if 'synth.polyphony' in settings else max( 256, 4 * notes )
+
+    rates = {}
+    sample_rate = None
+    for core_count in cores:
+        synth_settings = fluidsettings.FluidSettings( handle )
+        synth_settings.update( settings )
+        synth_settings.set_performance( cores = core_count, polyphony = polyphony )
+        sample_rate = synth_settings['synth.sample-rate']
+
+        synth = fluidsynth.FluidSynth( handle, synth_settings )
+        for soundfont in soundfonts:
+            synth.load_soundfont( soundfont )
+        if interpolation is not None:
+            synth.set_interpolation( interpolation )
+
+        rates[core_count] = _render_rate( synth, notes, seconds, sample_rate, block_frames )
+        del synth
+
+    best = max( rates.values() )
+    recommended = min( core_count for core_count, rate in rates.items()
+                       if rate >= CORES_THRESHOLD * best )
+    return FluidCoreBenchmark( rates, recommended, rates[recommended] / sample_rate )
+
+def _render_rate( synth, notes, seconds, sample_rate, block_frames ):
+    ''' Renders seconds of audio of the given number of notes and returns the frames per second. '''
+    buffer = array.array( 'f', bytes(4 * synth.CHANNELS * block_frames) )
+    channels = synth.midi_channels
+    keys = [ (note % channels, 36 + (note // channels * 7) % 60) for note in range(notes) ]
+    strike_frames = int( sample_rate / 2 )
+    total = int( seconds * sample_rate )
+
+    elapsed = 0.0
+    frames = 0
+    while frames < total:
+        if frames % strike_frames < block_frames:
+            for channel, key in keys:
+                synth.noteoff( channel, key )
+                synth.noteon( channel, key, 100 )
+
+        start = time.perf_counter()
+        synth.write_float( buffer )
+        elapsed += time.perf_counter() - start
+        frames += block_frames
+
+    for channel, key in keys:
+        synth.noteoff( channel, key )
+
+    return frames / elapsed if elapsed else float( 'inf' )
@@ -1,4 +1,4 @@
-from . import constants, fluiderror, fluidsynth, utility
+from . import constants, fluidasync, fluiderror, fluidrenderer, fluidsynth, utility
 
 class FluidPlayer():
     ''' Represents the FluidSynth player object as defined in midi.h.
@@ -6,16 +6,25 @@ class FluidPlayer():
     This class is inspired by the FluidPlayer object from pyfluidsynth by MostAwesomeDude. Method 
     documentation is mostly taken from FluidSynth's official API.
 
+    Constants:
+    READY -- Player status: Ready to play.
+    PLAYING -- Player status: Currently playing.
+    DONE -- Player status: Done playing or stopped.
+
     Member:
     handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will 
               probably work, too (FluidHandle).
     paused -- Indicates if the player is playing or inactive (boolean).
     player -- The FluidSynth player object (fluid_player_t).
+    synth -- The synth played by this player (FluidSynth).
     '''
 
+    READY, PLAYING, DONE = range(3)
+
     def __init__( self, handle, synth ):
         ''' Create a new FluidSynth player instance using given handle and synth objects. '''
         self.handle = handle
+        self.synth = synth
         self.player = self.handle.new_fluid_player( synth.synth )
         self.paused = True
 
@@ -27,6 +36,11 @@ class FluidPlayer():
         if self.handle.delete_fluid_player( self.player ) is constants.FAILED:
             raise fluiderror.FluidError( "Couldn't delete fluid player!" )
 
+    @property
+    def status( self ):
+        ''' Returns the current status of the player (READY, PLAYING or DONE). '''
+        return self.handle.fluid_player_get_status( self.player )
+
     def add( self, midi ):
         ''' Add a MIDI file to a player queue. '''
         midi = utility.fluidstring( midi )
@@ -49,6 +63,36 @@ class FluidPlayer():
         ''' Wait for a MIDI player to terminate (when done playing). '''
         self.handle.fluid_player_join( self.player )
 
+    def join_async( self ):
+        ''' Returns an awaitable which is done when the MIDI player terminated (see join()). Must be
+        called from a running asyncio event loop. '''
+        return fluidasync.watcher().join( self )
+
+    def status_updates( self ):
+        ''' Returns an asynchronous iterator which yields the player status whenever it changes 
+        until the player is done. Must be called from a running asyncio event loop. '''
+        return fluidasync.watcher().player_status( self )
+
+    def render( self, output, midi = None, tail = fluidrenderer.FluidRenderer.TAIL_DEFAULT,
+                timeout = None, **options ):
+        ''' Plays faster than realtime and writes the audio to the file with the given path until the
+        player is done, plus tail seconds to let notes decay. Additional options are passed to
+        FluidRenderer (format, sample_format, block_frames and memory_map). The player timing source
+        must be "sample" (the default). Returns the number of rendered frames. '''
+        with fluidrenderer.FluidRenderer( self.synth, output, **options ) as renderer:
+            self.play( midi )
+            renderer.render_player( self, tail, timeout )
+        return renderer.frames
+
+    def render_stems( self, outputs, midi = None, tail = fluidrenderer.FluidRenderer.TAIL_DEFAULT,
+                      timeout = None, **options ):
+        ''' Like render() but writes every audio group of the synth to its own file in one pass
+        (see FluidStemRenderer). Returns the number of rendered frames. '''
+        with fluidrenderer.FluidStemRenderer( self.synth, outputs, **options ) as renderer:
+            self.play( midi )
+            renderer.render_player( self, tail, timeout )
+        return renderer.frames
+
     def pause( self ):
         ''' Pauses player or starts again if already paused. '''
         if self.paused:
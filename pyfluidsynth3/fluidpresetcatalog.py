@@ -0,0 +1,204 @@
+from . import fluiderror, fluidsoundfontfile
+
+import collections
+import difflib
+import hashlib
+import json
+import os
+import tempfile
+
+FluidPreset = collections.namedtuple( 'FluidPreset', 'name sfont bank program' )
+FluidPreset.__doc__ = ''' Preset of a loaded soundfont. Sfont is the soundfont id returned by
+FluidSynth.load_soundfont(). '''
+
+class FluidPresetCatalog():
+    ''' Index of the presets of all soundfonts loaded into a synth: lookup by name, reverse lookup
+    by soundfont, bank and program and fuzzy search. The presets of a soundfont are read with the
+    soundfont iteration of FluidSynth 2 once and stored in a file beside the soundfont (see
+    CACHE_SUFFIX) keyed by the SHA-1 hash of the soundfont, so later processes don't iterate again.
+    FluidSynth 1.x has no soundfont iteration functions, there the presets are read from the SF2
+    file itself (see FluidSoundfontFile). Use FluidSynth.presets instead of creating a catalog
+    directly.
+
+    Example:
+    for preset in synth.presets.search( 'piano' ):
+        print( preset.name, preset.bank, preset.program )
+    synth.select_preset( 0, 'Acoustic Grand Piano' )
+
+    Constants:
+    CACHE_SUFFIX -- Suffix appended to the soundfont path for the catalog file.
+    CUTOFF_DEFAULT -- Default minimal similarity (0.0 - 1.0) of fuzzy search results.
+
+    Member:
+    _by_name -- Presets by lower case name (dict).
+    _by_number -- Presets by (sfont, bank, program) (dict).
+    _fonts -- Presets by soundfont id (dict).
+    '''
+
+    CACHE_SUFFIX = '.presets.json'
+    CUTOFF_DEFAULT = 0.6
+
+    def __init__( self ):
+        ''' Creates an empty catalog. '''
+        self._by_name = {}
+        self._by_number = {}
+        self._fonts = {}
+
+    def __len__( self ):
+        ''' Returns the number of presets. '''
+        return len( self._by_number )
+
+    def __iter__( self ):
+        ''' Iterates over all presets sorted by soundfont, bank and program. '''
+        return iter( sorted(self._by_number.values(), key = lambda preset: preset[1:]) )
+
+    def __contains__( self, sfont ):
+        ''' Checks if the presets of the given soundfont id are indexed. '''
+        return sfont in self._fonts
+
+    def soundfonts( self ):
+        ''' Returns the list of indexed soundfont ids. '''
+        return list( self._fonts )
+
+    def add( self, sfont, presets ):
+        ''' Indexes the given (name, bank, program) tuples of the soundfont with the given id. '''
+        self.remove( sfont )
+
+        entries = [ FluidPreset(name, sfont, bank, program) for name, bank, program in presets ]
+        self._fonts[sfont] = entries
+        for preset in entries:
+            self._by_name.setdefault( preset.name.lower(), [] ).append( preset )
+            self._by_number[preset[1:]] = preset
+
+    def remove( self, sfont ):
+        ''' Removes the presets of the soundfont with the given id. '''
+        for preset in self._fonts.pop( sfont, () ):
+            del self._by_number[preset[1:]]
+            presets = self._by_name[preset.name.lower()]
+            presets.remove( preset )
+            if not presets:
+                del self._by_name[preset.name.lower()]
+
+    def lookup( self, name ):
+        ''' Returns the list of presets with the given name (case insensitive). '''
+        return list( self._by_name.get(name.lower(), ()) )
+
+    def preset( self, sfont, bank, program ):
+        ''' Returns the preset with the given soundfont id, bank and program or None. '''
+        return self._by_number.get( (sfont, bank, program) )
+
+    def search( self, query, limit = 10, cutoff = CUTOFF_DEFAULT ):
+        ''' Returns up to limit presets whose names match the query best. Names containing the
+        query come first (those starting with it before the others), then names similar to the
+        query by at least cutoff (see difflib.SequenceMatcher). '''
+        query = query.lower()
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2( query )
+
+        scored = []
+        for name, presets in self._by_name.items():
+            if name.startswith( query ):
+                score = 3.0
+            elif query in name:
+                score = 2.0
+            else:
+                matcher.set_seq1( name )
+                if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                    continue
+                score = matcher.ratio()
+                if score < cutoff:
+                    continue
+            scored.extend( (-score, preset[1:], preset) for preset in presets )
+
+        scored.sort()
+        return [ preset for score, number, preset in scored[:limit] ]
+
+def soundfont_presets( synth, sfont, path ):
+    ''' Returns the (name, bank, program) tuples of the soundfont with the given id and path loaded
+    into the given synth (FluidSynth). They are read from the catalog file beside the soundfont if
+    it belongs to the same file (same size and modification time or same hash) else the soundfont
+    is iterated and the catalog file is written. Raises a FluidError if the presets can't be
+    read. '''
+    path = os.path.abspath( path )
+    cache_path = path + FluidPresetCatalog.CACHE_SUFFIX
+    try:
+        stat = os.stat( path )
+    except OSError as e:
+        raise fluiderror.FluidError( "Couldn't read soundfont {0}: {1}".format(path, e) )
+
+    cache = _read_catalog( cache_path )
+    if cache.get( 'size' ) == stat.st_size and cache.get( 'mtime' ) == stat.st_mtime:
+        return [ tuple(preset) for preset in cache['presets'] ]
+
+    digest = _hash_file( path )
+    if cache.get( 'sha1' ) == digest:
+        presets = [ tuple(preset) for preset in cache['presets'] ]
+    else:
+        presets = _iterate_presets( synth, sfont, path )
+
+    _write_catalog( cache_path, { 'sha1': digest, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                                  'presets': presets } )
+    return presets
+
+def _iterate_presets( synth, sfont, path ):
+    ''' Reads the presets of the soundfont with the given id from FluidSynth. Libraries without the
+    soundfont iteration functions (FluidSynth 1.x) read the soundfont file with the given path. '''
+    handle = synth.handle
+    if handle.prewarm( 'sfont' ):
+        return _read_presets( path )
+
+    sfont = handle.fluid_synth_get_sfont_by_id( synth.synth, sfont )
+    if not sfont:
+        raise fluiderror.FluidError( "Unknown soundfont" )
+
+    presets = []
+    handle.fluid_sfont_iteration_start( sfont )
+    while True:
+        preset = handle.fluid_sfont_iteration_next( sfont )
+        if not preset:
+            break
+        name = ( handle.fluid_preset_get_name(preset) or b'' ).decode( 'utf-8', 'replace' )
+        presets.append( (name.strip(), handle.fluid_preset_get_banknum(preset),
+                         handle.fluid_preset_get_num(preset)) )
+    return presets
+
+def _read_presets( path ):
+    ''' Reads the presets of the SF2 file with the given path. '''
+    try:
+        with fluidsoundfontfile.FluidSoundfontFile( path ) as sf:
+            return [ (preset.name, preset.bank, preset.program) for preset in sf.presets ]
+    except ( OSError, fluiderror.FluidError ) as e:
+        raise fluiderror.FluidError( "Couldn't list the presets of {0}: the library has no soundfont "
+                                     "iteration (FluidSynth 1.x) and the file can't be read ({1})"
+                                     .format(path, e) )
+
+def _hash_file( path ):
+    ''' Returns the SHA-1 hex digest of the file with the given path. '''
+    digest = hashlib.sha1()
+    with open( path, 'rb' ) as data:
+        for chunk in iter( lambda: data.read(1 << 20), b'' ):
+            digest.update( chunk )
+    return digest.hexdigest()
+
+def _read_catalog( cache_path ):
+    ''' Returns the content of a catalog file or an empty dictionary. '''
+    try:
+        with open( cache_path ) as cache_file:
+            cache = json.load( cache_file )
+    except ( OSError, ValueError ):
+        return {}
+    return cache if isinstance( cache, dict ) and 'presets' in cache else {}
+
+def _write_catalog( cache_path, cache ):
+    ''' Atomically replaces the catalog file. Unwritable directories are ignored. Every writer uses
+    its own temporary file, also threads of one process. '''
+    temp_path = None
+    try:
+        descriptor, temp_path = tempfile.mkstemp( suffix = '.json',
+                                                  dir = os.path.dirname(os.path.abspath(cache_path)) )
+        with os.fdopen( descriptor, 'w' ) as cache_file:
+            json.dump( cache, cache_file )
+        os.replace( temp_path, cache_path )
+    except OSError:
+        if temp_path is not None and os.path.isfile( temp_path ):
+            os.remove( temp_path )
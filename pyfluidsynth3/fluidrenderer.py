@@ -0,0 +1,342 @@
+from . import fluiderror
+
+import array
+import functools
+import mmap
+import queue
+import struct
+import threading
+import time
+
+class FluidRenderer():
+    ''' Renders a synth faster than realtime into a WAV, RF64 or raw PCM file with bounded memory.
+    Audio is rendered in blocks of block_frames into one of two buffers while a background thread
+    writes the other one to disk, so synthesis and I/O overlap. If memory_map is true the file is
+    grown in steps of MMAP_GROWTH bytes and blocks are copied into a memory map instead of written.
+
+    WAV files reserve space for an RF64 header (a "JUNK" chunk as recommended by EBU Tech 3306) and
+    are turned into RF64 files on close if they exceed 4 GiB. close() writes the final header, so
+    the file is only valid after it (use the renderer as context manager). Float files use the
+    IEEE float format tag with the 18 byte format chunk and the "fact" chunk required for it.
+
+    Example:
+    with FluidRenderer( synth, 'song.wav' ) as renderer:
+        player.play( 'song.mid' )
+        renderer.render_player( player )
+
+    Constants:
+    BLOCK_FRAMES -- Default number of frames rendered at once.
+    BUFFERS -- Number of buffers shared by synthesis and I/O.
+    FLOAT, S16 -- Sample formats: 32 bit floats and 16 bit signed integers.
+    MMAP_GROWTH -- Bytes the file grows by if memory mapped.
+    RAW, RF64, WAV -- File formats.
+    TAIL_DEFAULT -- Default seconds rendered after the end of a song to let notes decay.
+
+    Member:
+    block_frames -- Number of frames rendered at once (int).
+    format -- The file format (RAW, RF64 or WAV).
+    frames -- Number of rendered frames (int).
+    output -- The path of the output file (string).
+    sample_format -- The sample format (FLOAT or S16).
+    sample_rate -- The sample rate (int).
+    source -- Called with a buffer and a number of frames to render instead of the synth or None
+              (callable).
+    synth -- The synth (FluidSynth).
+    _capacity -- Size of the memory mapped file (int).
+    _error -- Exception raised by the I/O thread or None (Exception).
+    _file -- The open output file (file).
+    _filled -- Rendered buffers and their frames waiting for I/O (queue.Queue).
+    _free -- Buffers ready to be rendered into (queue.Queue).
+    _frame_size -- Bytes per frame (int).
+    _header_size -- Size of the file header in bytes (int).
+    _map -- The memory map of the output file or None (mmap.mmap).
+    _mmap -- True if the output file is memory mapped (boolean).
+    _position -- Number of bytes written to the file (int).
+    _thread -- The I/O thread (threading.Thread).
+    _write -- Synth function rendering a block (method).
+    '''
+
+    BLOCK_FRAMES = 4096
+    BUFFERS = 2
+    FLOAT, S16 = 'float', 's16'
+    MMAP_GROWTH = 64 * 1024 * 1024
+    RAW, RF64, WAV = 'raw', 'rf64', 'wav'
+    TAIL_DEFAULT = 1.0
+
+    _RIFF_MAX = 0xFFFFFFFF
+
+    def __init__( self, synth, output, format = WAV, sample_format = S16,
+                  block_frames = BLOCK_FRAMES, memory_map = False, source = None ):
+        ''' Creates the output file with the given path and starts the I/O thread. '''
+        if format not in ( self.RAW, self.RF64, self.WAV ):
+            raise fluiderror.FluidError( "Unknown file format {0}".format(format) )
+        if sample_format not in ( self.FLOAT, self.S16 ):
+            raise fluiderror.FluidError( "Unknown sample format {0}".format(sample_format) )
+
+        self.block_frames = block_frames
+        self.format = format
+        self.frames = 0
+        self.output = output
+        self.sample_format = sample_format
+        self.sample_rate = int( synth.settings['synth.sample-rate'] )
+        self.source = source
+        self.synth = synth
+
+        if sample_format == self.FLOAT:
+            self._write = synth.write_float
+            self._frame_size = 4 * synth.CHANNELS
+        else:
+            self._write = synth.write_s16
+            self._frame_size = 2 * synth.CHANNELS
+        if source is not None:
+            self._write = source
+
+        self._capacity = 0
+        self._error = None
+        self._map = None
+        self._mmap = memory_map
+        self._filled = queue.Queue()
+        self._free = queue.Queue()
+        for i in range( self.BUFFERS ):
+            self._free.put( bytearray(block_frames * self._frame_size) )
+
+        self._file = open( output, 'w+b' if memory_map else 'wb' )
+        self._file.write( self.__header(0) )
+        self._position = self._header_size = self._file.tell()
+
+        self._thread = threading.Thread( target = self.__run, name = 'FluidRenderer', daemon = True )
+        self._thread.start()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+    def render( self, frames ):
+        ''' Renders the given number of frames. '''
+        while frames > 0:
+            block = min( frames, self.block_frames )
+            self.__render( block )
+            frames -= block
+
+    def render_player( self, player, tail = TAIL_DEFAULT, timeout = None ):
+        ''' Renders while the given player is playing and tail seconds more to let notes decay. Raises
+        a FluidError if rendering takes longer than timeout seconds. Returns the number of frames
+        rendered. '''
+        return _render_player( player, self.render, self.block_frames, self.sample_rate, tail,
+                               timeout )
+
+    def close( self ):
+        ''' Waits for all blocks to be written, finishes the header and closes the file. Raises
+        the error of the I/O thread if writing failed. '''
+        if self._file.closed:
+            return
+
+        self._filled.put( None )
+        self._thread.join()
+
+        try:
+            if self._map is not None:
+                self._map.close()
+                self._file.truncate( self._position )
+            if self._error is None:
+                self._file.seek( 0 )
+                self._file.write( self.__header(self._position - self._header_size) )
+        finally:
+            self._file.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def __render( self, frames ):
+        ''' Renders frames into a free buffer and passes it to the I/O thread. '''
+        if self._error is not None:
+            raise self._error
+
+        buffer = self._free.get()
+        self._write( buffer, frames )
+        self._filled.put( (buffer, frames) )
+        self.frames += frames
+
+    def __run( self ):
+        ''' I/O thread: Writes rendered buffers until close() is called. After an error buffers are
+        only recycled. '''
+        while True:
+            item = self._filled.get()
+            if item is None:
+                break
+
+            buffer, frames = item
+            try:
+                if self._error is None:
+                    self.__store( memoryview(buffer)[:frames * self._frame_size] )
+            except Exception as e:
+                self._error = e
+            finally:
+                self._free.put( buffer )
+
+    def __store( self, data ):
+        ''' Writes data to the file or copies it into the memory map. '''
+        end = self._position + len( data )
+
+        if not self._mmap:
+            self._file.write( data )
+        else:
+            if end > self._capacity:
+                if self._map is not None:
+                    self._map.close()
+                self._capacity = end + self.MMAP_GROWTH
+                self._file.truncate( self._capacity )
+                self._map = mmap.mmap( self._file.fileno(), self._capacity )
+            self._map[self._position:end] = data
+
+        self._position = end
+
+    def __header( self, data_size ):
+        ''' Returns the file header for the given number of data bytes. '''
+        if self.format == self.RAW:
+            return b''
+
+        channels = self.synth.CHANNELS
+        sample_size = self._frame_size // channels
+        frames = data_size // self._frame_size
+        fmt = struct.pack( '<HHIIHH', 1, channels, self.sample_rate,
+                           self.sample_rate * self._frame_size, self._frame_size, 8 * sample_size )
+
+        # Non-PCM formats need the cbSize field and a fact chunk with the number of frames.
+        float_format = self.sample_format == self.FLOAT
+        if float_format:
+            fmt = struct.pack( '<H', 3 ) + fmt[2:] + struct.pack( '<H', 0 )
+        fmt = struct.pack( '<4sI', b'fmt ', len(fmt) ) + fmt
+        fact_size = 12 if float_format else 0
+        riff_size = 4 + 36 + len( fmt ) + fact_size + 8 + data_size
+
+        if self.format == self.RF64 or riff_size > self._RIFF_MAX:
+            fact = struct.pack( '<4sII', b'fact', 4, self._RIFF_MAX ) if float_format else b''
+            return ( struct.pack('<4sI4s', b'RF64', self._RIFF_MAX, b'WAVE') +
+                     struct.pack('<4sIQQQI', b'ds64', 28, riff_size, data_size, frames, 0) +
+                     fmt + fact + struct.pack('<4sI', b'data', self._RIFF_MAX) )
+
+        fact = struct.pack( '<4sII', b'fact', 4, frames ) if float_format else b''
+        return ( struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE') +
+                 struct.pack('<4sI', b'JUNK', 28) + bytes(28) +
+                 fmt + fact + struct.pack('<4sI', b'data', data_size) )
+
+class FluidStemRenderer():
+    ''' Renders every audio group of a synth into its own file in one pass, e.g. one stem per MIDI
+    channel. Each block is rendered once with FluidSynth.process() into planar buffers which are
+    interleaved and passed to one FluidRenderer (32 bit floats) per output. Set "synth.audio-groups"
+    and "synth.audio-channels" before creating the synth (16 for one stem per MIDI channel). Effects
+    are not rendered. Requires FluidSynth 2 for more than one stem.
+
+    Example:
+    paths = [ 'channel{0}.wav'.format(channel) for channel in range(16) ]
+    with FluidStemRenderer( synth, paths ) as renderer:
+        player.play( 'song.mid' )
+        renderer.render_player( player )
+
+    Member:
+    block_frames -- Number of frames rendered at once (int).
+    renderers -- One renderer per output file (list).
+    synth -- The synth (FluidSynth).
+    _interleaved -- Interleaved samples of one stem (array.array).
+    _planar -- Left and right buffers of all stems (list).
+    _zero -- Silence used to clear the planar buffers (array.array).
+    '''
+
+    def __init__( self, synth, outputs, format = FluidRenderer.WAV,
+                  block_frames = FluidRenderer.BLOCK_FRAMES, memory_map = False ):
+        ''' Creates one output file per path in outputs, stem n contains audio group n. Raises a
+        FluidError if outputs is empty or the synth has less audio groups than outputs. '''
+        outputs = list( outputs )
+        if not outputs:
+            raise fluiderror.FluidError( "No output files" )
+        if len( outputs ) > synth.audio_groups:
+            raise fluiderror.FluidError( "Synth has only {0} audio groups".format(synth.audio_groups) )
+
+        self.block_frames = block_frames
+        self.synth = synth
+
+        self._zero = array.array( 'f', bytes(4 * block_frames) )
+        self._planar = [ array.array('f', self._zero) for i in range(synth.CHANNELS * len(outputs)) ]
+        self._interleaved = array.array( 'f', bytes(4 * synth.CHANNELS * block_frames) )
+
+        self.renderers = []
+        try:
+            for stem, output in enumerate( outputs ):
+                source = functools.partial( self.__interleave, stem )
+                self.renderers.append( FluidRenderer(synth, output, format, FluidRenderer.FLOAT,
+                                                     block_frames, memory_map, source) )
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+    @property
+    def frames( self ):
+        ''' Returns the number of rendered frames. '''
+        return self.renderers[0].frames if self.renderers else 0
+
+    def render( self, frames ):
+        ''' Renders the given number of frames. '''
+        while frames > 0:
+            block = min( frames, self.block_frames )
+            for buffer in self._planar:
+                buffer[:] = self._zero
+            self.synth.process( self._planar, block )
+
+            for renderer in self.renderers:
+                renderer.render( block )
+            frames -= block
+
+    def render_player( self, player, tail = FluidRenderer.TAIL_DEFAULT, timeout = None ):
+        ''' Renders while the given player is playing and tail seconds more to let notes decay. Raises
+        a FluidError if rendering takes longer than timeout seconds. Returns the number of frames
+        rendered. '''
+        sample_rate = int( self.synth.settings['synth.sample-rate'] )
+        return _render_player( player, self.render, self.block_frames, sample_rate, tail, timeout )
+
+    def close( self ):
+        ''' Closes all files. Raises the first error of any renderer after all were closed. '''
+        error = None
+        for renderer in self.renderers:
+            try:
+                renderer.close()
+            except Exception as e:
+                error = error or e
+
+        if error is not None:
+            raise error
+
+    def __interleave( self, stem, buffer, frames ):
+        ''' Source of the renderer of the given stem: Copies its planar samples into buffer. '''
+        channels = self.synth.CHANNELS
+        interleaved = self._interleaved
+        for channel in range( channels ):
+            interleaved[channel:channels * frames:channels] = self._planar[stem * channels + channel][:frames]
+
+        size = 4 * channels * frames
+        memoryview( buffer )[:size] = memoryview( interleaved ).cast( 'B' )[:size]
+
+def _render_player( player, render, block_frames, sample_rate, tail, timeout ):
+    ''' Calls render with block_frames while the player is playing and tail seconds more. Raises a
+    FluidError after timeout seconds. Returns the number of frames rendered. '''
+    deadline = None if timeout is None else time.monotonic() + timeout
+    tail_frames = int( tail * sample_rate )
+    frames = 0
+
+    while player.status == player.PLAYING or tail_frames > 0:
+        if player.status != player.PLAYING:
+            tail_frames -= block_frames
+        if deadline is not None and time.monotonic() > deadline:
+            raise fluiderror.FluidError( "Timeout after {0} seconds".format(timeout) )
+        render( block_frames )
+        frames += block_frames
+
+    return frames
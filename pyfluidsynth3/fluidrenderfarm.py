@@ -0,0 +1,358 @@
+from . import fluiderror, fluidhandle, fluidplayer, fluidsettings, fluidsoundfontsubset, fluidsynth
+
+import collections
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+
+FluidRenderResult = collections.namedtuple( 'FluidRenderResult', 'job midi output frames error' )
+FluidRenderResult.__doc__ = ''' Result of a render job. Frames is the number of rendered frames
+and error a message (string) if the job failed else None. '''
+
+# Messages from the workers.
+_READY, _DONE, _FAILED = range(3)
+
+class FluidRenderFarm():
+    ''' Renders batches of MIDI files offline to WAV files using a pool of worker processes. Every
+    worker owns its own FluidHandle, FluidSettings and FluidSynth with all soundfonts loaded once at
+    startup and renders jobs faster than realtime using FluidPlayer and FluidSynth.write_s16().
+
+    Every worker is connected to the parent process by its own pipe. The parent hands every job to
+    one idle worker, so it always knows which worker renders which job, and a dying worker can't
+    block the others. Jobs wait in a bounded queue in the parent until a worker is idle. A job
+    which exceeds its timeout is aborted by the worker and reported as failed. If the worker
+    doesn't return within TIMEOUT_GRACE seconds after the timeout, e.g. because a library call
+    hangs, it is terminated and replaced. A crashed worker is replaced and its job reported as
+    failed. The setting "player.timing-source" must be "sample" (the default) for offline
+    rendering.
+
+    If subset is true workers don't load the soundfonts at startup but only the presets every job
+    plays (see FluidSynth.load_soundfont_subset()) which cuts the memory per worker from the size
+    of the soundfonts to a few subsets, so more workers fit on a machine. Subsets are keyed by
+    soundfont and played presets, a worker keeps the subsets of its last job loaded and only
+    replaces those the next job needs differently, so similar jobs don't load them again.
+
+    Example:
+    with FluidRenderFarm( ['soundfont.sf2'] ) as farm:
+        for result in farm.map( [('song.mid', 'song.wav')] ):
+            print( result.midi, result.error or result.frames )
+
+    Constants:
+    BLOCK_FRAMES -- Number of frames rendered at once.
+    POLL_INTERVAL -- Seconds between checks of the worker processes while waiting.
+    START_TIMEOUT -- Default seconds start() waits for the workers to load the soundfonts.
+    TAIL_DEFAULT -- Default seconds rendered after the end of a song to let notes decay.
+    TIMEOUT_GRACE -- Seconds after a job timeout until its worker is terminated.
+
+    Member:
+    library_path -- Path of the FluidSynth library or None to search it (string).
+    processes -- Number of worker processes (int).
+    queue_size -- Maximal number of jobs waiting for a worker (int).
+    settings -- FluidSynth settings applied in every worker (dict).
+    soundfonts -- Soundfonts loaded in every worker (list).
+    subset -- Load only the presets a job plays (bool).
+    tail -- Seconds rendered after the end of a song (float).
+    timeout -- Default job timeout in seconds or None (float).
+    _active -- Running jobs: process id -> (job, deadline or None) (dict).
+    _connections -- Pipe to every worker: process id -> connection (dict).
+    _finished -- Results not returned yet (collections.deque).
+    _idle -- Process ids of workers waiting for a job (list).
+    _next_job -- Id of the next job (int).
+    _pending -- Jobs waiting for a worker (collections.deque).
+    _workers -- Worker processes: process id -> process (dict).
+    '''
+
+    BLOCK_FRAMES = 4096
+    POLL_INTERVAL = 0.5
+    START_TIMEOUT = 60.0
+    TAIL_DEFAULT = 1.0
+    TIMEOUT_GRACE = 5.0
+
+    def __init__( self, soundfonts, library_path = None, settings = None, processes = None,
+                  queue_size = None, timeout = None, tail = TAIL_DEFAULT, subset = False ):
+        ''' Creates a render farm. Workers are started by start() or when entering a with block. The
+        number of processes defaults to the number of CPUs, the queue size to twice the number of
+        processes. '''
+        self.soundfonts = list( soundfonts )
+        self.library_path = library_path
+        self.settings = dict( settings or {} )
+        self.processes = processes or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.processes
+        self.timeout = timeout
+        self.tail = tail
+        self.subset = subset
+
+        self._active = {}
+        self._connections = {}
+        self._finished = collections.deque()
+        self._idle = []
+        self._next_job = 0
+        self._pending = collections.deque()
+        self._workers = {}
+
+    def __enter__( self ):
+        self.start()
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+    def start( self, timeout = START_TIMEOUT ):
+        ''' Starts the worker processes and waits at most timeout seconds (forever if None) until
+        all soundfonts are loaded. Raises a FluidError if a worker couldn't be initialized, exited
+        or didn't get ready in time. '''
+        for i in range( self.processes ):
+            self.__spawn()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len( self._idle ) < self.processes:
+            for pid, message in self.__receive( self.POLL_INTERVAL ):
+                if message is None:
+                    self.__abort( "Worker exited with code {0}".format(self._workers[pid].exitcode) )
+                if message[0] == _FAILED:
+                    self.__abort( "Couldn't start worker: {0}".format(message[2]) )
+                self._idle.append( pid )
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self.__abort( "Workers not ready after {0} seconds".format(timeout) )
+
+    def close( self ):
+        ''' Stops all worker processes after they finished their current job. Jobs which are still
+        waiting for a worker are dropped. '''
+        for connection in self._connections.values():
+            try:
+                connection.send( None )
+            except OSError:
+                pass
+        for pid, process in list( self._workers.items() ):
+            process.join()
+            self.__remove( pid )
+
+        self._pending.clear()
+
+    def submit( self, midi, output, timeout = None ):
+        ''' Queues a job which renders the given MIDI file to the given WAV file and returns its job
+        id. Blocks while queue_size jobs are waiting for a worker. Results are returned by
+        results(). '''
+        job = self._next_job
+        self._next_job += 1
+
+        if timeout is None:
+            timeout = self.timeout
+        while len( self._pending ) >= self.queue_size:
+            self.__poll( self.POLL_INTERVAL )
+
+        self._pending.append( (job, midi, output, timeout) )
+        self.__dispatch()
+
+        return job
+
+    def results( self, count ):
+        ''' Returns a generator which waits for the given number of job results. '''
+        for i in range( count ):
+            yield self.__next_result( None )
+
+    def map( self, jobs ):
+        ''' Renders an iterable of (midi, output) pairs. Returns a generator of results in the order
+        of completion. Submitting and collecting is interleaved so an arbitrary number of jobs can
+        be passed without exceeding the queue size. '''
+        pending = 0
+
+        for midi, output in jobs:
+            self.submit( midi, output )
+            pending += 1
+            while self._finished:
+                pending -= 1
+                yield self._finished.popleft()
+
+        for i in range( pending ):
+            yield self.__next_result( None )
+
+    def __next_result( self, timeout ):
+        ''' Returns the next job result. Waits at most timeout seconds (forever if None) and returns
+        None if no result arrived. '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not self._finished:
+            wait = self.POLL_INTERVAL
+            if deadline is not None:
+                wait = max( 0, min(wait, deadline - time.monotonic()) )
+            self.__poll( wait )
+            if not self._finished and deadline is not None and time.monotonic() >= deadline:
+                return None
+
+        return self._finished.popleft()
+
+    def __poll( self, wait ):
+        ''' Waits at most wait seconds for worker messages and handles all arrived ones. Then
+        replaces crashed and overdue workers and hands waiting jobs to idle workers. '''
+        for pid, message in self.__receive( wait ):
+            if message is None:
+                self.__replace( pid, "Worker exited with code {0}".format(self._workers[pid].exitcode) )
+                continue
+
+            kind = message[0]
+            if kind == _FAILED:
+                raise fluiderror.FluidError( "Couldn't start worker: {0}".format(message[2]) )
+            if kind == _DONE:
+                job, midi, output = self._active.pop( pid )[0][:3]
+                self._finished.append( FluidRenderResult(job, midi, output, message[2], message[3]) )
+            self._idle.append( pid )
+
+        self.__check_workers()
+        self.__dispatch()
+
+    def __receive( self, wait ):
+        ''' Waits at most wait seconds for worker messages and returns the list of arrived
+        (process id, message) pairs. The message is None if the worker closed its pipe, i.e. it
+        exited. '''
+        pids = { connection: pid for pid, connection in self._connections.items() }
+        messages = []
+        for connection in multiprocessing.connection.wait( list(pids), wait ):
+            pid = pids[connection]
+            try:
+                messages.append( (pid, connection.recv()) )
+            except ( EOFError, OSError ):
+                self._workers[pid].join()
+                messages.append( (pid, None) )
+        return messages
+
+    def __check_workers( self ):
+        ''' Replaces crashed workers and terminates workers which exceeded the deadline of their
+        job. '''
+        now = time.monotonic()
+        for pid, process in list( self._workers.items() ):
+            entry = self._active.get( pid )
+            if not process.is_alive():
+                self.__replace( pid, "Worker exited with code {0}".format(process.exitcode) )
+            elif entry is not None and entry[1] is not None and now >= entry[1]:
+                process.terminate()
+                process.join()
+                self.__replace( pid, "Timeout after {0} seconds".format(entry[0][3]) )
+
+    def __replace( self, pid, error ):
+        ''' Replaces a stopped worker and reports its job as failed with the given error. '''
+        entry = self._active.get( pid )
+        self.__remove( pid )
+        self.__spawn()
+
+        if entry is not None:
+            job, midi, output = entry[0][:3]
+            self._finished.append( FluidRenderResult(job, midi, output, None, error) )
+
+    def __dispatch( self ):
+        ''' Hands waiting jobs to idle workers. '''
+        while self._idle and self._pending:
+            pid = self._idle.pop()
+            job = self._pending.popleft()
+            timeout = job[3]
+            deadline = None if timeout is None else time.monotonic() + timeout + self.TIMEOUT_GRACE
+            self._active[pid] = ( job, deadline )
+            self._connections[pid].send( job )
+
+    def __abort( self, message ):
+        ''' Terminates all workers and raises a FluidError with the given message. '''
+        for pid, process in list( self._workers.items() ):
+            process.terminate()
+            process.join()
+            self.__remove( pid )
+        raise fluiderror.FluidError( message )
+
+    def __remove( self, pid ):
+        ''' Forgets the worker with the given process id. '''
+        del self._workers[pid]
+        self._connections.pop( pid ).close()
+        self._active.pop( pid, None )
+        if pid in self._idle:
+            self._idle.remove( pid )
+
+    def __spawn( self ):
+        ''' Starts a new worker process. '''
+        connection, worker_connection = multiprocessing.Pipe()
+        args = ( self.library_path, self.soundfonts, self.settings, self.tail, self.BLOCK_FRAMES,
+                 self.subset, worker_connection )
+        process = multiprocessing.Process( target = _worker, args = args, daemon = True )
+        process.start()
+        worker_connection.close()
+        self._workers[process.pid] = process
+        self._connections[process.pid] = connection
+
+def render_midi( handle, synth, midi, output, timeout = None, tail = FluidRenderFarm.TAIL_DEFAULT,
+                 block_frames = FluidRenderFarm.BLOCK_FRAMES ):
+    ''' Renders a MIDI file with the given synth faster than realtime to a 16 bit stereo WAV file
+    and returns the number of rendered frames. The synth is reset afterwards. Raises a FluidError if
+    rendering takes longer than timeout seconds. '''
+    player = fluidplayer.FluidPlayer( handle, synth )
+    try:
+        frames = player.render( output, midi, tail, timeout, block_frames = block_frames )
+
+    except Exception:
+        if os.path.isfile( output ):
+            os.remove( output )
+        raise
+
+    finally:
+        player.stop()
+        del player
+        synth.system_reset()
+
+    return frames
+
+def _worker( library_path, soundfonts, options, tail, block_frames, subset, connection ):
+    ''' Main function of a render farm worker process. Receives jobs and sends messages through the
+    connection to the parent. In subset mode the subsets of the last job stay loaded (see
+    _load_subsets()). '''
+    pid = os.getpid()
+    loaded = []
+
+    try:
+        handle = fluidhandle.FluidHandle( library_path )
+        settings = fluidsettings.FluidSettings( handle )
+        for key, value in options.items():
+            settings[key] = value
+
+        synth = fluidsynth.FluidSynth( handle, settings )
+        if not subset:
+            for soundfont in soundfonts:
+                synth.load_soundfont( soundfont )
+
+    except Exception as e:
+        connection.send( (_FAILED, pid, str(e)) )
+        return
+
+    connection.send( (_READY, pid) )
+
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        try:
+            if subset:
+                _load_subsets( synth, soundfonts, job[1], loaded )
+            frames = render_midi( handle, synth, job[1], job[2], job[3], tail, block_frames )
+            connection.send( (_DONE, pid, frames, None) )
+        except Exception as e:
+            connection.send( (_DONE, pid, None, str(e)) )
+
+def _load_subsets( synth, soundfonts, midi, loaded ):
+    ''' Loads the subsets of the soundfonts the MIDI file needs into the synth. Loaded is the list
+    of subset paths loaded for the previous job and is updated. Subsets which are the same for both
+    jobs stay loaded, only the soundfonts after the first different one are unloaded and loaded
+    again to keep their order. '''
+    paths = [ fluidsoundfontsubset.soundfont_subset(soundfont, midi).path for soundfont in soundfonts ]
+
+    keep = 0
+    while keep < min( len(paths), len(loaded) ) and paths[keep] == loaded[keep]:
+        keep += 1
+
+    while len( loaded ) > keep:
+        synth.unload_soundfont( loaded[-1] )
+        loaded.pop()
+    for path in paths[keep:]:
+        synth.load_soundfont( path )
+        loaded.append( path )
\ No newline at end of file
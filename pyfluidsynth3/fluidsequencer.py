@@ -1,4 +1,6 @@
-from . import constants, utility
+from . import constants, fluidasync, fluiderror, fluideventpool, fluidsequencerclient, utility
+
+import itertools
 
 class FluidSequencer( dict ):
     ''' Represents the FluidSynth sequencer object as defined in seq.h. A instance of this class 
@@ -12,6 +14,7 @@ class FluidSequencer( dict ):
     TPB_DEFAULT -- Initial default value of ticks per beat.
     
     Member:
+    events -- Pool of reusable events which can be filled and passed to send() (FluidEventPool).
     handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will 
               probably work, too (FluidHandle).
     seq -- The FluidSynth sequencer object (fluid_sequencer_t).
@@ -29,6 +32,7 @@ class FluidSequencer( dict ):
 
         self.handle = handle
         self.seq = self.handle.new_fluid_sequencer()
+        self.events = fluideventpool.FluidEventPool( self.handle )
 
         if synths:
             for synth in synths:
@@ -94,6 +98,14 @@ class FluidSequencer( dict ):
 
         return id, name
 
+    def add_client( self, name, callback, batch = False ):
+        ''' Register a Python client and return it (FluidSequencerClient). The callback is called 
+        with the client and every received event or, if batch is true, a list of events. '''
+        client = fluidsequencerclient.FluidSequencerClient( self, name, callback, batch )
+        self[client] = client.id, name
+
+        return client
+
     def is_dest( self, id ):
         ''' Check if a client is a destination client. Returns true if is destination client else 
         false. '''
@@ -101,14 +113,99 @@ class FluidSequencer( dict ):
         return result == constants.TRUE
         
     def send( self, event, timestamp, absolute = True ):
-        ''' Schedule an event for sending at a later time. Returns true if success else false. '''
+        ''' Schedule an event for sending at a later time. Returns true if success else false. The 
+        event is copied so it can be refilled and reused right away (see events). '''
         result = self.handle.fluid_sequencer_send_at( self.seq, event.event, timestamp, absolute )
         return result == constants.OK
 
+    def send_many( self, events, timestamps, dest = None, absolute = True, status = False ):
+        ''' Schedule a batch of events for sending at the given timestamps. Events are described 
+        column wise by a structured NumPy array or a dictionary of sequences/NumPy arrays with the 
+        fields "kind" (see constants.NOTE, NOTE_ON, NOTE_OFF, CONTROL_CHANGE, PROGRAM_CHANGE and 
+        PITCH_BEND), "channel", "key" (or controller, program, pitch), "velocity" (or value), 
+        "duration" and "dest". Missing "velocity" and "duration" fields default to zero, a missing 
+        "dest" field to the dest argument. All events are filled into the same scratch event. 
+        Returns a list with the result of every event if status is true else true if all events 
+        were scheduled. '''
+        kinds = self.__column( events, 'kind' )
+        channels = self.__column( events, 'channel' )
+        keys = self.__column( events, 'key' )
+        velocities = self.__column( events, 'velocity', 0 )
+        durations = self.__column( events, 'duration', 0 )
+        dests = self.__column( events, 'dest', dest )
+        timestamps = utility.fluidcolumn( timestamps )
+
+        seq = self.seq
+        event = self.events.scratch.event
+        set_dest = self.handle.fluid_event_set_dest
+        note = self.handle.fluid_event_note
+        noteon = self.handle.fluid_event_noteon
+        noteoff = self.handle.fluid_event_noteoff
+        cc = self.handle.fluid_event_control_change
+        program_change = self.handle.fluid_event_program_change
+        pitch_bend = self.handle.fluid_event_pitch_bend
+        send_at = self.handle.fluid_sequencer_send_at
+
+        results = []
+        failed = False
+
+        columns = zip( kinds, channels, keys, velocities, durations, dests, timestamps )
+        for kind, channel, key, velocity, duration, dest, timestamp in columns:
+            set_dest( event, dest )
+
+            if kind == constants.NOTE:
+                note( event, channel, key, velocity, duration )
+            elif kind == constants.NOTE_ON:
+                noteon( event, channel, key, velocity )
+            elif kind == constants.NOTE_OFF:
+                noteoff( event, channel, key )
+            elif kind == constants.CONTROL_CHANGE:
+                cc( event, channel, key, velocity )
+            elif kind == constants.PITCH_BEND:
+                pitch_bend( event, channel, key )
+            elif kind == constants.PROGRAM_CHANGE:
+                program_change( event, channel, key )
+            else:
+                raise fluiderror.FluidError( "Unknown event kind {0}".format(kind) )
+
+            result = send_at( seq, event, timestamp, absolute )
+
+            if status:
+                results.append( result == constants.OK )
+            elif result != constants.OK:
+                failed = True
+
+        return results if status else not failed
+
     def send_right_now(self, event):
         ''' Send an event immediately. '''
         self.handle.fluid_sequencer_send_now( self.seq, event.event )
+
+    def remove_events( self, source = -1, dest = -1, type = -1 ):
+        ''' Remove scheduled events matching the given source, destination and event type (see 
+        FluidEvent type constants). -1 matches everything. '''
+        self.handle.fluid_sequencer_remove_events( self.seq, source, dest, type )
+
+    def wait_tick( self, tick ):
+        ''' Returns an awaitable which is done when the sequencer reached the given tick. Its result
+        is the current tick. Must be called from a running asyncio event loop. '''
+        return fluidasync.watcher().wait_tick( self, tick )
+
+    def tick_updates( self, step = 1 ):
+        ''' Returns an asynchronous iterator which yields the current tick every time the sequencer 
+        advanced at least step ticks. Must be called from a running asyncio event loop. '''
+        return fluidasync.watcher().sequencer_ticks( self, step )
         
+    def __column( self, events, name, default = None ):
+        ''' Returns the named column of events. If the column doesn't exist the default value is 
+        repeated for every event. Without default value a missing column is an error. '''
+        try:
+            return utility.fluidcolumn( events[name] )
+        except ( KeyError, ValueError ):
+            if default is None:
+                raise fluiderror.FluidError( "Missing event field {0}".format(name) )
+            return itertools.repeat( default )
+
     def __update_tps( self ):
         ''' Update ticks per second based on ticks per beat and beats per minute. '''
         self.ticks_per_second = ( self._tpb * self._bpm ) / 60.0
\ No newline at end of file
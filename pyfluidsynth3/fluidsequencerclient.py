@@ -0,0 +1,179 @@
+from . import fluidevent, fluidhandle, utility
+
+import collections
+import itertools
+import queue
+import threading
+import traceback
+
+FluidSequencerEvent = collections.namedtuple( 'FluidSequencerEvent',
+                                              'time type channel key velocity control value data '
+                                              'pitch' )
+FluidSequencerEvent.__doc__ = ''' Copy of an event received by a FluidSequencerClient. Type is one
+of the FluidEvent type constants, data is the object passed to FluidSequencerClient.timer() for
+timer events, pitch is the bend value of pitch bend events. Fields the event type doesn't carry (see FluidSequencerClient.FIELDS) are None. '''
+
+class FluidSequencerClient():
+    ''' A sequencer client implemented in Python, e.g. a metronome, visual sync or MIDI output.
+    FluidSynth calls the client from its own (possibly realtime) thread, so the callback registered
+    at the sequencer is only a small trampoline which copies the event fields into a queue. A Python
+    worker thread drains the queue and calls the user callback, so slow callbacks never stall the
+    sequencer. Note that the trampoline still has to acquire the GIL, keep other threads from
+    holding it for long stretches. The event is only valid during the call, so the trampoline reads
+    the type and then only the fields this type carries (see FIELDS).
+
+    Exceptions raised by the callback are printed and counted, they don't stop the worker.
+
+    Example:
+    def tick( client, events ):
+        for event in events:
+            print( event.time, event.data )
+    client = sequencer.add_client( 'metronome', tick )
+    client.timer( sequencer.ticks + sequencer.ticks_per_beat, 'beat' )
+
+    Constants:
+    FIELDS -- Fields read from every event type: type -> tuple of field names. Other types are
+              passed on with their time and type only.
+
+    Member:
+    batch -- Pass lists of all queued events to the callback instead of single events (boolean).
+    callback -- Called with the client and an event or a list of events (callable).
+    errors -- Number of exceptions raised by the callback (int).
+    handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will
+              probably work, too (FluidHandle).
+    id -- The sequencer client id (short).
+    last_error -- The last exception raised by the callback or None (Exception).
+    name -- The client name (string).
+    sequencer -- The sequencer this client is registered to (FluidSequencer).
+    _queue -- Events copied by the trampoline (queue.SimpleQueue).
+    _timers -- Data of pending timer events by token (dict).
+    _tokens -- Generator of timer tokens (itertools.count).
+    _trampoline -- Callback registered at the sequencer (fluid_event_callback_t).
+    _worker -- Thread calling the user callback (threading.Thread).
+    '''
+
+    FIELDS = {
+        fluidevent.FluidEvent.NOTE: ( 'channel', 'key', 'velocity' ),
+        fluidevent.FluidEvent.NOTEON: ( 'channel', 'key', 'velocity' ),
+        fluidevent.FluidEvent.NOTEOFF: ( 'channel', 'key' ),
+        fluidevent.FluidEvent.ALLSOUNDSOFF: ( 'channel', ),
+        fluidevent.FluidEvent.ALLNOTESOFF: ( 'channel', ),
+        fluidevent.FluidEvent.BANKSELECT: ( 'channel', 'control' ),
+        fluidevent.FluidEvent.PROGRAMCHANGE: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.PROGRAMSELECT: ( 'channel', 'control', 'value' ),
+        fluidevent.FluidEvent.PITCHBEND: ( 'channel', 'pitch' ),
+        fluidevent.FluidEvent.PITCHWHEELSENS: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.MODULATION: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.SUSTAIN: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.CONTROLCHANGE: ( 'channel', 'control', 'value' ),
+        fluidevent.FluidEvent.PAN: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.VOLUME: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.REVERBSEND: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.CHORUSSEND: ( 'channel', 'value' ),
+        fluidevent.FluidEvent.TIMER: ( 'data', ),
+    }
+
+    def __init__( self, sequencer, name, callback, batch = False ):
+        ''' Registers a new client with the given name at the sequencer. Use
+        FluidSequencer.add_client() instead of creating clients directly. '''
+        self.batch = batch
+        self.callback = callback
+        self.errors = 0
+        self.handle = sequencer.handle
+        self.last_error = None
+        self.name = name
+        self.sequencer = sequencer
+
+        self._queue = queue.SimpleQueue()
+        self._timers = {}
+        self._tokens = itertools.count( 1 )
+
+        self._worker = threading.Thread( target = self.__run, name = name, daemon = True )
+        self._worker.start()
+
+        self._trampoline = fluidhandle.fluid_event_callback_t( self.__trampoline() )
+        self.id = self.handle.fluid_sequencer_register_client( sequencer.seq,
+                                                               utility.fluidstring(name),
+                                                               self._trampoline, None )
+
+    def timer( self, timestamp, data = None, absolute = True ):
+        ''' Schedules a timer event for this client. The callback receives it with the given data
+        at the given time. Returns true if success else false. '''
+        token = next( self._tokens )
+        self._timers[token] = data
+
+        with self.sequencer.events.event() as event:
+            event.timer( token )
+            event.dest = self.id
+            if self.sequencer.send( event, timestamp, absolute ):
+                return True
+
+        del self._timers[token]
+        return False
+
+    def close( self ):
+        ''' Unregisters the client and stops the worker after all queued events were handled. '''
+        if self in self.sequencer:
+            del self.sequencer[self]
+        self._queue.put( None )
+        self._worker.join()
+
+    def __trampoline( self ):
+        ''' Returns the function called by FluidSynth. It only copies the fields of the event's
+        type into the queue. All library functions are bound up front to keep it short. '''
+        put = self._queue.put
+        get_type = self.handle.fluid_event_get_type
+        getters = { type: tuple( getattr(self.handle, 'fluid_event_get_' + field) for field in fields )
+                    for type, fields in self.FIELDS.items() }
+        no_getters = ()
+
+        def trampoline( time, event, seq, data ):
+            type = get_type( event )
+            put( (time, type, tuple( get(event) for get in getters.get(type, no_getters) )) )
+
+        return trampoline
+
+    def __run( self ):
+        ''' Worker thread: Drains the queue and calls the user callback. '''
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+
+        while True:
+            items = [ get() ]
+            while True:
+                try:
+                    items.append( get_nowait() )
+                except queue.Empty:
+                    break
+
+            stop = None in items
+            events = [ self.__event(item) for item in items if item is not None ]
+
+            if self.batch:
+                if events:
+                    self.__call( events )
+            else:
+                for event in events:
+                    self.__call( event )
+
+            if stop:
+                break
+
+    def __call( self, events ):
+        ''' Calls the user callback. Exceptions are printed and recorded in errors and last_error. '''
+        try:
+            self.callback( self, events )
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            traceback.print_exc()
+
+    def __event( self, item ):
+        ''' Creates an event from a queued item and resolves timer data. '''
+        time, type, values = item
+        fields = dict( zip(self.FIELDS.get(type, ()), values) )
+        if type == fluidevent.FluidEvent.TIMER:
+            fields['data'] = self._timers.pop( fields.get('data'), None )
+        return FluidSequencerEvent( time, type, fields.get('channel'), fields.get('key'),
+                                    fields.get('velocity'), fields.get('control'),
+                                    fields.get('value'), fields.get('data'), fields.get('pitch') )
\ No newline at end of file
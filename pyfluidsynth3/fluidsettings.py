@@ -1,5 +1,5 @@
 from . import constants, utility
-from ctypes import byref, c_char_p, c_double, c_int
+from ctypes import byref, c_char_p, c_double, c_int, create_string_buffer
 
 class FluidSettings(object):
     ''' Represents the FluidSynth settings as defined in settings.h. A instance of this class 
@@ -21,12 +21,20 @@ class FluidSettings(object):
     QUALITY_LOW -- Quality preset: Low.
     QUALITY_MED -- Quality preset: Medium.
     QUALITY_HIGH -- Quality preset: High.
+    QUALITY_PROFILES -- Names of the quality presets (list).
+    PROFILES -- Named settings profiles which can be applied with apply_profile() (dict).
+    PERFORMANCE_KEYS -- Settings keys of the performance options of set_performance() (dict).
+    STRING_SIZE -- Size of the buffer string values are copied into (FluidSynth 2.x).
     
     Member:
     handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will 
                probably work, too (FluidHandle).
     quality -- The last quality preset used (string).
     settings -- The FluidSynth settings object (fluidsettings_t).
+    _ok -- Result of successful settings functions: 1 in FluidSynth 1.x, FLUID_OK in 2.x (int).
+    _types -- Cache of settings types by key which is shared by all instances using the same 
+              library (dict).
+    _type_cache -- Caches of settings types by library path (dict).
     '''
     
     (FLUID_NO_TYPE, 
@@ -38,12 +46,41 @@ class FluidSettings(object):
     QUALITY_LOW = 'low'
     QUALITY_MEDIUM = 'med'
     QUALITY_HIGH = 'high'
+    QUALITY_PROFILES = [ QUALITY_LOW, QUALITY_MEDIUM, QUALITY_HIGH ]
+    
+    PROFILES = {
+        QUALITY_LOW: { 'synth.chorus.active': constants.FALSE,
+                       'synth.reverb.active': constants.FALSE,
+                       'synth.sample-rate': 22050 },
+        QUALITY_MEDIUM: { 'synth.chorus.active': constants.FALSE,
+                          'synth.reverb.active': constants.TRUE,
+                          'synth.sample-rate': 44100 },
+        QUALITY_HIGH: { 'synth.chorus.active': constants.TRUE,
+                        'synth.reverb.active': constants.TRUE,
+                        'synth.sample-rate': 44100 },
+    }
+    
+    PERFORMANCE_KEYS = {
+        'cores': 'synth.cpu-cores',
+        'dynamic_sample_loading': 'synth.dynamic-sample-loading',
+        'parallel_render': 'synth.parallel-render',
+        'period_size': 'audio.period-size',
+        'periods': 'audio.periods',
+        'polyphony': 'synth.polyphony',
+    }
+
+    STRING_SIZE = 256
+
+    _type_cache = {}
 
     def __init__( self, handle ):
         ''' Create new FluidSynth settings instance using the given handle. Default quality is set 
         to medium. '''
         self.handle = handle
         self.settings = self.handle.new_fluid_settings()
+        version = getattr( handle, 'version', (1, 0, 0) )
+        self._ok = constants.OK if version[0] >= 2 else constants.TRUE
+        self._types = self._type_cache.setdefault( getattr(handle, 'library_path', None), {} )
         self.quality = self.QUALITY_MEDIUM
 
     @property
@@ -56,20 +93,8 @@ class FluidSettings(object):
         ''' Sets the given quality preset. '''
         self._quality = quality
         
-        if quality == self.QUALITY_LOW:
-            self['synth.chorus.active'] = constants.FALSE
-            self['synth.reverb.active'] = constants.FALSE
-            self['synth.sample-rate'] = 22050
-            
-        elif quality == self.QUALITY_MEDIUM:
-            self['synth.chorus.active'] = constants.FALSE
-            self['synth.reverb.active'] = constants.TRUE
-            self['synth.sample-rate'] = 44100
-            
-        elif quality == self.QUALITY_HIGH:
-            self['synth.chorus.active'] = constants.TRUE
-            self['synth.reverb.active'] = constants.TRUE
-            self['synth.sample-rate'] = 44100
+        if quality in self.QUALITY_PROFILES:
+            self.apply_profile( quality )
 
     def __del__( self ):
         ''' Deletes the FluidSynth settings object. '''
@@ -79,7 +104,7 @@ class FluidSettings(object):
         ''' Returns the value of the given settings key. '''
         
         key = utility.fluidstring( key )
-        key_type = self.handle.fluid_settings_get_type( self.settings, key )
+        key_type = self.__key_type( key )
         
         if key_type is self.FLUID_NUM_TYPE:
             val = c_double()
@@ -88,12 +113,19 @@ class FluidSettings(object):
             val = c_int()
             func = self.handle.fluid_settings_getint
         elif key_type is self.FLUID_STR_TYPE:
+            if self._ok == constants.OK:
+                # FluidSynth 2.x has no fluid_settings_getstr().
+                val = create_string_buffer( self.STRING_SIZE )
+                result = self.handle.fluid_settings_copystr( self.settings, key, val, len(val) )
+                if result != self._ok:
+                    raise KeyError( key )
+                return val.value
             val = c_char_p()
             func = self.handle.fluid_settings_getstr
         else:
             raise KeyError( key )
 
-        if func( self.settings, key, byref(val) ):
+        if func( self.settings, key, byref(val) ) == self._ok:
             return val.value
         else:
             raise KeyError( key )
@@ -102,11 +134,11 @@ class FluidSettings(object):
         ''' Sets the value of the given settings key to value. '''
         
         key = utility.fluidstring( key )
-        key_type = self.handle.fluid_settings_get_type( self.settings, key )
+        key_type = self.__key_type( key )
         
         if key_type is self.FLUID_STR_TYPE:
-            value = utility.fluidstring( key )
-            if not self.handle.fluid_settings_setstr( self.settings, key, value ):
+            value = utility.fluidstring( value )
+            if self.handle.fluid_settings_setstr( self.settings, key, value ) != self._ok:
                 raise KeyError( key )
             
         else:
@@ -114,16 +146,80 @@ class FluidSettings(object):
             value = self.__coerce_to_int( value )
             
             if key_type is self.FLUID_NUM_TYPE:
-                if not self.handle.fluid_settings_setnum( self.settings, key, value ):
+                if self.handle.fluid_settings_setnum( self.settings, key, value ) != self._ok:
                     raise KeyError( key )
                 
             elif key_type is self.FLUID_INT_TYPE:
-                if not self.handle.fluid_settings_setint( self.settings, key, value ):
+                if self.handle.fluid_settings_setint( self.settings, key, value ) != self._ok:
                     raise KeyError( key )
                 
             else:
                 raise KeyError( key )
             
+    def update( self, values ):
+        ''' Sets all values of the given dictionary or iterable of (key, value) pairs. '''
+        if hasattr( values, 'items' ):
+            values = values.items()
+        for key, value in values:
+            self[key] = value
+
+    def apply_profile( self, profile ):
+        ''' Applies a settings profile which is either the name of a profile in PROFILES or a 
+        dictionary of settings. '''
+        if not hasattr( profile, 'items' ):
+            profile = self.PROFILES[profile]
+        self.update( profile )
+
+    @property
+    def performance( self ):
+        ''' Returns the current performance options (see set_performance()) as dictionary. Options
+        unknown to the library are missing. '''
+        values = self.snapshot( self.PERFORMANCE_KEYS.values() )
+        return { name: values[key] for name, key in self.PERFORMANCE_KEYS.items() if key in values }
+
+    def set_performance( self, cores = None, polyphony = None, period_size = None, periods = None,
+                         parallel_render = None, dynamic_sample_loading = None ):
+        ''' Sets the threading and performance options which aren't None: number of CPU cores used
+        for synthesis, maximal number of voices, audio period size in frames and number of audio
+        periods (latency is period_size * periods / sample rate), parallel rendering (only
+        FluidSynth 1.x) and dynamic sample loading (only FluidSynth 2.x, samples are loaded when a
+        preset is selected). Must be called before the synth and audio driver are created. Options
+        unknown to the library are skipped, invalid values raise a KeyError. Returns the dictionary
+        of applied options. The interpolation method isn't a setting but a property of the synth
+        channels, set it with FluidSynth.set_interpolation() after creating the synth. '''
+        options = { 'cores': cores, 'dynamic_sample_loading': dynamic_sample_loading,
+                    'parallel_render': parallel_render, 'period_size': period_size,
+                    'periods': periods, 'polyphony': polyphony }
+
+        applied = {}
+        for name, value in options.items():
+            key = self.PERFORMANCE_KEYS[name]
+            if value is None or not self.snapshot( [key] ):
+                continue
+            self[key] = value
+            applied[name] = value
+        return applied
+
+    def snapshot( self, keys ):
+        ''' Reads the values of the given keys into a dictionary. Keys which don't exist are 
+        skipped. '''
+        values = {}
+        for key in keys:
+            try:
+                values[key] = self[key]
+            except KeyError:
+                pass
+        return values
+
+    def __key_type( self, key ):
+        ''' Returns the type of the given encoded key. Known types are cached. '''
+        key_type = self._types.get( key )
+        if key_type is None:
+            key_type = self.handle.fluid_settings_get_type( self.settings, key )
+            if key_type is not self.FLUID_NO_TYPE:
+                self._types[key] = key_type
+        return key_type
+
     def __coerce_to_int( self, stringValue ):
         ''' Turn a string into an integer. '''
         try:
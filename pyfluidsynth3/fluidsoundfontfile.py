@@ -0,0 +1,437 @@
+from . import fluiderror
+
+import collections
+import mmap
+import struct
+
+FluidSoundfontPreset = collections.namedtuple( 'FluidSoundfontPreset', 'name bank program index' )
+FluidSoundfontPreset.__doc__ = ''' Preset header of a SF2 file. Index is the position in the
+preset list of the file. '''
+
+FluidSoundfontSample = collections.namedtuple( 'FluidSoundfontSample',
+                                               'name start end loop_start loop_end sample_rate '
+                                               'pitch correction link type' )
+FluidSoundfontSample.__doc__ = ''' Sample header of a SF2 file. Start, end and loop points are
+positions in sample data points. '''
+
+class FluidSoundfontFile():
+    ''' Pure Python reader of SF2 soundfont metadata which doesn't need FluidSynth. The file is
+    memory mapped and only the RIFF chunk structure is read up front. The INFO and pdta (preset,
+    instrument and sample headers) chunks are parsed on first use, the sdta chunk with the sample
+    data is never read unless sample_data() is called. Inspecting even a large soundfont only
+    touches a few pages of it, e.g. to validate uploads or plan memory before loading it into a
+    synth.
+
+    Example:
+    with FluidSoundfontFile( 'soundfont.sf2' ) as sf:
+        print( sf.info.get('INAM'), sf.version, len(sf.presets) )
+        print( sf.memory_footprint() )
+
+    Constants:
+    GEN_INSTRUMENT -- Preset generator selecting an instrument.
+    GEN_KEY_RANGE -- Generator limiting a zone to a key range.
+    GEN_SAMPLE_ID -- Instrument generator selecting a sample.
+    SAMPLE_PADDING -- Zero data points written after every sample by write_subset().
+
+    Member:
+    chunks -- Offset and size of the data of every known chunk by id, e.g. "phdr" or "smpl" (dict).
+    path -- The path of the file (string).
+    _data -- The memory mapped file (mmap.mmap).
+    _file -- The open file (file).
+    _info -- Cache of the INFO chunk or None (dict).
+    _info_chunks -- Ids of the sub chunks of the INFO chunk (list).
+    _records -- Cache of parsed pdta sub chunks by id (dict).
+    '''
+
+    GEN_INSTRUMENT = 41
+    GEN_KEY_RANGE = 43
+    GEN_SAMPLE_ID = 53
+    SAMPLE_PADDING = 46
+
+    # Sample types with a linked sample: right, left and linked.
+    _LINKED_TYPES = ( 2, 4, 8 )
+
+    # Record formats of the pdta sub chunks.
+    _FORMATS = {
+        b'phdr': struct.Struct( '<20sHHHIII' ),
+        b'pbag': struct.Struct( '<HH' ),
+        b'pmod': struct.Struct( '<HHhHH' ),
+        b'pgen': struct.Struct( '<HH' ),
+        b'inst': struct.Struct( '<20sH' ),
+        b'ibag': struct.Struct( '<HH' ),
+        b'imod': struct.Struct( '<HHhHH' ),
+        b'igen': struct.Struct( '<HH' ),
+        b'shdr': struct.Struct( '<20sIIIIIBbHH' ),
+    }
+
+    def __init__( self, path ):
+        ''' Opens the soundfont with the given path and reads its chunk structure. Raises a
+        FluidError if the file isn't a SF2 file. '''
+        self.path = path
+        self._file = open( path, 'rb' )
+        try:
+            self._data = mmap.mmap( self._file.fileno(), 0, access = mmap.ACCESS_READ )
+        except ValueError:
+            self._file.close()
+            raise fluiderror.FluidError( "Empty soundfont {0}".format(path) )
+
+        self._info = None
+        self._info_chunks = []
+        self._records = {}
+        self.chunks = {}
+
+        data = self._data
+        if len( data ) < 12 or data[:4] != b'RIFF' or data[8:12] != b'sfbk':
+            self.close()
+            raise fluiderror.FluidError( "Not a SF2 file {0}".format(path) )
+
+        end = min( 8 + struct.unpack_from('<I', data, 4)[0], len(data) )
+        pos = 12
+        while pos + 8 <= end:
+            chunk, size = struct.unpack_from( '<4sI', data, pos )
+            if chunk == b'LIST':
+                kind = data[pos + 8:pos + 12]
+                self.__read_list( kind, pos + 12, min(pos + 8 + size, end) )
+            pos += 8 + size + ( size & 1 )
+
+        if b'phdr' not in self.chunks:
+            self.close()
+            raise fluiderror.FluidError( "Missing preset headers in {0}".format(path) )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+    def close( self ):
+        ''' Closes the file. '''
+        self._data.close()
+        self._file.close()
+
+    @property
+    def info( self ):
+        ''' Returns the INFO chunk as dictionary, e.g. "INAM" (name), "isng" (sound engine),
+        "ICOP" (copyright). Texts are strings, "ifil" and "iver" (versions) tuples. '''
+        if self._info is None:
+            self._info = {}
+            for chunk in self._info_chunks:
+                offset, size = self.chunks[chunk]
+                if chunk in ( b'ifil', b'iver' ):
+                    self._info[chunk.decode()] = struct.unpack_from( '<HH', self._data, offset )
+                else:
+                    text = self._data[offset:offset + size].split( b'\0', 1 )[0]
+                    self._info[chunk.decode()] = text.decode( 'latin-1' )
+        return self._info
+
+    @property
+    def version( self ):
+        ''' Returns the SF2 version (major, minor) or None. '''
+        return self.info.get( 'ifil' )
+
+    @property
+    def presets( self ):
+        ''' Returns the list of presets (FluidSoundfontPreset) in file order. '''
+        return [ FluidSoundfontPreset(self.__name(record[0]), record[2], record[1], index)
+                 for index, record in enumerate(self.__records(b'phdr')[:-1]) ]
+
+    @property
+    def instruments( self ):
+        ''' Returns the list of instrument names in file order. '''
+        return [ self.__name(record[0]) for record in self.__records(b'inst')[:-1] ]
+
+    @property
+    def samples( self ):
+        ''' Returns the list of samples (FluidSoundfontSample) in file order. '''
+        return [ FluidSoundfontSample(self.__name(record[0]), *record[1:])
+                 for record in self.__records(b'shdr')[:-1] ]
+
+    @property
+    def sample_data_size( self ):
+        ''' Returns the size of the sample data in bytes (16 bit samples plus optional 24 bit
+        extension), which is about the memory a synth needs for this soundfont. '''
+        return sum( self.chunks.get(chunk, (0, 0))[1] for chunk in (b'smpl', b'sm24') )
+
+    def find_preset( self, bank, program ):
+        ''' Returns the index of the first preset with the given bank and program or None. '''
+        for index, record in enumerate( self.__records(b'phdr')[:-1] ):
+            if record[2] == bank and record[1] == program:
+                return index
+        return None
+
+    def preset_instruments( self, index ):
+        ''' Returns the set of instrument indices used by the preset with the given index. '''
+        return self.__targets( b'phdr', b'pbag', b'pgen', index, self.GEN_INSTRUMENT )
+
+    def instrument_samples( self, index ):
+        ''' Returns the set of sample indices used by the instrument with the given index. '''
+        return self.__targets( b'inst', b'ibag', b'igen', index, self.GEN_SAMPLE_ID )
+
+    def preset_samples( self, index ):
+        ''' Returns the set of sample indices used by the preset with the given index. '''
+        samples = set()
+        for instrument in self.preset_instruments( index ):
+            samples |= self.instrument_samples( instrument )
+        return samples
+
+    def memory_footprint( self, presets = None ):
+        ''' Returns the bytes of sample data used by the presets with the given indices (all if
+        None). '''
+        if presets is None:
+            return self.sample_data_size
+
+        samples = set()
+        for index in presets:
+            samples |= self.preset_samples( index )
+
+        headers = self.__records( b'shdr' )
+        bytes_per_point = 3 if b'sm24' in self.chunks else 2
+        return sum( max(0, headers[sample][2] - headers[sample][1]) * bytes_per_point
+                    for sample in samples if sample < len(headers) - 1 )
+
+    def sample_data( self, sample ):
+        ''' Returns the 16 bit sample data of the sample with the given index as memoryview of the
+        mapped file (little endian signed integers). Only this reads from the sdta chunk. Release
+        the view before closing the file. '''
+        offset, size = self.chunks.get( b'smpl', (0, 0) )
+        header = self.__records( b'shdr' )[sample]
+        start = offset + 2 * min( header[1], size // 2 )
+        end = offset + 2 * min( header[2], size // 2 )
+        return memoryview( self._data )[start:max(start, end)]
+
+    def write_subset( self, path, presets, keys = None ):
+        ''' Writes a SF2 file with only the presets with the given indices and the instruments and
+        samples they use to the given path. If keys (dictionary) maps a preset index to a set of
+        MIDI keys, zones whose key range contains none of them are left out, too. Bank and program
+        numbers are kept, so the subset plays like the original for the given keys. Sample data is
+        copied from the mapped file without loading it all. Returns the bytes of sample data
+        written. '''
+        presets = sorted( set(presets) )
+        keys = keys or {}
+
+        headers = self.__records( b'phdr' )
+        bags = self.__records( b'pbag' )
+        generators = self.__records( b'pgen' )
+        for index in presets:
+            if not 0 <= index < len( headers ) - 1:
+                raise IndexError( index )
+
+        # Preset zones and the keys reaching every instrument (None: all keys).
+        preset_zones = {}
+        instrument_keys = {}
+        for index in presets:
+            preset_keys = keys.get( index )
+            zones = []
+            for bag in self.__zones( headers, bags, index, 3 ):
+                zone = generators[bags[bag][0]:bags[bag + 1][0]]
+                zone_keys = self.__zone_keys( zone, preset_keys )
+                if zone_keys is not None and not zone_keys:
+                    continue
+                zones.append( bag )
+                for operator, amount in zone:
+                    if operator == self.GEN_INSTRUMENT:
+                        known = instrument_keys.get( amount, set() )
+                        instrument_keys[amount] = None if known is None or zone_keys is None \
+                                                  else known | zone_keys
+            preset_zones[index] = zones
+
+        instrument_headers = self.__records( b'inst' )
+        instrument_bags = self.__records( b'ibag' )
+        instrument_generators = self.__records( b'igen' )
+        instruments = sorted( instrument for instrument in instrument_keys
+                              if instrument < len(instrument_headers) - 1 )
+
+        # Instrument zones, the global zone (first zone without sample) is always kept.
+        instrument_zones = {}
+        samples = set()
+        for instrument in instruments:
+            zones = []
+            for bag in self.__zones( instrument_headers, instrument_bags, instrument, 1 ):
+                zone = instrument_generators[instrument_bags[bag][0]:instrument_bags[bag + 1][0]]
+                sample = [ amount for operator, amount in zone if operator == self.GEN_SAMPLE_ID ]
+                zone_keys = self.__zone_keys( zone, instrument_keys[instrument] )
+                if sample and zone_keys is not None and not zone_keys:
+                    continue
+                zones.append( bag )
+                samples.update( sample )
+            instrument_zones[instrument] = zones
+
+        # Linked samples (stereo pairs) are kept together.
+        sample_headers = self.__records( b'shdr' )
+        pending = [ sample for sample in samples if sample < len(sample_headers) - 1 ]
+        samples = set( pending )
+        while pending:
+            header = sample_headers[pending.pop()]
+            if header[9] & 0x7FFF not in self._LINKED_TYPES:
+                continue
+            link = header[8]
+            if link not in samples and link < len( sample_headers ) - 1:
+                samples.add( link )
+                pending.append( link )
+        samples = sorted( samples )
+
+        # Sample data ranges and the new headers.
+        smpl_offset, smpl_size = self.chunks.get( b'smpl', (0, 0) )
+        sm24_offset, sm24_size = self.chunks.get( b'sm24', (0, 0) )
+        points = smpl_size // 2
+        sample_map = { sample: new for new, sample in enumerate(samples) }
+        ranges = []
+        new_sample_headers = []
+        position = 0
+        for sample in samples:
+            name, start, end, loop_start, loop_end = sample_headers[sample][:5]
+            first = min( start, loop_start, points )
+            last = min( max(end, loop_end, first), points )
+            ranges.append( (first, last) )
+            shift = position - first
+            new_sample_headers.append( (name, start + shift, end + shift, loop_start + shift,
+                                        loop_end + shift) + sample_headers[sample][5:8] +
+                                       (sample_map.get(sample_headers[sample][8], 0),
+                                        sample_headers[sample][9]) )
+            position += last - first + self.SAMPLE_PADDING
+        new_sample_headers.append( (b'EOS',) + (0,) * 9 )
+
+        instrument_map = { instrument: new for new, instrument in enumerate(instruments) }
+        pdta = self.__write_zones( b'p', [ headers[index] for index in presets ],
+                                   [ preset_zones[index] for index in presets ], 3,
+                                   { self.GEN_INSTRUMENT: instrument_map } )
+        pdta += self.__write_zones( b'i', [ instrument_headers[index] for index in instruments ],
+                                    [ instrument_zones[index] for index in instruments ], 1,
+                                    { self.GEN_SAMPLE_ID: sample_map } )
+        pdta.append( self.__chunk(b'shdr', b''.join(self._FORMATS[b'shdr'].pack(*header)
+                                                    for header in new_sample_headers)) )
+        pdta = b'LIST' + struct.pack( '<I', 4 + sum(len(chunk) for chunk in pdta) ) + b'pdta' + \
+               b''.join( pdta )
+
+        info = b''.join( self.__chunk(chunk, self._data[self.chunks[chunk][0]:
+                                                        self.chunks[chunk][0] + self.chunks[chunk][1]])
+                         for chunk in self._info_chunks )
+        info = b'LIST' + struct.pack( '<I', 4 + len(info) ) + b'INFO' + info
+
+        padding = bytes( 2 * self.SAMPLE_PADDING )
+        smpl_bytes = 2 * position
+        sm24_bytes = position if sm24_size else 0
+        sdta_size = 4 + 8 + smpl_bytes + ( 8 + sm24_bytes + (sm24_bytes & 1) if sm24_bytes else 0 )
+        riff_size = 4 + len( info ) + 8 + sdta_size + len( pdta )
+
+        data = memoryview( self._data )
+        try:
+            with open( path, 'wb' ) as output:
+                output.write( b'RIFF' + struct.pack('<I', riff_size) + b'sfbk' + info )
+                output.write( b'LIST' + struct.pack('<I', sdta_size) + b'sdta' )
+                output.write( b'smpl' + struct.pack('<I', smpl_bytes) )
+                for first, last in ranges:
+                    output.write( data[smpl_offset + 2 * first:smpl_offset + 2 * last] )
+                    output.write( padding )
+                if sm24_bytes:
+                    output.write( b'sm24' + struct.pack('<I', sm24_bytes) )
+                    for first, last in ranges:
+                        extension = data[sm24_offset + min(first, sm24_size):
+                                         sm24_offset + min(last, sm24_size)]
+                        output.write( extension )
+                        output.write( bytes(last - first - len(extension) + self.SAMPLE_PADDING) )
+                    output.write( bytes(sm24_bytes & 1) )
+                output.write( pdta )
+        finally:
+            data.release()
+
+        return smpl_bytes + sm24_bytes
+
+    def __read_list( self, kind, pos, end ):
+        ''' Records the offset and size of the sub chunks of a LIST chunk of the given kind. '''
+        data = self._data
+        while pos + 8 <= end:
+            chunk, size = struct.unpack_from( '<4sI', data, pos )
+            self.chunks[chunk] = ( pos + 8, min(size, end - pos - 8) )
+            if kind == b'INFO':
+                self._info_chunks.append( chunk )
+            pos += 8 + size + ( size & 1 )
+
+    def __records( self, chunk ):
+        ''' Returns the parsed records of a pdta sub chunk including the terminal record. '''
+        records = self._records.get( chunk )
+        if records is None:
+            record_format = self._FORMATS[chunk]
+            offset, size = self.chunks.get( chunk, (0, 0) )
+            size -= size % record_format.size
+            view = memoryview( self._data )[offset:offset + size]
+            records = list( record_format.iter_unpack(view) )
+            view.release()
+            self._records[chunk] = records
+        return records
+
+    def __targets( self, header_chunk, bag_chunk, gen_chunk, index, operator ):
+        ''' Returns the amounts of all generators with the given operator in the zones of the
+        header with the given index. '''
+        headers = self.__records( header_chunk )
+        bags = self.__records( bag_chunk )
+        generators = self.__records( gen_chunk )
+        if not 0 <= index < len( headers ) - 1:
+            raise IndexError( index )
+
+        targets = set()
+        bag_index = 3 if header_chunk == b'phdr' else 1
+        for bag in self.__zones( headers, bags, index, bag_index ):
+            for generator in range( bags[bag][0], min(bags[bag + 1][0], len(generators)) ):
+                if generators[generator][0] == operator:
+                    targets.add( generators[generator][1] )
+        return targets
+
+    def __zone_keys( self, zone, keys ):
+        ''' Returns the given keys (set) within the key range of the zone (generators). None stands
+        for all keys. '''
+        if keys is None:
+            return None
+        for operator, amount in zone:
+            if operator == self.GEN_KEY_RANGE:
+                return { key for key in keys if amount & 0xFF <= key <= amount >> 8 }
+        return keys
+
+    def __write_zones( self, prefix, headers, zones, bag_index, maps ):
+        ''' Returns the header, bag, modulator and generator chunks (list) of the given headers
+        (preset or instrument records) with the given zones (bag indices per header). Generator
+        amounts with an operator in maps are mapped to their new index. '''
+        header_chunk = b'phdr' if prefix == b'p' else b'inst'
+        header_format = self._FORMATS[header_chunk]
+        bags = self.__records( prefix + b'bag' )
+        modulators = self.__records( prefix + b'mod' )
+        generators = self.__records( prefix + b'gen' )
+
+        new_headers, new_bags, new_modulators, new_generators = [], [], [], []
+        for header, header_zones in zip( headers, zones ):
+            header = list( header )
+            header[bag_index] = len( new_bags )
+            new_headers.append( header_format.pack(*header) )
+            for bag in header_zones:
+                new_bags.append( struct.pack('<HH', len(new_generators), len(new_modulators)) )
+                new_modulators.extend( self._FORMATS[prefix + b'mod'].pack(*modulator)
+                                       for modulator in modulators[bags[bag][1]:bags[bag + 1][1]] )
+                for operator, amount in generators[bags[bag][0]:bags[bag + 1][0]]:
+                    amount = maps[operator].get( amount, amount ) if operator in maps else amount
+                    new_generators.append( struct.pack('<HH', operator, amount) )
+
+        terminal = [ b'EOP' if prefix == b'p' else b'EOI' ] + [ 0 ] * bag_index
+        terminal[bag_index] = len( new_bags )
+        terminal += [ 0 ] * ( 3 if prefix == b'p' else 0 )
+        new_headers.append( header_format.pack(*terminal) )
+        new_bags.append( struct.pack('<HH', len(new_generators), len(new_modulators)) )
+        new_modulators.append( bytes(10) )
+        new_generators.append( bytes(4) )
+
+        names = [ header_chunk, prefix + b'bag', prefix + b'mod', prefix + b'gen' ]
+        return [ self.__chunk(name, b''.join(records)) for name, records in
+                 zip(names, (new_headers, new_bags, new_modulators, new_generators)) ]
+
+    def __zones( self, headers, bags, index, bag_index ):
+        ''' Returns the range of bag indices of the zones of the header with the given index. '''
+        return range( headers[index][bag_index], min(headers[index + 1][bag_index], len(bags) - 1) )
+
+    @staticmethod
+    def __chunk( chunk, data ):
+        ''' Returns a RIFF chunk with the given id and data. '''
+        return chunk + struct.pack( '<I', len(data) ) + bytes( data ) + bytes( len(data) & 1 )
+
+    @staticmethod
+    def __name( raw ):
+        ''' Decodes a zero terminated name. '''
+        return raw.split( b'\0', 1 )[0].decode( 'latin-1' ).strip()
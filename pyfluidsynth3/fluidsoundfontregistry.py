@@ -0,0 +1,170 @@
+from . import constants, fluiderror, utility
+
+from ctypes import POINTER, Structure, c_uint, c_void_p, cast
+import os
+import threading
+
+class _FluidSfont1( Structure ):
+    ''' Head of fluid_sfont_t of FluidSynth 1.x, which has no fluid_sfont_get_id(). '''
+    _fields_ = [ ('data', c_void_p), ('id', c_uint) ]
+
+class FluidSoundfontRegistry():
+    ''' Process wide registry of soundfonts which are shared by multiple FluidSynth objects. The
+    first synth attaching a soundfont loads it, every further synth only adds the already loaded
+    soundfont (fluid_sfont_t) to its soundfont stack, so samples are held in memory once. Entries
+    are keyed on the soundfont path, modification time and size and reference counted. The synth
+    detaching last unloads the soundfont.
+
+    FluidSynth stores the id of a soundfont in the soundfont itself and overwrites it whenever a
+    synth adds the soundfont, so the id of a shared soundfont changes with every attach. Ids are
+    therefore never cached: sfont_id() finds the soundfont by pointer in the stack of a synth and
+    returns its current id. The new id comes from the counter of the attaching synth and may equal
+    the id of another soundfont of a synth holding the shared one, which would make unloading and
+    program_select() by id hit the wrong soundfont. So every new id is checked against the stacks
+    of all synths holding the soundfont (see renumber()), own soundfonts of a FluidSynth object
+    included.
+
+    Usually this class is used through FluidSynth.load_soundfont( path, shared = True ) and the
+    module level instance "registry".
+
+    Member:
+    _entries -- Loaded soundfonts: key -> entry (dict).
+    _keys -- Key of every attached soundfont: (synth object, path) -> key (dict).
+    _lock -- Lock protecting the registry (threading.Lock).
+    '''
+
+    def __init__( self ):
+        ''' Creates an empty registry. '''
+        self._entries = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def __len__( self ):
+        ''' Returns the number of loaded soundfonts. '''
+        return len( self._entries )
+
+    def references( self, path ):
+        ''' Returns the number of synths the soundfont with the given path is attached to. '''
+        with self._lock:
+            entry = self._entries.get( self.__key(path) )
+            return len( entry['synths'] ) if entry else 0
+
+    def attach( self, synth, path, reload_presets = True ):
+        ''' Attaches the soundfont with the given path to a FluidSynth object and returns its
+        current soundfont id. The soundfont is loaded only if no other synth holds it. '''
+        handle = synth.handle
+        try:
+            key = self.__key( path )
+        except OSError:
+            raise fluiderror.FluidError( "Couldn't load soundfont {0}".format(path) )
+
+        with self._lock:
+            if (synth.synth, path) in self._keys:
+                raise fluiderror.FluidError( "Soundfont {0} already attached".format(path) )
+
+            entry = self._entries.get( key )
+            if entry:
+                id = handle.fluid_synth_add_sfont( synth.synth, entry['sfont'] )
+                if id == constants.FAILED:
+                    raise fluiderror.FluidError( "Couldn't add soundfont {0}".format(path) )
+            else:
+                id = handle.fluid_synth_sfload( synth.synth, utility.fluidstring(path),
+                                                reload_presets )
+                if id == constants.FAILED:
+                    raise fluiderror.FluidError( "Couldn't load soundfont {0}".format(path) )
+
+                sfont = handle.fluid_synth_get_sfont_by_id( synth.synth, id )
+                entry = self._entries[key] = { 'sfont': sfont, 'synths': set() }
+
+            entry['synths'].add( synth.synth )
+            self._keys[(synth.synth, path)] = key
+
+            return self.__renumber( handle, synth.synth, entry['sfont'] )
+
+    def detach( self, synth, path, reload_presets = True ):
+        ''' Detaches the soundfont with the given path from a FluidSynth object. The soundfont is
+        unloaded if no other synth holds it. '''
+        handle = synth.handle
+
+        with self._lock:
+            try:
+                key = self._keys.pop( (synth.synth, path) )
+            except KeyError:
+                raise fluiderror.FluidError( "Soundfont {0} never attached".format(path) )
+
+            entry = self._entries[key]
+            entry['synths'].discard( synth.synth )
+
+            if entry['synths']:
+                # Other synths still use the soundfont, so only remove it from the stack.
+                handle.fluid_synth_remove_sfont( synth.synth, entry['sfont'] )
+            else:
+                del self._entries[key]
+                id = find_sfont_id( handle, synth.synth, entry['sfont'] )
+                if id is None or \
+                   handle.fluid_synth_sfunload( synth.synth, id, reload_presets ) == constants.FAILED:
+                    raise fluiderror.FluidError( "Couldn't unload soundfont {0}".format(path) )
+
+    def sfont_id( self, synth, path ):
+        ''' Returns the current id of the soundfont with the given path in the given FluidSynth
+        object. Raises a FluidError if it isn't attached. '''
+        with self._lock:
+            key = self._keys.get( (synth.synth, path) )
+            id = None
+            if key is not None:
+                id = find_sfont_id( synth.handle, synth.synth, self._entries[key]['sfont'] )
+            if id is None:
+                raise fluiderror.FluidError( "Soundfont {0} not attached".format(path) )
+            return id
+
+    def renumber( self, synth, sfont ):
+        ''' Makes the id of a soundfont (fluid_sfont_t) which was just added to the top of the stack
+        of a FluidSynth object unique in the stacks of all synths holding it and returns the id.
+        FluidSynth objects call this for their own soundfonts. '''
+        with self._lock:
+            return self.__renumber( synth.handle, synth.synth, sfont )
+
+    def __renumber( self, handle, synth, sfont ):
+        ''' Adds the soundfont on top of the stack of the synth (fluid_synth_t) again until no other
+        soundfont of a synth holding it has its id. Every add takes a new id from the counter of
+        the synth, so this ends. Returns the id. '''
+        holders = { synth }
+        for entry in self._entries.values():
+            if entry['sfont'] == sfont:
+                holders |= entry['synths']
+
+        while True:
+            id = _sfont_id( handle, sfont )
+            if not any( other != sfont and _sfont_id(handle, other) == id
+                        for holder in holders for other in _sfont_stack(handle, holder) ):
+                return id
+            handle.fluid_synth_remove_sfont( synth, sfont )
+            handle.fluid_synth_add_sfont( synth, sfont )
+
+    def __key( self, path ):
+        ''' Returns the registry key of a soundfont path. '''
+        stat = os.stat( path )
+        return os.path.abspath( path ), stat.st_mtime, stat.st_size
+
+def find_sfont_id( handle, synth, sfont ):
+    ''' Returns the current id of the soundfont (fluid_sfont_t) in the stack of the synth
+    (fluid_synth_t) or None if it isn't in the stack. '''
+    if sfont in _sfont_stack( handle, synth ):
+        return _sfont_id( handle, sfont )
+    return None
+
+def _sfont_id( handle, sfont ):
+    ''' Returns the id of the soundfont (fluid_sfont_t). '''
+    try:
+        return handle.fluid_sfont_get_id( sfont )
+    except AttributeError:
+        return cast( sfont, POINTER(_FluidSfont1) ).contents.id
+
+def _sfont_stack( handle, synth ):
+    ''' Returns the soundfonts (fluid_sfont_t) in the stack of the synth (fluid_synth_t), top
+    first. '''
+    return [ handle.fluid_synth_get_sfont(synth, index)
+             for index in range(handle.fluid_synth_sfcount(synth)) ]
+
+# Process wide soundfont registry.
+registry = FluidSoundfontRegistry()
@@ -0,0 +1,93 @@
+from . import constants, fluiderror, fluidmidifile, fluidsoundfontfile
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+FluidSoundfontSubset = collections.namedtuple( 'FluidSoundfontSubset', 'path presets size full_size' )
+FluidSoundfontSubset.__doc__ = ''' Subset of a soundfont written by soundfont_subset(). Presets is
+the number of presets in the subset, size and full_size are the file sizes of the subset and the
+original soundfont in bytes. '''
+
+BANK_SELECT = 0
+CACHE_DIRECTORY = os.path.join( tempfile.gettempdir(), 'pyfluidsynth3-subsets' )
+DRUM_BANK = 128
+
+def midi_presets( midi ):
+    ''' Scans the MIDI file with the given path and returns the keys played with every preset as
+    dictionary (bank, program) -> set of keys. Channels start with program 0 of bank 0, the drum
+    channel with bank DRUM_BANK. Bank select (controller 0) takes effect with the next program
+    change like in FluidSynth. '''
+    drum_channel = fluidmidifile.FluidMidiFile.DRUM_CHANNEL
+    banks = {}
+    programs = {}
+    presets = {}
+
+    with fluidmidifile.FluidMidiFile( midi ) as midi_file:
+        for event in midi_file.events():
+            channel = event.channel
+            if event.type == constants.NOTE_ON:
+                preset = programs.get( channel )
+                if preset is None:
+                    preset = ( DRUM_BANK if channel == drum_channel else 0, 0 )
+                presets.setdefault( preset, set() ).add( event.p1 )
+            elif event.type == constants.CONTROL_CHANGE and event.p1 == BANK_SELECT:
+                banks[channel] = event.p2
+            elif event.type == constants.PROGRAM_CHANGE:
+                bank = DRUM_BANK if channel == drum_channel else banks.get( channel, 0 )
+                programs[channel] = ( bank, event.p1 )
+
+    return presets
+
+def soundfont_subset( soundfont, midi, cache_directory = None, key_ranges = True ):
+    ''' Returns the subset (FluidSoundfontSubset) of the soundfont with the given path holding only
+    the presets the MIDI file with the given path plays. If key_ranges is true zones outside of
+    the played keys are left out, too. A preset missing in the soundfont is replaced like
+    FluidSynth does: by the same program of bank 0 (drums: DRUM_BANK) or else by program 0 of it.
+
+    Subsets are written to the cache directory (default: CACHE_DIRECTORY) once and reused by all
+    MIDI files using the same presets (and keys) of the same soundfont file (path, size and
+    modification time). Delete the directory to clear the cache. Raises a FluidError if the
+    soundfont can't be read or the subset can't be written. '''
+    soundfont = os.path.abspath( soundfont )
+    cache_directory = cache_directory or CACHE_DIRECTORY
+    try:
+        stat = os.stat( soundfont )
+    except OSError as e:
+        raise fluiderror.FluidError( "Couldn't read soundfont {0}: {1}".format(soundfont, e) )
+
+    used = midi_presets( midi )
+    with fluidsoundfontfile.FluidSoundfontFile( soundfont ) as sf:
+        selected = {}
+        for ( bank, program ), keys in used.items():
+            fallback = DRUM_BANK if bank == DRUM_BANK else 0
+            for candidate in ( (bank, program), (fallback, program), (fallback, 0) ):
+                index = sf.find_preset( *candidate )
+                if index is not None:
+                    selected.setdefault( index, set() ).update( keys )
+                    break
+
+        key = [ soundfont, stat.st_size, stat.st_mtime_ns,
+                sorted( [index, sorted(keys) if key_ranges else None]
+                        for index, keys in selected.items() ) ]
+        digest = hashlib.sha1( json.dumps(key).encode() ).hexdigest()
+        name = os.path.splitext( os.path.basename(soundfont) )[0]
+        path = os.path.join( cache_directory, '{0}-{1}.sf2'.format(name, digest[:16]) )
+
+        if not os.path.isfile( path ):
+            # Threads and processes writing the same subset each use their own temporary file.
+            temp_path = None
+            try:
+                os.makedirs( cache_directory, exist_ok = True )
+                descriptor, temp_path = tempfile.mkstemp( suffix = '.sf2', dir = cache_directory )
+                os.close( descriptor )
+                sf.write_subset( temp_path, selected, selected if key_ranges else None )
+                os.replace( temp_path, path )
+            except OSError as e:
+                if temp_path is not None and os.path.isfile( temp_path ):
+                    os.remove( temp_path )
+                raise fluiderror.FluidError( "Couldn't write soundfont subset {0}: {1}".format(path, e) )
+
+    return FluidSoundfontSubset( path, len(selected), os.path.getsize(path), stat.st_size )
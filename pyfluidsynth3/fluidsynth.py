@@ -1,4 +1,7 @@
-from . import constants, fluiderror, utility
+from . import constants, fluiderror, fluidnotescheduler, fluidpresetcatalog, fluidsoundfontfile
+from . import fluidsoundfontregistry, fluidsoundfontsubset, utility
+
+from ctypes import POINTER, c_float, c_void_p, cast
 
 class FluidSynth():
     ''' Represents the FluidSynth synth object as defined in synth.h.
@@ -6,64 +9,196 @@ class FluidSynth():
     This class is inspired by the FluidSynth object from pyfluidsynth by MostAwesomeDude. Method 
     documentation is mostly taken from FluidSynth's official API.
     
+    Constants:
+    BLOCK_FRAMES -- Number of frames rendered at once by render_stems().
+    CHANNELS -- Number of interleaved audio channels written by write_float() and write_s16().
+    INTERP_NONE, INTERP_LINEAR, INTERP_4THORDER, INTERP_7THORDER -- Interpolation methods of 
+    set_interpolation() from fastest to best quality. The default is INTERP_4THORDER.
+    
     Member:
     handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will 
               probably work, too (FluidHandle).
     settings -- The settings object (FluidSettings).
     synth -- The FluidSynth synth object (fluid_synth_t).
-    _sf_dict -- Dictionary of soundfonts (dict).
+    _catalog -- Index of the presets of the loaded soundfonts (FluidPresetCatalog).
+    _catalog_paths -- Path of the soundfont of every id in the catalog (dict).
+    _notes -- Scheduler of note durations created on first use or None (FluidNoteScheduler).
+    _sf_dict -- Loaded soundfonts (fluid_sfont_t) by path, None for shared soundfonts (dict).
+    _sf_shared -- Soundfonts attached through the process wide soundfont registry (set).
     '''
 
+    BLOCK_FRAMES = 4096
+    CHANNELS = 2
+    INTERP_NONE, INTERP_LINEAR, INTERP_4THORDER, INTERP_7THORDER = 0, 1, 4, 7
+
     def __init__( self, handle, settings ):
         ''' Creates a new FluidSynth synth instance using the given handle and settings. '''
         self.handle = handle
         self.settings = settings
         self.synth = self.handle.new_fluid_synth( self.settings.settings )
+        self._catalog = fluidpresetcatalog.FluidPresetCatalog()
+        self._catalog_paths = {}
+        self._notes = None
         self._sf_dict = {}
+        self._sf_shared = set()
         
     def __del__( self ):
         ''' Removes all soundfonts and deletes synth instance. '''
         failed = []
         for sf in self._sf_dict:
-            result = self.handle.fluid_synth_sfunload( self.synth, self._sf_dict[sf], True )
-            if result is constants.FAILED:
+            if sf in self._sf_shared:
+                try:
+                    fluidsoundfontregistry.registry.detach( self, sf, False )
+                except fluiderror.FluidError:
+                    failed.append(sf)
+                continue
+            id = fluidsoundfontregistry.find_sfont_id( self.handle, self.synth, self._sf_dict[sf] )
+            if id is None or \
+               self.handle.fluid_synth_sfunload( self.synth, id, True ) is constants.FAILED:
                 failed.append(sf)
         self.handle.delete_fluid_synth( self.synth )
 
         if failed:
             raise fluiderror.FluidError( "Couldn't unload soundfonts: {0}".format(failed) )
 
-    def load_soundfont( self, sf, reload_presets = True ):
-        ''' Load soundfont. If reload presets is true FluidSynth will reassign all MIDI channels. '''
+    def load_soundfont( self, sf, reload_presets = True, shared = False ):
+        ''' Load soundfont and return its id. If reload presets is true FluidSynth will reassign all 
+        MIDI channels. If shared is true the soundfont is taken from the process wide soundfont 
+        registry, so synths loading the same file share its samples instead of loading it again. 
+        Loading a soundfont again reloads it unless it is shared. The id of a shared soundfont
+        changes when other synths attach it, see soundfont_id(). A new id is never the id of
+        another soundfont of this synth or of the synths sharing a soundfont with it. '''
         sf_raw = sf
         sf = utility.fluidstring( sf )
         
-        if sf in self._sf_dict:
-            result = self.handle.fluid_synth_sfreload( self.synth, self._sf_dict[sf] )
+        if sf_raw in self._sf_dict:
+            if sf_raw in self._sf_shared:
+                return self.soundfont_id( sf_raw )
+            
+            result = self.handle.fluid_synth_sfreload( self.synth, self.soundfont_id(sf_raw) )
             if result is constants.FAILED:
                 raise fluiderror.FluidError( "Couldn't reload soundfont {0}".format(sf_raw) )
+            # The reloaded soundfont keeps its id and place in the stack but is a new object.
+            self._sf_dict[sf_raw] = self.handle.fluid_synth_get_sfont_by_id( self.synth, result )
+            
+        elif shared:
+            result = fluidsoundfontregistry.registry.attach( self, sf_raw, reload_presets )
+            self._sf_dict[sf_raw] = None
+            self._sf_shared.add( sf_raw )
             
         else:
             result = self.handle.fluid_synth_sfload( self.synth, sf, reload_presets )
             if result is constants.FAILED:
                 raise fluiderror.FluidError( "Couldn't load soundfont {0}".format(sf_raw) )
-            else:
-                self._sf_dict[sf_raw] = result
+            # The new soundfont is on top of the stack, so it is found even if its id collides
+            # with a shared soundfont whose id another synth assigned.
+            sfont = self.handle.fluid_synth_get_sfont_by_id( self.synth, result )
+            self._sf_dict[sf_raw] = sfont
+            result = fluidsoundfontregistry.registry.renumber( self, sfont )
+        
+        return result
+
+    def soundfont_id( self, sf ):
+        ''' Returns the current id of the loaded soundfont with the given path. Ids of shared
+        soundfonts change whenever another synth attaches them, so pass this instead of the id
+        returned by load_soundfont() to program_select(). '''
+        if sf not in self._sf_dict:
+            raise fluiderror.FluidError( "Soundfont {0} never loaded".format(sf) )
+        if sf in self._sf_shared:
+            return fluidsoundfontregistry.registry.sfont_id( self, sf )
+        id = fluidsoundfontregistry.find_sfont_id( self.handle, self.synth, self._sf_dict[sf] )
+        if id is None:
+            raise fluiderror.FluidError( "Soundfont {0} not in the synth".format(sf) )
+        return id
+
+    def load_soundfont_subset( self, sf, midi, reload_presets = True, cache_directory = None ):
+        ''' Loads only the presets (and keys) of the soundfont which the given MIDI file plays,
+        which needs a fraction of the memory of the whole soundfont. The subset is written to a
+        cache once (see fluidsoundfontsubset.soundfont_subset()). Returns the subset
+        (FluidSoundfontSubset), unload it with unload_soundfont( subset.path ). '''
+        subset = fluidsoundfontsubset.soundfont_subset( sf, midi, cache_directory )
+        self.load_soundfont( subset.path, reload_presets )
+        return subset
+
+    @staticmethod
+    def inspect_soundfont( sf ):
+        ''' Opens the soundfont file for reading its metadata (presets, samples, memory footprint)
+        without loading it into a synth. Close the returned FluidSoundfontFile after use. '''
+        return fluidsoundfontfile.FluidSoundfontFile( sf )
 
     def unload_soundfont( self, sf, reload_presets = True ):
-        ''' Unload soundfont. If reload presets is true FluidSynth will reassign all midi channels. '''
+        ''' Unload soundfont. If reload presets is true FluidSynth will reassign all midi channels. 
+        A shared soundfont is only unloaded if no other synth uses it. '''
         sf_raw = sf
-        sf = utility.fluidstring( sf )
         
-        if sf not in self._sf_dict:
+        if sf_raw not in self._sf_dict:
             raise fluiderror.FluidError( "Soundfont {0} never loaded".format(sf_raw) )
         
-        result = self.handle.fluid_synth_sfunload( self.synth, self._sf_dict[sf], reload_presets )
+        if sf_raw in self._sf_shared:
+            fluidsoundfontregistry.registry.detach( self, sf_raw, reload_presets )
+            self._sf_shared.discard( sf_raw )
+            del self._sf_dict[sf_raw]
+            return
+        
+        result = self.handle.fluid_synth_sfunload( self.synth, self.soundfont_id(sf_raw), reload_presets )
         if result is constants.FAILED:
-            raise fluiderror.FluidError( "Couldn't unload soundfont %s".format(sf_raw) )
+            raise fluiderror.FluidError( "Couldn't unload soundfont {0}".format(sf_raw) )
         else:
             del self._sf_dict[sf_raw]
 
+    @property
+    def cpu_load( self ):
+        ''' Returns the CPU load of the synth in percent of the available realtime. '''
+        return self.handle.fluid_synth_get_cpu_load( self.synth )
+
+    @property
+    def active_voices( self ):
+        ''' Returns the number of currently playing voices. '''
+        return self.handle.fluid_synth_get_active_voice_count( self.synth )
+
+    @property
+    def midi_channels( self ):
+        ''' Returns the number of MIDI channels (setting "synth.midi-channels"). '''
+        return self.handle.fluid_synth_count_midi_channels( self.synth )
+
+    @property
+    def polyphony( self ):
+        ''' Returns the maximal number of voices. Further notes steal voices. '''
+        return self.handle.fluid_synth_get_polyphony( self.synth )
+
+    @polyphony.setter
+    def polyphony( self, value ):
+        ''' Sets the maximal number of voices. '''
+        if self.handle.fluid_synth_set_polyphony( self.synth, value ) == constants.FAILED:
+            raise fluiderror.FluidError( "Couldn't set polyphony {0}".format(value) )
+
+    def set_interpolation( self, method, channel = -1 ):
+        ''' Sets the sample interpolation method (see INTERP_*) of the given MIDI channel or of all 
+        channels if channel is -1. Lower quality methods need less CPU per voice. '''
+        if self.handle.fluid_synth_set_interp_method( self.synth, channel, method ) == constants.FAILED:
+            raise fluiderror.FluidError( "Couldn't set interpolation method {0}".format(method) )
+
+    def channel_voices( self ):
+        ''' Returns a list with the number of playing voices of every MIDI channel. Walks the voice
+        list of the synth, so it costs more than active_voices. The voice list may change while
+        the synth renders, so only call this from the thread rendering the synth, e.g. with
+        FluidAudioDriver.request_channel_voices() while a driver plays. Requires FluidSynth 2
+        (fluid_voice_get_channel). '''
+        counts = [ 0 ] * self.midi_channels
+        size = self.polyphony
+        voices = ( c_void_p * (size + 1) )()
+        self.handle.fluid_synth_get_voicelist( self.synth, voices, size + 1, -1 )
+
+        is_playing = self.handle.fluid_voice_is_playing
+        get_channel = self.handle.fluid_voice_get_channel
+        for voice in voices:
+            if not voice:
+                break
+            if is_playing( voice ):
+                counts[get_channel(voice)] += 1
+
+        return counts
+
     def noteon( self, channel, pitch, velocity ):
         ''' Send a note-on event to a FluidSynth object. Returns true in case of success else 
         false. '''
@@ -78,6 +213,24 @@ class FluidSynth():
         result = self.handle.fluid_synth_noteoff( self.synth, channel, pitch )
         return result == constants.OK
 
+    @property
+    def notes( self ):
+        ''' Returns the scheduler of notes started by play_note() (FluidNoteScheduler). '''
+        if self._notes is None:
+            self._notes = fluidnotescheduler.FluidNoteScheduler( self )
+        return self._notes
+
+    def play_note( self, channel, pitch, velocity, duration ):
+        ''' Plays a note for duration milliseconds. The note-off is sent by a background thread
+        shared by all notes of this synth (see notes). Returns the note id, which can be passed to
+        notes.cancel(), or None if the note-on failed. '''
+        return self.notes.play( channel, pitch, velocity, duration )
+
+    def all_notes_off( self, channel = None ):
+        ''' Stops all notes of the given or all MIDI channels and cancels pending note-offs of 
+        play_note(). '''
+        self.notes.all_notes_off( channel )
+
     def cc( self, channel, control, value ):
         ''' Send a MIDI controller event on a MIDI channel. An alias method "constrol_change" 
         exists. Returns true in case of success else false. '''
@@ -106,8 +259,180 @@ class FluidSynth():
         result = self.handle.fluid_synth_program_change( self.synth, channel, program )
         return result == constants.OK
 
+    def program_select( self, channel, sfont, bank, program ):
+        ''' Select an instrument on a MIDI channel by soundfont id, bank and program number. 
+        Returns true in case of success else false. '''
+        result = self.handle.fluid_synth_program_select( self.synth, channel, sfont, bank, program )
+        return result == constants.OK
+
+    @property
+    def presets( self ):
+        ''' Returns the index of the presets of all loaded soundfonts (FluidPresetCatalog). It is
+        updated on access, the presets of a soundfont are read on first access after loading it
+        (see fluidpresetcatalog.soundfont_presets()). Soundfonts whose id changed are read
+        again. '''
+        loaded = { self.soundfont_id(path): path for path in self._sf_dict }
+        for sfont in self._catalog.soundfonts():
+            if loaded.get( sfont ) != self._catalog_paths.get( sfont ):
+                self._catalog.remove( sfont )
+                del self._catalog_paths[sfont]
+
+        for sfont, path in loaded.items():
+            if sfont not in self._catalog:
+                self._catalog_paths[sfont] = path
+                path = path.decode() if isinstance( path, bytes ) else path
+                self._catalog.add( sfont, fluidpresetcatalog.soundfont_presets(self, sfont, path) )
+
+        return self._catalog
+
+    def select_preset( self, channel, name ):
+        ''' Select the instrument with the given name on a MIDI channel. If no preset has exactly
+        this name (case insensitive) the best fuzzy match is used. Raises a FluidError if nothing
+        matches. Returns the selected preset (FluidPreset). '''
+        presets = self.presets.lookup( name ) or self.presets.search( name, 1 )
+        if not presets:
+            raise fluiderror.FluidError( "Unknown preset {0}".format(name) )
+
+        preset = presets[0]
+        if not self.program_select( channel, preset.sfont, preset.bank, preset.program ):
+            raise fluiderror.FluidError( "Couldn't select preset {0}".format(preset.name) )
+        return preset
+
     def bank_select( self, channel, bank ):
         ''' Set instrument bank number on a MIDI channel. Returns true in case of success else 
         false. '''
         result = self.handle.fluid_synth_bank_select( self.synth, channel, bank )
-        return result == constants.OK
\ No newline at end of file
+        return result == constants.OK
+
+    def system_reset( self ):
+        ''' Reset synthesizer to its initial state: All notes off, all controllers and programs 
+        reset. Returns true in case of success else false. '''
+        result = self.handle.fluid_synth_system_reset( self.synth )
+        return result == constants.OK
+
+    def send_messages( self, types, channels = None, p1 = None, p2 = None, status = False ):
+        ''' Send a batch of MIDI messages to a FluidSynth object in one call. The messages are given
+        as parallel sequences or NumPy arrays of message type (see constants.NOTE_ON, NOTE_OFF, 
+        CONTROL_CHANGE, PROGRAM_CHANGE and PITCH_BEND), channel and the parameters p1 and p2. 
+        Alternatively types may be a structured NumPy array with the fields "type", "channel", "p1" 
+        and "p2". Velocities must be integers. Returns a list with the result of every message if 
+        status is true else true if all messages succeeded. '''
+        if channels is None:
+            types, channels, p1, p2 = types['type'], types['channel'], types['p1'], types['p2']
+        if p2 is None:
+            p2 = ( 0, ) * len( types )
+
+        types = utility.fluidcolumn( types )
+        channels = utility.fluidcolumn( channels )
+        p1 = utility.fluidcolumn( p1 )
+        p2 = utility.fluidcolumn( p2 )
+
+        synth = self.synth
+        noteon = self.handle.fluid_synth_noteon
+        noteoff = self.handle.fluid_synth_noteoff
+        cc = self.handle.fluid_synth_cc
+        program_change = self.handle.fluid_synth_program_change
+        pitch_bend = self.handle.fluid_synth_pitch_bend
+
+        results = []
+        failed = False
+
+        for kind, channel, param1, param2 in zip( types, channels, p1, p2 ):
+            if kind == constants.NOTE_ON:
+                result = noteon( synth, channel, param1, param2 )
+            elif kind == constants.NOTE_OFF:
+                result = noteoff( synth, channel, param1 )
+            elif kind == constants.CONTROL_CHANGE:
+                result = cc( synth, channel, param1, param2 )
+            elif kind == constants.PITCH_BEND:
+                result = pitch_bend( synth, channel, param1 )
+            elif kind == constants.PROGRAM_CHANGE:
+                result = program_change( synth, channel, param1 )
+            else:
+                raise fluiderror.FluidError( "Unknown message type {0}".format(kind) )
+
+            if status:
+                results.append( result == constants.OK )
+            elif result != constants.OK:
+                failed = True
+
+        return results if status else not failed
+
+    def write_float( self, buffer, frames = None ):
+        ''' Synthesize audio faster than realtime into the given writable buffer (e.g. a float32 
+        NumPy array of shape (frames, 2), array.array('f') or bytearray). Samples are written as 
+        interleaved stereo 32 bit floats. If frames is None the whole buffer is filled. Returns the 
+        number of frames written. '''
+        return self.__write( self.handle.fluid_synth_write_float, buffer, frames, 'f', 4 )
+
+    def write_s16( self, buffer, frames = None ):
+        ''' Synthesize audio faster than realtime into the given writable buffer (e.g. an int16 
+        NumPy array of shape (frames, 2), array.array('h') or bytearray). Samples are written as 
+        interleaved stereo 16 bit signed integers. If frames is None the whole buffer is filled. 
+        Returns the number of frames written. '''
+        return self.__write( self.handle.fluid_synth_write_s16, buffer, frames, 'h', 2 )
+
+    @property
+    def audio_groups( self ):
+        ''' Returns the number of stereo output groups (setting "synth.audio-groups"). MIDI channel
+        n is rendered to group n modulo audio_groups by process(). '''
+        return self.handle.fluid_synth_count_audio_groups( self.synth )
+
+    def process( self, outputs, frames = None ):
+        ''' Synthesize audio faster than realtime into separate mono float32 buffers, e.g. NumPy
+        arrays or array.array('f'). Outputs are ordered left, right of group 0, left, right of
+        group 1 and so on, up to two per audio group (see audio_groups), effects are not rendered.
+        Audio is added to the buffers, so they must be cleared first. If frames is None the smallest
+        buffer is filled. Returns the number of frames written. Raises a FluidError if outputs is
+        empty or the library fails, e.g. FluidSynth 1.x rejects more than one stereo pair. '''
+        buffers = [ utility.fluidbuffer(output, 'f', 4) for output in outputs ]
+        if not buffers:
+            raise fluiderror.FluidError( "No output buffers" )
+        capacity = min( samples for raw, samples in buffers )
+
+        if frames is None:
+            frames = capacity
+        elif frames > capacity:
+            raise fluiderror.FluidError( "Buffer too small for {0} frames".format(frames) )
+
+        pointers = ( POINTER(c_float) * len(buffers) )( *[cast(raw, POINTER(c_float))
+                                                           for raw, samples in buffers] )
+        result = self.handle.fluid_synth_process( self.synth, frames, 0, None, len(buffers), pointers )
+        if result == constants.FAILED:
+            raise fluiderror.FluidError( "Couldn't process {0} frames".format(frames) )
+
+        return frames
+
+    def render_stems( self, frames, block_frames = BLOCK_FRAMES ):
+        ''' Renders the given number of frames of every audio group in one pass and returns them as
+        float32 NumPy array of shape (audio_groups, CHANNELS, frames). Set "synth.audio-groups"
+        and "synth.audio-channels" to 16 before creating the synth to get one stem per MIDI
+        channel. A synth without audio groups returns an empty array. Requires NumPy. '''
+        import numpy
+
+        groups = max( self.audio_groups, 0 )
+        if not groups:
+            return numpy.zeros( (0, self.CHANNELS, frames), numpy.float32 )
+
+        stems = numpy.zeros( (groups * self.CHANNELS, frames), numpy.float32 )
+        for start in range( 0, frames, block_frames ):
+            end = min( start + block_frames, frames )
+            self.process( [stem[start:end] for stem in stems] )
+
+        return stems.reshape( groups, self.CHANNELS, frames )
+
+    def __write( self, func, buffer, frames, item_format, itemsize ):
+        ''' Render frames into buffer using the given FluidSynth write function. '''
+        raw, samples = utility.fluidbuffer( buffer, item_format, itemsize )
+        capacity = samples // self.CHANNELS
+
+        if frames is None:
+            frames = capacity
+        elif frames > capacity:
+            raise fluiderror.FluidError( "Buffer too small for {0} frames".format(frames) )
+
+        result = func( self.synth, frames, raw, 0, self.CHANNELS, raw, 1, self.CHANNELS )
+        if result == constants.FAILED:
+            raise fluiderror.FluidError( "Couldn't write {0} frames".format(frames) )
+
+        return frames
\ No newline at end of file
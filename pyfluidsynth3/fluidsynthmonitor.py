@@ -0,0 +1,128 @@
+import collections
+import threading
+import time
+
+FluidSynthSample = collections.namedtuple( 'FluidSynthSample',
+                                           'time cpu_load voices polyphony channels' )
+FluidSynthSample.__doc__ = ''' Telemetry sample of a synth. Time is a time.monotonic() value,
+cpu_load in percent, channels a list of voices per MIDI channel or None if not sampled. '''
+
+class FluidSynthMonitor():
+    ''' Samples the load of a synth on a background thread and keeps the most recent samples in a
+    ring buffer. A sample costs a few library calls, so sampling a few times per second is cheap.
+    Use the samples to shed load before the synth runs out of voices and starts stealing them.
+
+    The voice list of a synth may only be walked by the thread rendering it, so voices per MIDI
+    channel are only sampled if an audio driver created with count_voices is given. Every sample
+    requests a count from the driver and reports the one counted after the previous request, i.e.
+    channels lags by one interval and is None until the driver answered the first request.
+
+    Example:
+    driver = FluidAudioDriver( handle, synth, settings, count_voices = True )
+    with FluidSynthMonitor( synth, interval = 0.5, driver = driver ) as monitor:
+        ...
+        if monitor.saturated():
+            reject_new_jobs()
+
+    Constants:
+    INTERVAL_DEFAULT -- Default seconds between two samples.
+    SIZE_DEFAULT -- Default number of kept samples.
+
+    Member:
+    driver -- Audio driver counting the voices per MIDI channel or None (FluidAudioDriver).
+    interval -- Seconds between two samples (float).
+    synth -- The monitored synth (FluidSynth).
+    _lock -- Guards the samples (threading.Lock).
+    _samples -- The most recent samples (collections.deque).
+    _stop -- Set to stop the sampler thread (threading.Event).
+    _thread -- The sampler thread or None (threading.Thread).
+    '''
+
+    INTERVAL_DEFAULT = 1.0
+    SIZE_DEFAULT = 60
+
+    def __init__( self, synth, interval = INTERVAL_DEFAULT, size = SIZE_DEFAULT, driver = None ):
+        ''' Creates a monitor keeping size samples. Sampling starts with start() or when entering a
+        with block. '''
+        self.driver = driver
+        self.interval = interval
+        self.synth = synth
+
+        self._lock = threading.Lock()
+        self._samples = collections.deque( maxlen = size )
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__( self ):
+        self.start()
+        return self
+
+    def __exit__( self, *args ):
+        self.stop()
+
+    @property
+    def latest( self ):
+        ''' Returns the most recent sample or None. '''
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def samples( self ):
+        ''' Returns a list of the kept samples, oldest first. '''
+        with self._lock:
+            return list( self._samples )
+
+    def sample( self ):
+        ''' Takes a sample right away, stores and returns it. '''
+        synth = self.synth
+        channels = None
+        if self.driver is not None:
+            channels = self.driver.channel_voices
+            self.driver.request_channel_voices()
+
+        sample = FluidSynthSample( time.monotonic(), synth.cpu_load, synth.active_voices,
+                                   synth.polyphony, channels )
+        with self._lock:
+            self._samples.append( sample )
+        return sample
+
+    def mean( self, field, count = None ):
+        ''' Returns the mean of the given numeric field (e.g. "cpu_load" or "voices") over the last
+        count samples (all if None) or None if there are no samples. '''
+        samples = self.samples()
+        if count is not None:
+            samples = samples[-count:]
+        if not samples:
+            return None
+        return sum( getattr(sample, field) for sample in samples ) / len( samples )
+
+    def saturated( self, voices = 0.9, cpu_load = 90.0 ):
+        ''' Returns true if the latest sample uses at least the given fraction of the polyphony or
+        the given CPU load in percent. '''
+        sample = self.latest
+        if sample is None:
+            return False
+        return sample.voices >= voices * sample.polyphony or sample.cpu_load >= cpu_load
+
+    def start( self ):
+        ''' Starts the sampler thread. '''
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread( target = self.__run, name = 'FluidSynthMonitor',
+                                         daemon = True )
+        self._thread.start()
+
+    def stop( self ):
+        ''' Stops the sampler thread. Kept samples remain available. '''
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __run( self ):
+        ''' Sampler thread: Takes a sample every interval seconds until stopped. '''
+        while True:
+            self.sample()
+            if self._stop.wait( self.interval ):
+                break
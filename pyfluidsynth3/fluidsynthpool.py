@@ -0,0 +1,150 @@
+from . import fluiderror, fluidsettings, fluidsynth
+
+import contextlib
+import threading
+import time
+
+class FluidSynthPool():
+    ''' Pool of ready to use FluidSynth objects with soundfonts loaded. The pool creates up to size
+    synths which share one FluidSettings object and their soundfonts (see FluidSoundfontRegistry).
+    A synth is reset when it is returned (all notes off, controllers and programs reset, reverb and
+    chorus buffers cleared), so every user gets a synth in its initial state. If all synths are in
+    use acquire() waits, which caps the number of concurrently used synths.
+
+    Example:
+    pool = FluidSynthPool( handle, ['soundfont.sf2'], size = 4 )
+    with pool.synth() as synth:
+        synth.noteon( 0, 60, 1.0 )
+
+    Member:
+    handle -- The handle to the FluidSynth library. Should be FluidHandle but a raw handle will
+              probably work, too (FluidHandle).
+    settings -- The settings object used by all synths (FluidSettings).
+    size -- Maximal number of synths (int).
+    soundfonts -- Soundfonts loaded into every synth (list).
+    _condition -- Condition protecting the pool and signaling returned synths (threading.Condition).
+    _created -- Number of created synths (int).
+    _idle -- Synths ready to be acquired (list).
+    _in_use -- Acquired synths which weren't released yet (set).
+    _metrics -- Pool counters (dict).
+    '''
+
+    def __init__( self, handle, soundfonts, size, settings = None, prewarm = None ):
+        ''' Creates a pool of at most size synths. Settings may be a FluidSettings object, a
+        dictionary of settings or None. Prewarm synths (default: size) are created right away, the
+        remaining ones on demand. '''
+        self.handle = handle
+        self.soundfonts = list( soundfonts )
+        self.size = size
+
+        if isinstance( settings, fluidsettings.FluidSettings ):
+            self.settings = settings
+        else:
+            self.settings = fluidsettings.FluidSettings( handle )
+            self.settings.update( settings or {} )
+
+        self._condition = threading.Condition()
+        self._created = 0
+        self._idle = []
+        self._in_use = set()
+        self._metrics = { 'acquired': 0, 'hits': 0, 'misses': 0, 'waits': 0, 'timeouts': 0,
+                          'wait_time': 0.0, 'wait_time_max': 0.0 }
+
+        for i in range( size if prewarm is None else min(prewarm, size) ):
+            self._idle.append( self.__create() )
+
+    @property
+    def metrics( self ):
+        ''' Returns a dictionary of pool counters: acquired synths, hits (idle synth available),
+        misses (synth created on demand), waits (all synths in use), timeouts, total and maximal
+        wait time in seconds as well as the number of idle and used synths. '''
+        with self._condition:
+            metrics = dict( self._metrics )
+            metrics['idle'] = len( self._idle )
+            metrics['in_use'] = self._created - len( self._idle )
+            return metrics
+
+    def acquire( self, timeout = None ):
+        ''' Returns a synth of the pool. Waits at most timeout seconds (forever if None) if all
+        synths are in use and raises a FluidError if none was returned in time. '''
+        with self._condition:
+            self._metrics['acquired'] += 1
+
+            if self._idle:
+                self._metrics['hits'] += 1
+                return self.__hand_out( self._idle.pop() )
+
+            if self._created < self.size:
+                self._metrics['misses'] += 1
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                synth = self.__create( counted = True )
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                raise
+            with self._condition:
+                return self.__hand_out( synth )
+
+        with self._condition:
+            self._metrics['waits'] += 1
+            start = time.monotonic()
+            available = self._condition.wait_for( lambda: self._idle, timeout )
+
+            waited = time.monotonic() - start
+            self._metrics['wait_time'] += waited
+            self._metrics['wait_time_max'] = max( self._metrics['wait_time_max'], waited )
+
+            if not available:
+                self._metrics['timeouts'] += 1
+                raise fluiderror.FluidError( "No synth available after {0} seconds".format(timeout) )
+
+            return self.__hand_out( self._idle.pop() )
+
+    def release( self, synth ):
+        ''' Resets a synth and returns it to the pool. Pending note-offs of play_note() are dropped,
+        so they don't stop the notes of the next user. Raises a FluidError if the synth wasn't
+        acquired from this pool or was already released. '''
+        with self._condition:
+            if synth not in self._in_use:
+                raise fluiderror.FluidError( "Synth not acquired from this pool or already released" )
+            self._in_use.remove( synth )
+
+        if synth._notes is not None:
+            synth._notes.clear()
+        synth.system_reset()
+
+        with self._condition:
+            self._idle.append( synth )
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def synth( self, timeout = None ):
+        ''' Context manager which acquires a synth and releases it on exit (see acquire()). '''
+        synth = self.acquire( timeout )
+        try:
+            yield synth
+        finally:
+            self.release( synth )
+
+    def __hand_out( self, synth ):
+        ''' Marks a synth as acquired and returns it. The condition must be held. '''
+        self._in_use.add( synth )
+        return synth
+
+    def __create( self, counted = False ):
+        ''' Creates a synth and loads all soundfonts. '''
+        synth = fluidsynth.FluidSynth( self.handle, self.settings )
+        for soundfont in self.soundfonts:
+            synth.load_soundfont( soundfont, shared = True )
+
+        if not counted:
+            with self._condition:
+                self._created += 1
+
+        return synth
\ No newline at end of file
@@ -1,4 +1,35 @@
+from . import fluiderror
+from ctypes import c_char
+
 def fluidstring( string ):
     ''' Converts a Python string to a FluidSynth compatible string. '''
     ENCODING = 'utf-8'
-    return string.encode( ENCODING )
\ No newline at end of file
+    return string.encode( ENCODING )
+
+def fluidcolumn( values ):
+    ''' Converts a column of values (NumPy array or any sequence) to a sequence of plain Python 
+    values which can be passed to FluidSynth functions. '''
+    if hasattr( values, 'tolist' ):
+        return values.tolist()
+    return values
+
+def fluidbuffer( buffer, item_format, itemsize ):
+    ''' Wraps a writable, C-contiguous buffer object (bytearray, array.array, NumPy array,
+    memoryview...) without copying it. Returns a ctypes array which can be passed as a raw pointer
+    to FluidSynth and the number of items of the given itemsize which fit into the buffer. Typed
+    buffers must use the given struct format character (item_format), plain byte buffers are
+    always accepted. '''
+    BYTE_FORMATS = ( 'B', 'b', 'c' )
+
+    view = memoryview( buffer )
+    if view.readonly:
+        raise fluiderror.FluidError( "Buffer is read only" )
+    if not view.c_contiguous:
+        raise fluiderror.FluidError( "Buffer isn't C contiguous" )
+
+    view_format = view.format.lstrip( '@=<' )
+    if view_format != item_format and view_format not in BYTE_FORMATS:
+        raise fluiderror.FluidError( "Buffer format {0} doesn't match {1}".format(view.format, item_format) )
+
+    raw = ( c_char * view.nbytes ).from_buffer( view )
+    return raw, view.nbytes // itemsize
\ No newline at end of file
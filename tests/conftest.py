@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests run against the stub library of the benchmarks, libfluidsynth isn't needed.
+ROOT = os.path.dirname( os.path.dirname(os.path.abspath(__file__)) )
+sys.path[:0] = [ ROOT, os.path.join(ROOT, 'benchmarks') ]
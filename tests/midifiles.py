@@ -0,0 +1,18 @@
+import struct
+
+def track( *events ):
+    ''' Returns a track chunk of (delta, message bytes) events. '''
+    data = b''
+    for delta, message in events + ( (0, b'\xff\x2f\x00'), ):
+        varlen = bytes( [delta & 0x7F] )
+        delta >>= 7
+        while delta:
+            varlen = bytes( [0x80 | (delta & 0x7F)] ) + varlen
+            delta >>= 7
+        data += varlen + message
+    return b'MTrk' + struct.pack( '>I', len(data) ) + data
+
+def write_midi( path, *tracks, division = 96 ):
+    ''' Writes a format 1 MIDI file with the given track chunks. '''
+    with open( path, 'wb' ) as midi:
+        midi.write( b'MThd' + struct.pack('>IHHH', 6, 1, len(tracks), division) + b''.join(tracks) )
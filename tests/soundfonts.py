@@ -0,0 +1,87 @@
+import struct
+
+# Generators used by the test soundfonts.
+KEY_RANGE = 43
+INSTRUMENT = 41
+SAMPLE_ID = 53
+
+# Sample types.
+MONO, RIGHT, LEFT = 1, 2, 4
+
+def key_range( low, high ):
+    ''' Returns the key range generator for the given keys. '''
+    return ( KEY_RANGE, low | (high << 8) )
+
+def write_soundfont( path, presets, instruments, samples, sm24 = False ):
+    ''' Writes a SF2 file. Presets are (name, bank, program, zones), instruments (name, zones) with
+    zones lists of generators (operator, amount), samples (name, frames, link, type). Sample data
+    is a ramp, every sample is followed by 46 zero data points. '''
+    def chunk( id, data ):
+        return id + struct.pack( '<I', len(data) ) + data + b'\0' * ( len(data) & 1 )
+
+    def name( text ):
+        return text.encode().ljust( 20, b'\0' )
+
+    def zones( records ):
+        bags, generators = b'', b''
+        count = 0
+        for record in records:
+            bags += struct.pack( '<HH', count, 0 )
+            for operator, amount in record:
+                generators += struct.pack( '<HH', operator, amount )
+                count += 1
+        return bags + struct.pack( '<HH', count, 0 ), generators + struct.pack( '<HH', 0, 0 )
+
+    data, headers = b'', b''
+    for sample_name, frames, link, kind in samples:
+        start = len( data ) // 2
+        data += b''.join( struct.pack('<h', i) for i in range(frames) ) + bytes( 2 * 46 )
+        headers += struct.pack( '<20sIIIIIBbHH', name(sample_name), start, start + frames, start,
+                                start + frames, 44100, 60, 0, link, kind )
+    headers += struct.pack( '<20sIIIIIBbHH', name('EOS'), 0, 0, 0, 0, 0, 0, 0, 0, 0 )
+
+    preset_headers, bag = b'', 0
+    for preset_name, bank, program, preset_zones in presets:
+        preset_headers += struct.pack( '<20sHHHIII', name(preset_name), program, bank, bag, 0, 0, 0 )
+        bag += len( preset_zones )
+    preset_headers += struct.pack( '<20sHHHIII', name('EOP'), 0, 0, bag, 0, 0, 0 )
+    preset_bags, preset_generators = zones( [zone for preset in presets for zone in preset[3]] )
+
+    instrument_headers, bag = b'', 0
+    for instrument_name, instrument_zones in instruments:
+        instrument_headers += struct.pack( '<20sH', name(instrument_name), bag )
+        bag += len( instrument_zones )
+    instrument_headers += struct.pack( '<20sH', name('EOI'), bag )
+    instrument_bags, instrument_generators = zones( [zone for instrument in instruments
+                                                     for zone in instrument[1]] )
+
+    info = b'INFO' + chunk( b'ifil', struct.pack('<HH', 2, 4 if sm24 else 1) ) + \
+           chunk( b'isng', b'EMU8000\0' ) + chunk( b'INAM', b'Test\0' )
+    sdta = b'sdta' + chunk( b'smpl', data )
+    if sm24:
+        sdta += chunk( b'sm24', bytes(range(256)) * (len(data) // 512) + bytes(len(data) // 2 % 256) )
+    pdta = b'pdta' + b''.join( [chunk(b'phdr', preset_headers), chunk(b'pbag', preset_bags),
+                                chunk(b'pmod', bytes(10)), chunk(b'pgen', preset_generators),
+                                chunk(b'inst', instrument_headers), chunk(b'ibag', instrument_bags),
+                                chunk(b'imod', bytes(10)), chunk(b'igen', instrument_generators),
+                                chunk(b'shdr', headers)] )
+    body = b'sfbk' + chunk( b'LIST', info ) + chunk( b'LIST', sdta ) + chunk( b'LIST', pdta )
+    with open( path, 'wb' ) as sf:
+        sf.write( b'RIFF' + struct.pack('<I', len(body)) + body )
+
+def write_test_soundfont( path, sm24 = False ):
+    ''' Writes a soundfont with a piano (0, 0), strings (0, 48) and a drum kit (128, 0). The piano
+    has a stereo pair for keys 0-63 and a mono sample for keys 64-127. '''
+    presets = [ ( 'Piano', 0, 0, [[(INSTRUMENT, 0)]] ),
+                ( 'Strings', 0, 48, [[(INSTRUMENT, 1)]] ),
+                ( 'Standard Kit', 128, 0, [[key_range(35, 50), (INSTRUMENT, 2)]] ) ]
+    instruments = [ ( 'Piano', [[], [key_range(0, 63), (SAMPLE_ID, 0)],
+                                [key_range(0, 63), (SAMPLE_ID, 1)],
+                                [key_range(64, 127), (SAMPLE_ID, 2)]] ),
+                    ( 'Strings', [[(SAMPLE_ID, 3)]] ),
+                    ( 'Drums', [[key_range(35, 40), (SAMPLE_ID, 4)],
+                                [key_range(41, 50), (SAMPLE_ID, 5)]] ) ]
+    samples = [ ( 'Piano L', 100, 1, LEFT ), ( 'Piano R', 100, 0, RIGHT ),
+                ( 'Piano High', 80, 0, MONO ), ( 'Strings', 120, 0, MONO ),
+                ( 'Kick', 60, 0, MONO ), ( 'Snare', 70, 0, MONO ) ]
+    write_soundfont( path, presets, instruments, samples, sm24 )
@@ -0,0 +1,25 @@
+from pyfluidsynth3 import fluidasync
+
+import asyncio
+import gc
+import unittest
+
+class FluidAsyncTest( unittest.TestCase ):
+
+    def test_watcher_per_loop( self ):
+        loop = asyncio.new_event_loop()
+        self.addCleanup( loop.close )
+        watcher = fluidasync.watcher( loop )
+        self.assertIs( fluidasync.watcher(loop), watcher )
+        self.assertIs( watcher.loop, loop )
+
+    def test_closed_loop_released( self ):
+        count = len( fluidasync._watchers )
+        loop = asyncio.new_event_loop()
+        fluidasync.watcher( loop )
+        self.assertEqual( len(fluidasync._watchers), count + 1 )
+
+        loop.close()
+        del loop
+        gc.collect()
+        self.assertEqual( len(fluidasync._watchers), count )
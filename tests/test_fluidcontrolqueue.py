@@ -0,0 +1,74 @@
+from pyfluidsynth3 import fluidcontrolqueue, fluidsettings, fluidsynth
+
+import threading
+import unittest
+
+import stubhandle
+
+class FluidControlQueueTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.synth = fluidsynth.FluidSynth( self.handle, fluidsettings.FluidSettings(self.handle) )
+        self.sent = []
+        self.handle.fluid_synth_noteon = lambda synth, channel, key, velocity: \
+            self.sent.append( ('noteon', channel, key, velocity) )
+        self.handle.fluid_synth_cc = lambda synth, channel, control, value: \
+            self.sent.append( ('cc', channel, control, value) )
+        self.handle.fluid_synth_program_change = lambda synth, channel, program: \
+            self.sent.append( ('program', channel, program) )
+        self.queue = fluidcontrolqueue.FluidControlQueue( self.synth )
+
+    def test_coalesce( self ):
+        for value in range( 10 ):
+            self.queue.cc( 0, 7, value )
+        self.queue.noteon( 0, 60, 100 )
+        self.queue.cc( 0, 7, 20 )
+
+        self.assertEqual( self.queue.flush(), 3 )
+        self.assertEqual( self.sent, [('cc', 0, 7, 9), ('noteon', 0, 60, 100), ('cc', 0, 7, 20)] )
+        self.assertEqual( self.queue.coalesced, 9 )
+
+    def test_reset_all_controllers_keeps_order( self ):
+        self.queue.cc( 0, 7, 100 )
+        self.queue.cc( 0, 121, 0 )
+        self.queue.cc( 0, 7, 50 )
+
+        self.queue.flush()
+        self.assertEqual( self.sent, [('cc', 0, 7, 100), ('cc', 0, 121, 0), ('cc', 0, 7, 50)] )
+        self.assertEqual( self.queue.coalesced, 0 )
+
+    def test_program_change_keeps_order( self ):
+        self.queue.program_change( 0, 5 )
+        self.queue.cc( 0, 0, 1 )
+        self.queue.program_change( 0, 6 )
+
+        self.queue.flush()
+        self.assertEqual( self.sent, [('program', 0, 5), ('cc', 0, 0, 1), ('program', 0, 6)] )
+
+    def test_concurrent_flush( self ):
+        # The first batch is sent slowly while a second thread flushes a newer batch.
+        sending = threading.Event()
+        release = threading.Event()
+        cc = self.handle.fluid_synth_cc
+        def slow_cc( synth, channel, control, value ):
+            if value == 1:
+                sending.set()
+                release.wait( 5 )
+            cc( synth, channel, control, value )
+        self.handle.fluid_synth_cc = slow_cc
+
+        self.queue.cc( 0, 7, 1 )
+        first = threading.Thread( target = self.queue.flush )
+        first.start()
+        sending.wait( 5 )
+
+        self.queue.cc( 0, 7, 2 )
+        second = threading.Thread( target = self.queue.flush )
+        second.start()
+        second.join( 0.2 )
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEqual( self.sent, [('cc', 0, 7, 1), ('cc', 0, 7, 2)] )
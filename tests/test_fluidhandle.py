@@ -0,0 +1,35 @@
+from pyfluidsynth3 import fluidsettings
+
+import unittest
+
+import stubhandle
+
+class FluidHandleTest( unittest.TestCase ):
+
+    def failures( self, handle ):
+        return { name: stats['failures'] for name, stats in handle.statistics().items() }
+
+    def test_settings_failures( self ):
+        for handle_type in ( stubhandle.StubHandle, stubhandle.StubHandle2 ):
+            handle = handle_type( instrument = True )
+            settings = fluidsettings.FluidSettings( handle )
+            settings['synth.gain'] = 0.5
+            settings['synth.polyphony'] = 128
+            self.assertEqual( handle.fluid_settings_setint( settings.settings, b'unknown', 1 ),
+                              handle.handle._settings_result(False) )
+
+            failures = self.failures( handle )
+            self.assertEqual( failures['fluid_settings_setnum'], 0 )
+            self.assertEqual( failures['fluid_settings_setint'], 1 )
+
+    def test_failure_conventions( self ):
+        handle = stubhandle.StubHandle( instrument = True )
+        handle.handle.fluid_sequencer_register_fluidsynth = lambda seq, synth: -1
+        handle.handle.fluid_event_get_type = lambda event: -1
+
+        handle.fluid_sequencer_register_fluidsynth( 1, 2 )
+        handle.fluid_event_get_type( 1 )
+
+        failures = self.failures( handle )
+        self.assertEqual( failures['fluid_sequencer_register_fluidsynth'], 1 )
+        self.assertEqual( failures['fluid_event_get_type'], 0 )
@@ -0,0 +1,68 @@
+from pyfluidsynth3 import constants, fluidmidifile
+
+import os
+import tempfile
+import unittest
+
+import midifiles
+
+class FluidMidiFileTest( unittest.TestCase ):
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.path = os.path.join( directory.name, 'song.mid' )
+
+        # Tempo 120 bpm, after one quarter note 240 bpm (96 ticks per quarter note).
+        tempo = midifiles.track( (96, b'\xff\x51\x03\x03\xd0\x90') )
+        notes = midifiles.track( (0, b'\xb0\x07\x64'), (0, b'\xc0\x05'), (0, b'\x90\x3c\x64'),
+                                 (96, b'\x80\x3c\x00'), (0, b'\xe0\x00\x50'), (0, b'\xb0\x07\x50'),
+                                 (0, b'\x90\x3e\x64'), (96, b'\x3e\x00'), *[(48, b'\xb0\x0a\x40')] * 40 )
+        midifiles.write_midi( self.path, tempo, notes )
+
+    def test_tempo_map( self ):
+        with fluidmidifile.FluidMidiFile( self.path ) as midi:
+            notes = [ event[:3] + (event.p1,) for event in midi.events()
+                      if event.type in (constants.NOTE_ON, constants.NOTE_OFF) ]
+            duration = midi.duration()
+
+        self.assertEqual( notes, [ (0.0, constants.NOTE_ON, 0, 60), (0.5, constants.NOTE_OFF, 0, 60),
+                                   (0.5, constants.NOTE_ON, 0, 62), (0.75, constants.NOTE_OFF, 0, 62) ] )
+        self.assertAlmostEqual( duration, 0.75 + 40 * 0.125 )
+
+    def test_seek_chase( self ):
+        with fluidmidifile.FluidMidiFile( self.path ) as midi:
+            events = list( midi.events(start = 0.6) )
+
+        chased = [ event for event in events if event.time == 0.6 ]
+        self.assertEqual( sorted(chased), [
+            (0.6, constants.CONTROL_CHANGE, 0, 7, 80),
+            (0.6, constants.PROGRAM_CHANGE, 0, 5, 0),
+            (0.6, constants.PITCH_BEND, 0, 0x50 << 7, 0) ] )
+        self.assertEqual( events[len(chased)], (0.75, constants.NOTE_OFF, 0, 62, 0) )
+
+    def test_seek_from_checkpoint( self ):
+        with fluidmidifile.FluidMidiFile( self.path ) as midi:
+            expected = list( midi.events(start = 4.0) )
+
+        with fluidmidifile.FluidMidiFile( self.path ) as midi:
+            midi.CHECKPOINT_INTERVAL = 0.3
+            midi.duration()
+            self.assertGreater( len(midi._checkpoints), 10 )
+            self.assertEqual( list(midi.events(start = 4.0)), expected )
+            self.assertEqual( expected[0], (4.0, constants.CONTROL_CHANGE, 0, 7, 80) )
+
+    def test_interleaved_checkpoints( self ):
+        with fluidmidifile.FluidMidiFile( self.path ) as midi:
+            midi.CHECKPOINT_INTERVAL = 0.3
+            midi.duration()
+            del midi._checkpoints[5:]
+
+            # Two generators extend the checkpoints in turns, each from its own position.
+            first, second = midi.events(), midi.events( start = 1.0 )
+            for a, b in zip( first, second ):
+                pass
+
+            times = [ seconds for seconds, state in midi._checkpoints ]
+            self.assertEqual( times, sorted(set(times)) )
+            self.assertGreater( times[-1], 4.0 )
@@ -0,0 +1,60 @@
+from pyfluidsynth3 import fluidsettings, fluidsynth
+
+import time
+import unittest
+
+import stubhandle
+
+class FluidNoteSchedulerTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.synth = fluidsynth.FluidSynth( self.handle, fluidsettings.FluidSettings(self.handle) )
+        self.sent = []
+        self.handle.fluid_synth_noteoff = lambda synth, channel, key: \
+            self.sent.append( ('noteoff', channel, key) )
+        self.handle.fluid_synth_cc = lambda synth, channel, control, value: \
+            self.sent.append( ('cc', channel, control) )
+        self.handle.fluid_synth_count_midi_channels = lambda synth: 2
+
+    def wait_idle( self ):
+        ''' Waits until the note-off thread ended. '''
+        deadline = time.monotonic() + 5
+        while self.synth.notes._thread is not None and time.monotonic() < deadline:
+            time.sleep( 0.01 )
+        self.assertIsNone( self.synth.notes._thread )
+
+    def test_noteoff_on_time( self ):
+        start = time.monotonic()
+        self.synth.play_note( 0, 60, 100, 100 )
+        self.synth.play_note( 1, 62, 100, 50 )
+        self.wait_idle()
+
+        self.assertGreaterEqual( time.monotonic() - start, 0.1 )
+        self.assertEqual( self.sent, [('noteoff', 1, 62), ('noteoff', 0, 60)] )
+        self.assertEqual( len(self.synth.notes), 0 )
+
+    def test_cancel( self ):
+        note = self.synth.play_note( 0, 60, 100, 60000 )
+        self.assertTrue( self.synth.notes.cancel(note) )
+        self.assertFalse( self.synth.notes.cancel(note) )
+
+        # The thread wakes up and ends instead of sleeping until the cancelled note-off.
+        self.wait_idle()
+        self.assertEqual( self.sent, [('noteoff', 0, 60)] )
+
+    def test_all_notes_off( self ):
+        self.synth.play_note( 0, 60, 100, 60000 )
+        self.synth.play_note( 1, 62, 100, 60000 )
+        self.synth.all_notes_off()
+
+        self.wait_idle()
+        self.assertEqual( self.sent, [('cc', 0, 123), ('cc', 1, 123)] )
+        self.assertEqual( len(self.synth.notes), 0 )
+
+    def test_clear( self ):
+        self.synth.play_note( 0, 60, 100, 60000 )
+        self.synth.notes.clear()
+
+        self.wait_idle()
+        self.assertEqual( self.sent, [] )
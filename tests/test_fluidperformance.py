@@ -0,0 +1,28 @@
+from pyfluidsynth3 import fluidperformance
+
+import unittest
+
+import stubhandle
+
+class FluidPerformanceTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.interpolation = []
+        self.handle.fluid_synth_set_interp_method = lambda synth, channel, method: \
+            self.interpolation.append( (channel, method) )
+
+    def test_benchmark_cores( self ):
+        result = fluidperformance.benchmark_cores( self.handle, [], cores = [1, 2], seconds = 0.1,
+                                                   notes = 100, interpolation = 1 )
+        self.assertEqual( sorted(result.rates), [1, 2] )
+        self.assertIn( result.recommended, (1, 2) )
+        self.assertEqual( self.interpolation, [(-1, 1), (-1, 1)] )
+
+        # The polyphony is raised to fit the notes.
+        self.assertEqual( self.handle.handle._settings[b'synth.polyphony'], 400 )
+
+    def test_keeps_polyphony( self ):
+        fluidperformance.benchmark_cores( self.handle, [], cores = [1, 2], seconds = 0.1,
+                                          settings = { 'synth.polyphony': 64 } )
+        self.assertEqual( self.handle.handle._settings[b'synth.polyphony'], 64 )
@@ -0,0 +1,63 @@
+from pyfluidsynth3 import fluiderror, fluidhandle, fluidpresetcatalog, fluidsettings, fluidsynth
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import soundfonts
+import stubhandle
+
+class FluidPresetCatalogTest( unittest.TestCase ):
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.path = os.path.join( directory.name, 'test.sf2' )
+        soundfonts.write_test_soundfont( self.path )
+
+        # FluidSynth 1.x has no soundfont iteration functions.
+        self.handle = stubhandle.StubHandle()
+        for name, argtypes, restype in fluidhandle.FluidHandle.FUNCTIONS['sfont']:
+            delattr( self.handle.handle, name )
+        self.synth = fluidsynth.FluidSynth( self.handle, fluidsettings.FluidSettings(self.handle) )
+
+    def test_without_iteration( self ):
+        sfont = self.synth.load_soundfont( self.path )
+        presets = self.synth.presets
+
+        self.assertEqual( [preset[:] for preset in presets.lookup('strings')],
+                          [('Strings', sfont, 0, 48)] )
+        self.assertEqual( presets.search('kit', 1)[0].bank, 128 )
+        self.assertTrue( os.path.isfile(self.path + '.presets.json') )
+
+    def test_unreadable_soundfont( self ):
+        with open( self.path, 'wb' ) as sf:
+            sf.write( b'RIFF\0\0\0\0DLS ' )
+        self.synth.load_soundfont( self.path )
+
+        with self.assertRaises( fluiderror.FluidError ):
+            self.synth.presets
+
+    def test_concurrent_catalog_writes( self ):
+        # Threads of one process writing the catalog don't share a temporary file.
+        cache_path = self.path + '.presets.json'
+        dump = json.dump
+        both_written = threading.Barrier( 2 )
+        def synchronized_dump( *args ):
+            dump( *args )
+            both_written.wait( 5 )
+        with unittest.mock.patch.object( json, 'dump', synchronized_dump ):
+            threads = [ threading.Thread(target = fluidpresetcatalog._write_catalog,
+                                         args = (cache_path, {'presets': [], 'writer': i}))
+                        for i in range(2) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertIn( fluidpresetcatalog._read_catalog(cache_path)['writer'], (0, 1) )
+        self.assertEqual( sorted(os.listdir(os.path.dirname(self.path))),
+                          [os.path.basename(self.path), os.path.basename(cache_path)] )
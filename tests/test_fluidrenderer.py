@@ -0,0 +1,68 @@
+from pyfluidsynth3 import fluiderror, fluidrenderer, fluidsettings, fluidsynth
+
+import os
+import struct
+import tempfile
+import unittest
+
+import stubhandle
+
+def chunks( path ):
+    ''' Returns the RIFF form type and the chunks of a WAV file: list of (id, payload). '''
+    with open( path, 'rb' ) as wav:
+        data = wav.read()
+    result = []
+    pos = 12
+    while pos < len( data ):
+        chunk, size = struct.unpack( '<4sI', data[pos:pos + 8] )
+        if chunk == b'data' and size == 0xFFFFFFFF:
+            size = len( data ) - pos - 8
+        result.append( (chunk, data[pos + 8:pos + 8 + size]) )
+        pos += 8 + size + ( size & 1 )
+    return data[:4], result
+
+class FluidRendererTest( unittest.TestCase ):
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.path = os.path.join( directory.name, 'song.wav' )
+
+        handle = stubhandle.StubHandle()
+        self.synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+
+    def render( self, **options ):
+        with fluidrenderer.FluidRenderer( self.synth, self.path, **options ) as renderer:
+            renderer.render( 1000 )
+        return chunks( self.path )
+
+    def test_pcm( self ):
+        form, found = self.render()
+        self.assertEqual( form, b'RIFF' )
+        self.assertEqual( [chunk for chunk, payload in found], [b'JUNK', b'fmt ', b'data'] )
+        self.assertEqual( struct.unpack('<HHIIHH', found[1][1]), (1, 2, 44100, 44100 * 4, 4, 16) )
+        self.assertEqual( len(found[2][1]), 1000 * 4 )
+        self.assertEqual( os.path.getsize(self.path), 80 + 1000 * 4 )
+
+    def test_float( self ):
+        form, found = self.render( sample_format = fluidrenderer.FluidRenderer.FLOAT )
+        self.assertEqual( [chunk for chunk, payload in found], [b'JUNK', b'fmt ', b'fact', b'data'] )
+        self.assertEqual( struct.unpack('<HHIIHHH', found[1][1]), (3, 2, 44100, 44100 * 8, 8, 32, 0) )
+        self.assertEqual( struct.unpack('<I', found[2][1]), (1000,) )
+        self.assertEqual( len(found[3][1]), 1000 * 8 )
+
+        with open( self.path, 'rb' ) as wav:
+            self.assertEqual( struct.unpack('<I', wav.read(8)[4:])[0], os.path.getsize(self.path) - 8 )
+
+    def test_float_rf64( self ):
+        form, found = self.render( format = fluidrenderer.FluidRenderer.RF64,
+                                   sample_format = fluidrenderer.FluidRenderer.FLOAT )
+        self.assertEqual( form, b'RF64' )
+        self.assertEqual( [chunk for chunk, payload in found], [b'ds64', b'fmt ', b'fact', b'data'] )
+        riff_size, data_size, frames = struct.unpack( '<QQQ', found[0][1][:24] )
+        self.assertEqual( (riff_size, data_size, frames),
+                          (os.path.getsize(self.path) - 8, 1000 * 8, 1000) )
+
+    def test_stems_without_outputs( self ):
+        with self.assertRaises( fluiderror.FluidError ):
+            fluidrenderer.FluidStemRenderer( self.synth, [] )
@@ -0,0 +1,140 @@
+from pyfluidsynth3 import fluiderror, fluidrenderfarm, fluidsettings, fluidsoundfontsubset, fluidsynth
+
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+import midifiles
+import soundfonts
+import stubhandle
+
+def fake_render( handle, synth, midi, output, timeout, tail, block_frames ):
+    ''' Stands in for render_midi(): the MIDI path tells the worker what to do. '''
+    if midi == 'crash':
+        os._exit( 3 )
+    if midi == 'hang':
+        time.sleep( 60 )
+    return 100
+
+@unittest.skipUnless( multiprocessing.get_start_method() == 'fork', 'workers inherit patches by fork' )
+class FluidRenderFarmTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.patches = { 'render_midi': fluidrenderfarm.render_midi,
+                         'FluidHandle': fluidrenderfarm.fluidhandle.FluidHandle }
+        fluidrenderfarm.render_midi = fake_render
+        fluidrenderfarm.fluidhandle.FluidHandle = stubhandle.StubHandle
+
+    def tearDown( self ):
+        fluidrenderfarm.render_midi = self.patches['render_midi']
+        fluidrenderfarm.fluidhandle.FluidHandle = self.patches['FluidHandle']
+
+    def farm( self, **options ):
+        farm = fluidrenderfarm.FluidRenderFarm( [], processes = 2, **options )
+        farm.POLL_INTERVAL = 0.05
+        farm.TIMEOUT_GRACE = 0.2
+        return farm
+
+    def test_map( self ):
+        with self.farm() as farm:
+            results = list( farm.map([('song{0}'.format(i), 'out') for i in range(5)]) )
+        self.assertEqual( sorted(result.job for result in results), list(range(5)) )
+        self.assertTrue( all(result.frames == 100 and result.error is None for result in results) )
+
+    def test_crashed_worker_reports_its_job( self ):
+        with self.farm() as farm:
+            results = { result.midi: result for result in
+                        farm.map([('crash', 'out'), ('song', 'out'), ('crash', 'out')]) }
+            self.assertEqual( len(farm._workers), 2 )
+        self.assertIn( 'exited with code 3', results['crash'].error )
+        self.assertEqual( results['song'].frames, 100 )
+
+    def test_hanging_job_is_terminated( self ):
+        with self.farm( timeout = 0.1 ) as farm:
+            start = time.monotonic()
+            results = { result.midi: result for result in
+                        farm.map([('hang', 'out'), ('song', 'out')]) }
+            self.assertLess( time.monotonic() - start, 10 )
+        self.assertIn( 'Timeout', results['hang'].error )
+        self.assertIsNone( results['song'].error )
+
+    def test_start_timeout( self ):
+        fluidrenderfarm.fluidhandle.FluidHandle = HangingHandle
+        farm = self.farm()
+        with self.assertRaises( fluiderror.FluidError ):
+            farm.start( timeout = 0.2 )
+        self.assertEqual( farm._workers, {} )
+
+    def test_start_crash( self ):
+        fluidrenderfarm.fluidhandle.FluidHandle = CrashingHandle
+        with self.assertRaises( fluiderror.FluidError ):
+            self.farm().start( timeout = 10 )
+
+class LoadSubsetsTest( unittest.TestCase ):
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.directory = directory.name
+
+        cache_directory = fluidsoundfontsubset.CACHE_DIRECTORY
+        fluidsoundfontsubset.CACHE_DIRECTORY = os.path.join( self.directory, 'cache' )
+        self.addCleanup( setattr, fluidsoundfontsubset, 'CACHE_DIRECTORY', cache_directory )
+
+        self.soundfonts = [ os.path.join(self.directory, name) for name in ('a.sf2', 'b.sf2') ]
+        for path in self.soundfonts:
+            soundfonts.write_test_soundfont( path )
+
+        handle = stubhandle.StubHandle()
+        self.synth = fluidsynth.FluidSynth( handle, fluidsettings.FluidSettings(handle) )
+        self.calls = []
+        for name in ( 'load', 'unload' ):
+            setattr( self.synth, name + '_soundfont', self.__record(name, getattr(self.synth, name + '_soundfont')) )
+
+    def __record( self, name, func ):
+        def record( path ):
+            self.calls.append( (name, path) )
+            return func( path )
+        return record
+
+    def midi( self, name, *events ):
+        path = os.path.join( self.directory, name )
+        midifiles.write_midi( path, midifiles.track(*events) )
+        return path
+
+    def test_reuse( self ):
+        loaded = []
+        piano = self.midi( 'piano.mid', (0, b'\x90\x3c\x64') )
+        fluidrenderfarm._load_subsets( self.synth, self.soundfonts, piano, loaded )
+        self.assertEqual( self.calls, [('load', path) for path in loaded] )
+        self.assertEqual( len(loaded), 2 )
+
+        # A job playing the same presets keeps the subsets loaded.
+        del self.calls[:]
+        again = self.midi( 'again.mid', (10, b'\x90\x3c\x40') )
+        fluidrenderfarm._load_subsets( self.synth, self.soundfonts, again, loaded )
+        self.assertEqual( self.calls, [] )
+
+        # Only the soundfonts after the first different subset are replaced.
+        previous = list( loaded )
+        fluidrenderfarm._load_subsets( self.synth, self.soundfonts[:1], piano, loaded )
+        self.assertEqual( self.calls, [('unload', previous[1])] )
+        self.assertEqual( loaded, previous[:1] )
+
+        del self.calls[:]
+        strings = self.midi( 'strings.mid', (0, b'\xc0\x30'), (0, b'\x90\x3c\x64') )
+        fluidrenderfarm._load_subsets( self.synth, self.soundfonts[1:], strings, loaded )
+        self.assertEqual( self.calls, [('unload', previous[0]), ('load', loaded[0])] )
+        self.assertEqual( list(self.synth._sf_dict), loaded )
+
+class HangingHandle( stubhandle.StubHandle ):
+
+    def load_library( self, library_path ):
+        time.sleep( 60 )
+
+class CrashingHandle( stubhandle.StubHandle ):
+
+    def load_library( self, library_path ):
+        os._exit( 1 )
@@ -0,0 +1,53 @@
+from pyfluidsynth3 import fluidevent, fluidsequencer
+
+import unittest
+
+import stubhandle
+
+class FluidSequencerClientTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.calls = []
+        self.type = fluidevent.FluidEvent.NOTEOFF
+        self.handle.fluid_event_get_type = lambda event: self.type
+        for field, value in ( ('channel', 9), ('key', 60), ('velocity', 100), ('control', 7),
+                              ('value', 90), ('data', None), ('pitch', 10000) ):
+            setattr( self.handle, 'fluid_event_get_' + field, self.__getter(field, value) )
+        self.sequencer = fluidsequencer.FluidSequencer( self.handle )
+
+    def __getter( self, field, value ):
+        def get( event ):
+            self.calls.append( field )
+            return value
+        return get
+
+    def test_fields_by_type( self ):
+        received = []
+        client = self.sequencer.add_client( 'test', lambda client, event: received.append(event) )
+        client._trampoline( 10, 1, None, None )
+        self.type = fluidevent.FluidEvent.CONTROLCHANGE
+        client._trampoline( 20, 1, None, None )
+        self.type = fluidevent.FluidEvent.PITCHBEND
+        client._trampoline( 30, 1, None, None )
+        client.close()
+
+        self.assertEqual( self.calls, ['channel', 'key', 'channel', 'control', 'value', 'channel', 'pitch'] )
+        self.assertEqual( received[0][:], (10, fluidevent.FluidEvent.NOTEOFF, 9, 60, None, None, None, None, None) )
+        self.assertEqual( received[1][:], (20, fluidevent.FluidEvent.CONTROLCHANGE, 9, None, None, 7, 90, None, None) )
+        self.assertEqual( received[2][:], (30, fluidevent.FluidEvent.PITCHBEND, 9, None, None, None, None, None, 10000) )
+
+    def test_callback_errors( self ):
+        received = []
+        def callback( client, event ):
+            received.append( event )
+            raise ValueError( event.time )
+
+        client = self.sequencer.add_client( 'test', callback )
+        client._trampoline( 10, 1, None, None )
+        client._trampoline( 20, 1, None, None )
+        client.close()
+
+        self.assertEqual( len(received), 2 )
+        self.assertEqual( client.errors, 2 )
+        self.assertEqual( client.last_error.args, (20,) )
@@ -0,0 +1,43 @@
+from pyfluidsynth3 import fluidsettings
+
+import unittest
+
+import stubhandle
+
+class FluidSettingsTest( unittest.TestCase ):
+
+    def check( self, handle ):
+        settings = fluidsettings.FluidSettings( handle )
+        self.assertEqual( settings['synth.sample-rate'], 44100 )
+        self.assertEqual( settings['synth.reverb.active'], 1 )
+        self.assertEqual( settings['audio.driver'], b'alsa' )
+
+        settings['audio.driver'] = 'jack'
+        settings['synth.polyphony'] = 128
+        self.assertEqual( settings['audio.driver'], b'jack' )
+        self.assertEqual( settings.snapshot(['synth.polyphony', 'no.such-key']),
+                          { 'synth.polyphony': 128 } )
+        with self.assertRaises( KeyError ):
+            settings['no.such-key'] = 1
+
+    def test_fluidsynth1( self ):
+        handle = stubhandle.StubHandle()
+        self.assertEqual( handle.version, (1, 1, 11) )
+        self.check( handle )
+
+    def test_fluidsynth2( self ):
+        handle = stubhandle.StubHandle2()
+        self.assertEqual( handle.version, (2, 3, 4) )
+        self.check( handle )
+
+    def test_performance( self ):
+        settings = fluidsettings.FluidSettings( stubhandle.StubHandle() )
+        self.assertEqual( settings.set_performance(polyphony = 64, parallel_render = 0,
+                                                   dynamic_sample_loading = 1),
+                          { 'polyphony': 64, 'parallel_render': 0 } )
+
+        settings = fluidsettings.FluidSettings( stubhandle.StubHandle2() )
+        self.assertEqual( settings.set_performance(polyphony = 64, parallel_render = 0,
+                                                   dynamic_sample_loading = 1),
+                          { 'polyphony': 64, 'dynamic_sample_loading': 1 } )
+        self.assertEqual( settings['synth.dynamic-sample-loading'], 1 )
@@ -0,0 +1,47 @@
+from pyfluidsynth3 import fluiderror, fluidsoundfontfile
+
+import os
+import tempfile
+import unittest
+
+import soundfonts
+
+class FluidSoundfontFileTest( unittest.TestCase ):
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.path = os.path.join( directory.name, 'test.sf2' )
+
+    def open( self, path ):
+        sf = fluidsoundfontfile.FluidSoundfontFile( path )
+        self.addCleanup( sf.close )
+        return sf
+
+    def test_read( self ):
+        soundfonts.write_test_soundfont( self.path )
+        sf = self.open( self.path )
+
+        self.assertEqual( [preset[:3] for preset in sf.presets],
+                          [('Piano', 0, 0), ('Strings', 0, 48), ('Standard Kit', 128, 0)] )
+        self.assertEqual( sf.instruments, ['Piano', 'Strings', 'Drums'] )
+        self.assertEqual( len(sf.samples), 6 )
+        self.assertEqual( sf.find_preset(128, 0), 2 )
+        self.assertIsNone( sf.find_preset(0, 1) )
+        self.assertEqual( sf.preset_samples(0), {0, 1, 2} )
+        self.assertEqual( sf.memory_footprint([1]), 2 * 120 )
+        self.assertEqual( sf.sample_data_size, 2 * (100 + 100 + 80 + 120 + 60 + 70 + 6 * 46) )
+        self.assertEqual( bytes(sf.sample_data(3))[:6], b'\0\0\1\0\2\0' )
+
+    def test_sm24( self ):
+        soundfonts.write_test_soundfont( self.path, sm24 = True )
+        sf = self.open( self.path )
+        self.assertEqual( sf.version, (2, 4) )
+        self.assertEqual( sf.memory_footprint([1]), 3 * 120 )
+        self.assertEqual( len(sf.sample_data(3)), 2 * 120 )
+
+    def test_not_a_soundfont( self ):
+        with open( self.path, 'wb' ) as sf:
+            sf.write( b'RIFF\4\0\0\0WAVE' )
+        with self.assertRaises( fluiderror.FluidError ):
+            fluidsoundfontfile.FluidSoundfontFile( self.path )
@@ -0,0 +1,87 @@
+from pyfluidsynth3 import fluiderror, fluidsettings, fluidsoundfontregistry, fluidsynth
+
+import itertools
+import os
+import tempfile
+import unittest
+
+import stubhandle
+
+class FluidSoundfontRegistryTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.settings = fluidsettings.FluidSettings( self.handle )
+        descriptor, self.path = tempfile.mkstemp( suffix = '.sf2' )
+        os.close( descriptor )
+        descriptor, self.own = tempfile.mkstemp( suffix = '.sf2' )
+        os.close( descriptor )
+
+    def tearDown( self ):
+        os.remove( self.path )
+        os.remove( self.own )
+
+    def synth( self ):
+        return fluidsynth.FluidSynth( self.handle, self.settings )
+
+    def test_detach_in_any_order( self ):
+        for order in itertools.permutations( range(3) ):
+            synths = [ self.synth() for i in range(3) ]
+            for count, synth in enumerate( synths ):
+                # Own soundfonts shift the id counters of the synths apart.
+                for i in range( count ):
+                    self.handle.fluid_synth_sfload( synth.synth, b'own.sf2', True )
+                synth.load_soundfont( self.path, shared = True )
+            self.assertEqual( fluidsoundfontregistry.registry.references(self.path), 3 )
+
+            for index in order:
+                synth = synths[index]
+                id = synth.soundfont_id( self.path )
+                self.assertEqual( self.handle.fluid_synth_get_sfont_by_id(synth.synth, id),
+                                  self.handle.fluid_synth_get_sfont(synth.synth, 0) )
+                self.assertTrue( synth.program_select(0, id, 0, 0) )
+                synth.unload_soundfont( self.path )
+
+            self.assertEqual( fluidsoundfontregistry.registry.references(self.path), 0 )
+            self.assertEqual( len(fluidsoundfontregistry.registry), 0 )
+
+    def test_ids_follow_attach( self ):
+        first, second = self.synth(), self.synth()
+        first.load_soundfont( self.path, shared = True )
+        self.handle.fluid_synth_sfload( second.synth, b'own.sf2', True )
+        second.load_soundfont( self.path, shared = True )
+
+        # The shared soundfont got the id 2 of the second synth, also in the first synth.
+        self.assertEqual( first.soundfont_id(self.path), 2 )
+        self.assertTrue( first.program_select(0, first.soundfont_id(self.path), 0, 0) )
+
+        second.unload_soundfont( self.path )
+        first.unload_soundfont( self.path )
+        with self.assertRaises( fluiderror.FluidError ):
+            first.soundfont_id( self.path )
+
+
+    def test_own_and_shared( self ):
+        first, second = self.synth(), self.synth()
+        first.load_soundfont( self.own )
+        first.load_soundfont( self.path, shared = True )
+        # Attaching takes the id 1 of the second synth, which the own soundfont of the first has.
+        second.load_soundfont( self.path, shared = True )
+
+        own, shared = first.soundfont_id( self.own ), first.soundfont_id( self.path )
+        self.assertNotEqual( own, shared )
+        self.assertEqual( shared, second.soundfont_id(self.path) )
+        self.assertEqual( sorted(first.presets.soundfonts()), sorted([own, shared]) )
+
+        # Reloading keeps the id, an own soundfont loaded later gets a unique one too.
+        self.assertEqual( first.load_soundfont(self.own), own )
+        second.load_soundfont( self.own )
+        self.assertNotEqual( second.soundfont_id(self.own), second.soundfont_id(self.path) )
+
+        first.unload_soundfont( self.own )
+        self.assertEqual( first.soundfont_id(self.path), shared )
+        self.assertEqual( self.handle.fluid_synth_sfcount(first.synth), 1 )
+        first.unload_soundfont( self.path )
+        self.assertEqual( second.soundfont_id(self.path), shared )
+        del first, second
+        self.assertEqual( len(fluidsoundfontregistry.registry), 0 )
@@ -0,0 +1,198 @@
+from pyfluidsynth3 import fluiderror, fluidsoundfontfile, fluidsoundfontsubset
+
+import os
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import midifiles
+import soundfonts
+
+class FluidSoundfontSubsetTest( unittest.TestCase ):
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.directory = directory.name
+        self.cache = os.path.join( self.directory, 'cache' )
+        self.soundfont = os.path.join( self.directory, 'test.sf2' )
+        soundfonts.write_test_soundfont( self.soundfont )
+
+    def midi( self, name, *events ):
+        path = os.path.join( self.directory, name )
+        midifiles.write_midi( path, midifiles.track(*events) )
+        return path
+
+    def open( self, path ):
+        sf = fluidsoundfontfile.FluidSoundfontFile( path )
+        self.addCleanup( sf.close )
+        return sf
+
+    def write_concurrently( self, midi, count ):
+        results, errors = [], []
+        def write():
+            try:
+                results.append( fluidsoundfontsubset.soundfont_subset(self.soundfont, midi, self.cache) )
+            except Exception as e:
+                errors.append( e )
+        threads = [ threading.Thread(target = write) for i in range(count) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_subsets( self ):
+        # Threads of one process writing the same subset don't share a temporary file.
+        midi = self.midi( 'song.mid', (0, b'\xc1\x30'), (0, b'\x91\x40\x64') )
+        write_subset = fluidsoundfontfile.FluidSoundfontFile.write_subset
+        both_written = threading.Barrier( 2 )
+        def synchronized_write_subset( sf, *args ):
+            write_subset( sf, *args )
+            both_written.wait( 5 )
+        with unittest.mock.patch.object( fluidsoundfontfile.FluidSoundfontFile, 'write_subset',
+                                         synchronized_write_subset ):
+            results, errors = self.write_concurrently( midi, 2 )
+
+        self.assertEqual( errors, [] )
+        self.assertEqual( len(set(results)), 1 )
+        self.assertEqual( os.listdir(self.cache), [os.path.basename(results[0].path)] )
+        self.assertEqual( [preset[:3] for preset in self.open(results[0].path).presets],
+                          [('Strings', 0, 48)] )
+
+    def test_midi_presets( self ):
+        midi = self.midi( 'song.mid', (0, b'\x90\x3c\x64'), (0, b'\x99\x24\x64'),
+                          (0, b'\xb1\x00\x05'), (0, b'\xc1\x30'), (0, b'\x91\x40\x64'),
+                          (0, b'\x92\x45\x64') )
+        self.assertEqual( fluidsoundfontsubset.midi_presets(midi),
+                          { (0, 0): {60, 69}, (128, 0): {36}, (5, 48): {64} } )
+
+    def test_subset( self ):
+        # Bank 5 falls back to bank 0, the drums keep only the kick.
+        midi = self.midi( 'song.mid', (0, b'\xb1\x00\x05'), (0, b'\xc1\x30'), (0, b'\x91\x40\x64'),
+                          (0, b'\x99\x24\x64') )
+        subset = fluidsoundfontsubset.soundfont_subset( self.soundfont, midi, self.cache )
+        self.assertEqual( subset.presets, 2 )
+        self.assertEqual( subset.full_size, os.path.getsize(self.soundfont) )
+        self.assertLess( subset.size, subset.full_size )
+
+        sf = self.open( subset.path )
+        self.assertEqual( [preset[:3] for preset in sf.presets],
+                          [('Strings', 0, 48), ('Standard Kit', 128, 0)] )
+        self.assertEqual( sorted(sample.name for sample in sf.samples), ['Kick', 'Strings'] )
+
+        # Another song with the same presets and keys reuses the subset.
+        other = self.midi( 'other.mid', (0, b'\x99\x24\x64'), (10, b'\xc1\x30'), (0, b'\x91\x40\x64') )
+        self.assertEqual( fluidsoundfontsubset.soundfont_subset(self.soundfont, other, self.cache).path,
+                          subset.path )
+        self.assertEqual( len(os.listdir(self.cache)), 1 )
+
+        # Other keys need another subset unless key ranges are ignored.
+        other = self.midi( 'other.mid', (0, b'\x99\x2a\x64'), (10, b'\xc1\x30'), (0, b'\x91\x40\x64') )
+        self.assertNotEqual( fluidsoundfontsubset.soundfont_subset(self.soundfont, other, self.cache).path,
+                             subset.path )
+        full = fluidsoundfontsubset.soundfont_subset( self.soundfont, other, self.cache, False )
+        self.assertEqual( sorted(sample.name for sample in self.open(full.path).samples),
+                          ['Kick', 'Snare', 'Strings'] )
+
+    def test_missing_soundfont( self ):
+        midi = self.midi( 'song.mid', (0, b'\x90\x3c\x64') )
+        with self.assertRaises( fluiderror.FluidError ):
+            fluidsoundfontsubset.soundfont_subset( self.soundfont + '.missing', midi, self.cache )
+
+class WriteSubsetTest( unittest.TestCase ):
+    ''' Round trips of FluidSoundfontFile.write_subset(). '''
+
+    def setUp( self ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup( directory.cleanup )
+        self.soundfont = os.path.join( directory.name, 'test.sf2' )
+        self.subset = os.path.join( directory.name, 'subset.sf2' )
+
+    def open( self, path ):
+        sf = fluidsoundfontfile.FluidSoundfontFile( path )
+        self.addCleanup( sf.close )
+        return sf
+
+    def samples( self, sf ):
+        ''' Returns the samples by name: name -> (sample, data). '''
+        return { sample.name: (sample, bytes(sf.sample_data(index)))
+                 for index, sample in enumerate(sf.samples) }
+
+    def test_subset_round_trip( self ):
+        soundfonts.write_test_soundfont( self.soundfont )
+        sf = self.open( self.soundfont )
+        written = sf.write_subset( self.subset, [2, 0] )
+
+        subset = self.open( self.subset )
+        self.assertEqual( [preset[:3] for preset in subset.presets],
+                          [('Piano', 0, 0), ('Standard Kit', 128, 0)] )
+        self.assertEqual( subset.instruments, ['Piano', 'Drums'] )
+        self.assertEqual( subset.sample_data_size, written )
+        self.assertEqual( subset.info['INAM'], sf.info['INAM'] )
+
+        original = self.samples( sf )
+        copied = self.samples( subset )
+        self.assertEqual( sorted(copied), ['Kick', 'Piano High', 'Piano L', 'Piano R', 'Snare'] )
+        for name, ( sample, data ) in copied.items():
+            self.assertEqual( data, original[name][1] )
+            self.assertEqual( sample.end - sample.start, original[name][0].end - original[name][0].start )
+
+        # The stereo pair still points at each other.
+        left, right = copied['Piano L'][0], copied['Piano R'][0]
+        self.assertEqual( subset.samples[left.link], right )
+        self.assertEqual( subset.samples[right.link], left )
+
+        self.assertEqual( subset.preset_samples(1), {subset.samples.index(copied['Kick'][0]),
+                                                     subset.samples.index(copied['Snare'][0])} )
+
+    def test_subset_keys( self ):
+        soundfonts.write_test_soundfont( self.soundfont )
+        sf = self.open( self.soundfont )
+
+        sf.write_subset( self.subset, [0, 2], {0: {10}, 2: {36}} )
+        with fluidsoundfontfile.FluidSoundfontFile( self.subset ) as subset:
+            self.assertEqual( sorted(sample.name for sample in subset.samples),
+                              ['Kick', 'Piano L', 'Piano R'] )
+
+        # Keys outside of all zones leave out the preset's samples, not the preset.
+        sf.write_subset( self.subset, [2], {2: {90}} )
+        with fluidsoundfontfile.FluidSoundfontFile( self.subset ) as subset:
+            self.assertEqual( len(subset.presets), 1 )
+            self.assertEqual( subset.samples, [] )
+
+    def test_linked_partner( self ):
+        # Only the left sample is used by a zone, its right partner is needed for playback.
+        soundfonts.write_soundfont(
+            self.soundfont, [( 'Pad', 0, 0, [[(soundfonts.INSTRUMENT, 0)]] )],
+            [( 'Pad', [[(soundfonts.SAMPLE_ID, 2)]] )],
+            [( 'Unused', 50, 0, soundfonts.MONO ), ( 'Pad R', 60, 2, soundfonts.RIGHT ),
+             ( 'Pad L', 60, 1, soundfonts.LEFT )] )
+        self.open( self.soundfont ).write_subset( self.subset, [0] )
+
+        subset = self.open( self.subset )
+        self.assertEqual( [(sample.name, sample.link) for sample in subset.samples],
+                          [('Pad R', 1), ('Pad L', 0)] )
+
+    def test_sm24( self ):
+        soundfonts.write_test_soundfont( self.soundfont, sm24 = True )
+        sf = self.open( self.soundfont )
+        self.assertEqual( sf.memory_footprint([1]), 3 * 120 )
+        sf.write_subset( self.subset, [1] )
+
+        subset = self.open( self.subset )
+        sample = subset.samples[0]
+        smpl_offset, smpl_size = subset.chunks[b'smpl']
+        sm24_offset, sm24_size = subset.chunks[b'sm24']
+        self.assertEqual( sm24_size, smpl_size // 2 )
+        self.assertEqual( subset.sample_data_size, 3 * (120 + 46) )
+
+        # The 24 bit extension bytes moved with their sample.
+        original = sf.samples[3]
+        with open( self.soundfont, 'rb' ) as data:
+            data.seek( sf.chunks[b'sm24'][0] + original.start )
+            expected = data.read( 120 )
+        with open( self.subset, 'rb' ) as data:
+            data.seek( sm24_offset + sample.start )
+            self.assertEqual( data.read(120), expected )
@@ -0,0 +1,40 @@
+from pyfluidsynth3 import constants, fluiderror, fluidsettings, fluidsynth
+
+import array
+import unittest
+
+import stubhandle
+
+class FluidSynthTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.synth = fluidsynth.FluidSynth( self.handle, fluidsettings.FluidSettings(self.handle) )
+
+    def test_process_errors( self ):
+        with self.assertRaises( fluiderror.FluidError ):
+            self.synth.process( [] )
+
+        # FluidSynth 1.x fails with more than one stereo pair.
+        self.handle.fluid_synth_process = lambda *args: constants.FAILED
+        with self.assertRaises( fluiderror.FluidError ):
+            self.synth.process( [array.array('f', bytes(64)) for i in range(4)] )
+
+    def test_render_stems( self ):
+        self.handle.fluid_synth_count_audio_groups = lambda synth: 0
+        self.assertEqual( self.synth.render_stems(100).shape, (0, 2, 100) )
+
+        self.handle.fluid_synth_count_audio_groups = lambda synth: 3
+        self.assertEqual( self.synth.render_stems(100, 64).shape, (3, 2, 100) )
+
+    def test_set_interpolation( self ):
+        calls = []
+        self.handle.fluid_synth_set_interp_method = lambda synth, channel, method: \
+            calls.append( (channel, method) ) or constants.OK
+        self.synth.set_interpolation( self.synth.INTERP_LINEAR )
+        self.synth.set_interpolation( self.synth.INTERP_NONE, 9 )
+        self.assertEqual( calls, [(-1, 1), (9, 0)] )
+
+        self.handle.fluid_synth_set_interp_method = lambda *args: constants.FAILED
+        with self.assertRaises( fluiderror.FluidError ):
+            self.synth.set_interpolation( 3 )
@@ -0,0 +1,45 @@
+from pyfluidsynth3 import fluidaudiodriver, fluidsettings, fluidsynth, fluidsynthmonitor
+
+import threading
+import unittest
+
+import stubhandle
+
+class FluidSynthMonitorTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.settings = fluidsettings.FluidSettings( self.handle )
+        self.synth = fluidsynth.FluidSynth( self.handle, self.settings )
+        self.walkers = []
+
+        # Voices 1 and 2 play on channel 3, voice 3 on channel 9, voice 4 is released.
+        def get_voicelist( synth, voices, size, id ):
+            self.walkers.append( threading.current_thread() )
+            voices[:4] = [ 1, 2, 3, 4 ]
+        self.handle.fluid_synth_get_voicelist = get_voicelist
+        self.handle.fluid_synth_get_polyphony = lambda synth: 8
+        self.handle.fluid_voice_is_playing = lambda voice: voice != 4
+        self.handle.fluid_voice_get_channel = lambda voice: 9 if voice == 3 else 3
+
+    def test_channel_voices( self ):
+        driver = fluidaudiodriver.FluidAudioDriver( self.handle, self.synth, self.settings,
+                                                    count_voices = True )
+        monitor = fluidsynthmonitor.FluidSynthMonitor( self.synth, driver = driver )
+        self.assertIsNone( monitor.sample().channels )
+
+        # The voices are counted by the audio thread on its next period.
+        audio = threading.Thread( target = driver._trampoline, args = (None, 64, 0, None, 0, None) )
+        audio.start()
+        audio.join()
+        self.assertEqual( self.walkers, [audio] )
+
+        channels = monitor.sample().channels
+        self.assertEqual( channels[3], 2 )
+        self.assertEqual( channels[9], 1 )
+        self.assertEqual( sum(channels), 3 )
+
+    def test_without_driver( self ):
+        monitor = fluidsynthmonitor.FluidSynthMonitor( self.synth )
+        self.assertIsNone( monitor.sample().channels )
+        self.assertEqual( self.walkers, [] )
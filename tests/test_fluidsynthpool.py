@@ -0,0 +1,47 @@
+from pyfluidsynth3 import fluiderror, fluidsettings, fluidsynth, fluidsynthpool
+
+import time
+import unittest
+
+import stubhandle
+
+class FluidSynthPoolTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.handle = stubhandle.StubHandle()
+        self.pool = fluidsynthpool.FluidSynthPool( self.handle, [], size = 2, prewarm = 1 )
+
+    def test_acquire_release( self ):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertIsNot( first, second )
+        self.pool.release( first )
+        self.pool.release( second )
+        self.assertEqual( self.pool.metrics['idle'], 2 )
+
+    def test_double_release( self ):
+        synth = self.pool.acquire()
+        self.pool.release( synth )
+        with self.assertRaises( fluiderror.FluidError ):
+            self.pool.release( synth )
+
+        # The synth is in the pool once, so two users never share it.
+        self.assertIsNot( self.pool.acquire(), self.pool.acquire() )
+
+    def test_foreign_synth( self ):
+        synth = fluidsynth.FluidSynth( self.handle, fluidsettings.FluidSettings(self.handle) )
+        with self.assertRaises( fluiderror.FluidError ):
+            self.pool.release( synth )
+        self.assertEqual( self.pool.metrics['idle'], 1 )
+
+
+    def test_release_drops_pending_noteoffs( self ):
+        synth = self.pool.acquire()
+        sent = []
+        self.handle.fluid_synth_noteoff = lambda synth, channel, key: sent.append( key )
+        synth.play_note( 0, 60, 100, 50 )
+        self.pool.release( synth )
+
+        time.sleep( 0.1 )
+        self.assertEqual( sent, [] )
+        self.assertEqual( len(synth.notes), 0 )